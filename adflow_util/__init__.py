@@ -1,5 +1,27 @@
 __version__ = '1.3.3'
 
-from .adflow_util import ADFLOW_UTIL
 from .adflow_plot import ADflowData
 from .adflow_plot import adflow_plot
+
+# ADFLOW_UTIL and SweepPlan are only imported when they are used for the
+# first time. This way adflow_plot does not import numpy, MPI or ADflow,
+# which can take seconds on a shared login node.
+_lazy_names = {
+    'ADFLOW_UTIL': '.adflow_util',
+    'SweepPlan': '.sweep_plan',
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_names:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+
+    import importlib
+    value = getattr(importlib.import_module(_lazy_names[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_names))
@@ -3,42 +3,22 @@ import os
 import subprocess
 import shlex
 import adflow_util.plot as plx
+from adflow_util.log_follower import LogFollower
+from adflow_util.column_store import ColumnStore
+from adflow_util.line_buffer import LineBuffer
+from adflow_util.log_parser import LogParser, RowTokenizer, ap_name_string, parse_var_names, str2number
+from adflow_util.run_index import RunIndex
 import curses
 from collections import OrderedDict
 import time
-import threading
 import sys
-import queue
 import math
-import numpy as np
-import copy
+import mmap
+import select
+import signal
 
 ON_POSIX = 'posix' in sys.builtin_module_names
 
-def str2number(s):
-    # converts a string to int or float if possible
-    # if it is neither, it returns the string itself
-
-    # check fo int
-    is_int = False
-    if s[0] in ('-', '+'):
-        is_int = s[1:].isdigit()
-    else:
-        is_int = s.isdigit()
-
-    if is_int:
-        return int(s)
-
-    # check for float
-    try:
-        return float(s)
-    except ValueError:
-        return s
-
-def enqueue_output(out, queue):
-    for line in iter(out.readline, b''):
-        queue.put(line)
-    out.close()
 
 def str2bool(v):
     if isinstance(v, bool):
@@ -192,6 +172,28 @@ class Message(BaseBuffer):
         return lines, line_count, self._type
 
 
+class Pane():
+    """
+    A part of the screen, which is only drawn again if what it shows has
+    changed. The key describes everything the pane shows: if it is the same
+    as last time, the pane on the screen is still up to date.
+    """
+    def __init__(self):
+        self.key = None
+        self.is_valid = False
+
+    def dirty(self, key):
+        # returns True if the pane has to be drawn with this key
+        if self.is_valid and key == self.key:
+            return False
+        self.key = key
+        self.is_valid = True
+        return True
+
+    def invalidate(self):
+        self.is_valid = False
+
+
 class ADFlowPlot():
     """
     This Class provides the curses window and plots the data parsed by ADflowData.
@@ -202,18 +204,32 @@ class ADFlowPlot():
         self.screenBuffer = ScreenBuffer()
         self.adData = ADflowData()
         self.message = Message()
+
+        # the screen is redrawn when something has happened, but at most fps
+        # times a second
         self.fps = 60
 
         # user changable vars
         self._exit = False
         self._n_adflowout = 0
+        self._log_end = None
+        self._run_view = None
+        self._log_search = ''
         self._plot_vars = {'Res_rho': 1}
         self._n_plot_iterations = 0
+        self._plot_zoom = 1.0
+        self._plot_pan = 0
         self._ymin = None
         self._ymax = None
         self._plot_log = True
         self._confirm_quiting = False
 
+        # the panes of the screen and the last raster of the plot
+        self.panes = OrderedDict(
+            (name, Pane()) for name in ('layout', 'message', 'output', 'plot', 'command'))
+        self._plot_raster_key = None
+        self._plot_raster = None
+
         # init stuff
         self.init_commands()
         self.screen = curses.initscr()
@@ -230,6 +246,12 @@ class ADFlowPlot():
         curses.init_pair(5, curses.COLOR_MAGENTA, curses.COLOR_BLACK)
         curses.init_pair(6, curses.COLOR_CYAN, curses.COLOR_BLACK)
 
+        # SIGWINCH writes to this pipe, so select wakes up on a resize
+        self.wakeup_read = None
+        self.wakeup_write = None
+        self.old_wakeup_fd = -1
+        self.old_sigwinch = None
+
         # init solver markers
         self.solvers_in_use = []
         self._solver_markers = {
@@ -247,20 +269,86 @@ class ADFlowPlot():
         if self.screen is not None:
             self.cleanup()
 
+    @property
+    def runData(self):
+        # the run that is shown, the one going on if none has been picked
+        if self._run_view is not None:
+            return self._run_view
+        return self.adData
+
     def cleanup(self):
         # shudown stuff
+        self.cleanup_events()
         curses.nocbreak()
         self.screen.keypad(False)
         curses.echo()
         curses.endwin()
 
+    def init_events(self):
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        os.set_blocking(self.wakeup_read, False)
+        os.set_blocking(self.wakeup_write, False)
+        self.old_wakeup_fd = signal.set_wakeup_fd(self.wakeup_write)
+        self.old_sigwinch = signal.signal(signal.SIGWINCH, lambda signum, frame: None)
+
+    def cleanup_events(self):
+        if self.wakeup_read is None:
+            return
+        signal.set_wakeup_fd(self.old_wakeup_fd)
+        signal.signal(signal.SIGWINCH, self.old_sigwinch)
+        os.close(self.wakeup_read)
+        os.close(self.wakeup_write)
+        self.wakeup_read = None
+        self.wakeup_write = None
+
+    def wait_events(self, timeout):
+        """
+        Blocks until a key has been pressed, ADflow has written something or
+        the terminal has been resized. timeout is the longest time to wait
+        in seconds, None waits for ever.
+        """
+        fds = [sys.stdin.fileno(), self.wakeup_read]
+        if self.adData.fileno() is not None:
+            fds.append(self.adData.fileno())
+
+        # a log file that is polled needs to be looked at from time to time
+        data_timeout = self.adData.timeout()
+        if data_timeout is not None and (timeout is None or data_timeout < timeout):
+            timeout = data_timeout
+
+        readable, _, _ = select.select(fds, [], [], timeout)
+
+        if self.wakeup_read in readable:
+            try:
+                while os.read(self.wakeup_read, 512):
+                    pass
+            except BlockingIOError:
+                pass
+            self.resize()
+
+    def resize(self):
+        # curses does not see SIGWINCH itself anymore
+        size = os.get_terminal_size(sys.__stdout__.fileno())
+        curses.resizeterm(size.lines, size.columns)
+
     def main_loop(self):
         self.adData.start()
+        self.init_events()
+        next_frame = 0.0
+        timeout = 0.0
         while not self._exit:
-            t0 = time.time()
+            self.wait_events(timeout)
 
-            if self.commandBuffer._has_new_commited:
-                self.parse_command()
+            # everything that has happened in the meantime
+            self.parse_key_input()
+            self.adData.read_stdout_lines()
+
+            # the next frame has to wait, if the last one was just drawn
+            now = time.monotonic()
+            if now < next_frame:
+                timeout = next_frame - now
+                continue
+            timeout = None
 
             rows, cols = self.screen.getmaxyx()
 
@@ -270,58 +358,107 @@ class ADFlowPlot():
             self.screenBuffer.message = self.message
             self.screenBuffer.command_active = self.commandBuffer.get_active()
             self.screenBuffer.adflow_stdout_len = len(self.adData.stdout_lines)
-            if len(self.adData.adflow_vars) > 0:
-                self.screenBuffer.adflow_iter_len = len(self.adData.adflow_vars['Iter'])
+            self.screenBuffer.log_end = self._log_end
+            self.screenBuffer.run_view = self._run_view
+            if len(self.runData.adflow_vars) > 0:
+                self.screenBuffer.adflow_iter_len = len(self.runData.adflow_vars['Iter'])
 
             # redraw if something has changed
             if self.screenBuffer.redraw:
                 self.draw(rows, cols)
-
-            # refresh and key input
-            self.parse_key_input()
-
-            self.adData.read_stdout_lines()
-
-            # sleep for the rest of the frame
-            d_t = 1/self.fps - (time.time() - t0)
-            if d_t > 0:
-                time.sleep(d_t)
+                next_frame = now + 1 / self.fps
 
     def draw(self, rows, cols):
+        """
+        Draws the panes that have changed since the last time. Every pane
+        has a key of what it shows (see Pane), the others stay as they are
+        on the screen. Only if the layout has changed, everything is drawn
+        again.
+        """
+        lines, line_count, _type = self.message.text()
+        adflow_vars = self.runData.adflow_vars
+        show_plot = len(adflow_vars) > 0 and len(adflow_vars['Iter']) >= 2
+
         # flicker fix. Use erase instead of clear. But clear before first plot
-        self.screen.erase()
-        if len(self.adData.stdout_lines) == 0:
-            self.screen.clear()
+        layout = (rows, cols, self._n_adflowout, line_count, len(adflow_vars) == 0, show_plot)
+        if self.panes['layout'].dirty(layout):
+            self.screen.erase()
+            if len(self.adData.stdout_lines) == 0:
+                self.screen.clear()
+            for name, pane in self.panes.items():
+                if name != 'layout':
+                    pane.invalidate()
 
         # message lines:
-        line_count = self.print_message(rows)
+        if self.panes['message'].dirty((tuple(lines), _type)):
+            self.clear_rows(rows - 1 - line_count, rows - 1)
+            self.print_message(rows)
 
         # print console output at top
-        self.print_adflow_output(rows, line_count)
+        len_output = self.len_adflow_output(rows, line_count)
+        if self.panes['output'].dirty(self.output_key(len_output)):
+            self.clear_rows(0, len_output)
+            self.print_adflow_output(rows, line_count)
 
-        if len(self.adData.adflow_vars) > 0:
-            adflow_iter_len = len(self.adData.adflow_vars['Iter'])
+        # only plot if at least 2 iterations are available
+        if show_plot and self.panes['plot'].dirty(self.plot_key(cols, rows, line_count)):
+            self.clear_rows(self._n_adflowout, rows - 1 - line_count)
 
-            # only plot if at least 2 iterations and new data available
-            if adflow_iter_len >= 2:
-                # plot vars
-                self.print_plot(cols-3, rows - self._n_adflowout - line_count)
+            # plot vars
+            self.print_plot(cols-3, rows - self._n_adflowout - line_count)
 
-                # print labels
-                self.print_labels(cols, rows)
+            # print labels
+            self.print_labels(cols, rows)
 
-                # print solver information
-                self.print_solver_info(cols)
+            # print solver information
+            self.print_solver_info(cols)
 
-                # print marker information
-                self.print_markers(cols, rows)
+            # print marker information
+            self.print_markers(cols, rows)
 
-                # print finished message
-                if self.adData.has_finished:
-                    self.print_finished_message(cols, rows)
+            # print finished message
+            if self.runData.has_finished:
+                self.print_finished_message(cols, rows)
 
         # print command line at bottom:
-        self.screen.addstr(rows-1, 0, self.commandBuffer.get_active())
+        if self.panes['command'].dirty(self.commandBuffer.get_active()):
+            self.clear_rows(rows - 1, rows)
+            self.screen.addstr(rows-1, 0, self.commandBuffer.get_active())
+
+    def clear_rows(self, start, stop):
+        # clears the lines of a pane, which is drawn again
+        for y in range(start, stop):
+            self.screen.move(y, 0)
+            self.screen.clrtoeol()
+
+    def len_adflow_output(self, height, line_count):
+        # the number of output lines, all of them if there is no plot
+        if len(self.runData.adflow_vars) == 0:
+            return height - 1 - line_count
+        return self._n_adflowout
+
+    def output_key(self, len_output):
+        # the output only changes, if other lines are shown
+        end = len(self.adData.stdout_lines)
+        if self._log_end is not None:
+            end = min(self._log_end, end)
+        return (self.adData.stdout_lines, len_output, end)
+
+    def plot_raster_key(self, width, height):
+        # everything the raster of the plot depends on: the data, the
+        # variables, the limits and the size
+        adflow_vars = self.runData.adflow_vars
+        return (
+            adflow_vars, adflow_vars.n_rows, tuple(self._plot_vars.items()),
+            self._plot_log, self._ymin, self._ymax, self._n_plot_iterations,
+            self._plot_zoom, self._plot_pan, width, height)
+
+    def plot_key(self, cols, rows, line_count):
+        # the raster and what is printed on top of it
+        runData = self.runData
+        return self.plot_raster_key(cols-3, rows - self._n_adflowout - line_count) + (
+            runData.ap_name, runData.hist_iteration, runData.has_finished,
+            runData.has_finished_total_call_time, runData.has_finished_total_func_time)
 
     def print_message(self, rows):
         lines, line_count, _type = self.message.text()
@@ -333,17 +470,18 @@ class ADFlowPlot():
         return line_count
 
     def print_adflow_output(self, height, line_count):
-        len_output = self._n_adflowout
-        if len(self.adData.adflow_vars) == 0:
-            len_output = height -1 - line_count
+        len_output = self.len_adflow_output(height, line_count)
+
+        # the last line shown, None follows the output
+        end = len(self.adData.stdout_lines)
+        if self._log_end is not None:
+            end = min(self._log_end, end)
+        stdout_lines = self.adData.stdout_lines[max(end - len_output, 0):end]
+        stdout_lines = [''] * (len_output - len(stdout_lines)) + stdout_lines
 
         # print output
-        for n in range(len_output, 0, -1):
-            if len(self.adData.stdout_lines) >= n:
-                stdout_line = self.adData.stdout_lines[-n]
-            else:
-                stdout_line = ''
-            self.screen.addstr(len_output - n, 0, stdout_line)
+        for n, stdout_line in enumerate(stdout_lines):
+            self.screen.addstr(n, 0, stdout_line)
 
     def print_labels(self, cols, rows):
         # prepare print
@@ -383,16 +521,17 @@ class ADFlowPlot():
             n += 1
 
     def print_solver_info(self, cols):
-        iter_tot = self.adData.adflow_vars_raw['Iter_Tot']
-        cfl = self.adData.adflow_vars_raw['CFL'][-1]
+        adflow_vars = self.runData.adflow_vars
+        iter_tot = [adflow_vars.raw('Iter_Tot', -2), adflow_vars.raw('Iter_Tot', -1)]
+        cfl = adflow_vars.raw('CFL', -1)
         pairs = [
-            ['Grd Lvl',     self.adData.adflow_vars_raw['Grid_level'][-1]],
+            ['Grd Lvl',     adflow_vars.raw('Grid_level', -1)],
             ['IterTot',     iter_tot[-1] if iter_tot[-1] < 1e6 else '{:.1e}'.format(iter_tot[-1])],
             ['Iter Diff',   iter_tot[-1] - iter_tot[-2]],
-            ['IterType',    self.adData.adflow_vars_raw['Iter_Type'][-1]],
+            ['IterType',    adflow_vars.raw('Iter_Type', -1)],
             ['CFL',         cfl if isinstance(cfl, str) else '{:.1e}'.format(cfl)],
-            ['Step',        self.adData.adflow_vars_raw['Step'][-1]],
-            ['Lin Res',     self.adData.adflow_vars_raw['Lin_Res'][-1]]
+            ['Step',        adflow_vars.raw('Step', -1)],
+            ['Lin Res',     adflow_vars.raw('Lin_Res', -1)]
         ]
 
         info_str = []
@@ -400,7 +539,7 @@ class ADFlowPlot():
             info_str.append('{:9}: {:>7}'.format(pair[0], pair[1]))
 
         # print name
-        name = self.adData.ap_name + '_' + str(self.adData.hist_iteration)
+        name = self.runData.ap_name + '_' + str(self.runData.hist_iteration)
         self.screen.addstr(
             self._n_adflowout, int((cols - len(name) - 5) / 2),
             name)
@@ -412,13 +551,13 @@ class ADFlowPlot():
             n += 1
 
     def print_finished_message(self, cols, rows):
-        if self.adData.has_finished_total_call_time is None:
+        if self.runData.has_finished_total_call_time is None:
             return
 
-        if self.adData.has_finished_total_func_time is None:
+        if self.runData.has_finished_total_func_time is None:
             return
 
-        time = self.adData.has_finished_total_call_time + self.adData.has_finished_total_func_time
+        time = self.runData.has_finished_total_call_time + self.runData.has_finished_total_func_time
 
         text = 'ADflow has finished in {} seconds.'.format(time)
 
@@ -431,7 +570,22 @@ class ADFlowPlot():
         if len(self._plot_vars) == 0:
             return
 
-        x = self.adData.adflow_vars['Iter']
+        # the raster is only computed again if the data, the limits or the
+        # size have changed
+        key = self.plot_raster_key(width, height)
+        if key != self._plot_raster_key:
+            self._plot_raster = self.plot_raster(width, height)
+            self._plot_raster_key = key
+
+        for y, x, string, color in self._plot_raster:
+            self.screen.addstr(
+                self._n_adflowout + y, x,
+                string,
+                curses.color_pair(color))
+
+    def plot_raster(self, width, height):
+        # returns the plot as runs of text (y, x, string, color pair)
+        x = self.runData.adflow_vars['Iter']
 
         # reset plot variables
         plx._vars.__init__()
@@ -439,18 +593,36 @@ class ADFlowPlot():
         plx._vars.rows_term = height
         ylim = None
 
-        # only show parts of iteration history
-        min_i = 0
-        if self._n_plot_iterations > 0:
-            min_i =  len(x) - min(len(x), self._n_plot_iterations)
-        elif self._n_plot_iterations < 0:
-            min_i = min(len(x) - 2, -self._n_plot_iterations + 1)
-        x = x[min_i:]
+        # only show parts of iteration history. numpy is only imported when
+        # it is needed, so the plot starts up quickly
+        import numpy as np
+        adflow_vars = self.runData.adflow_vars
+        min_i, max_i = self.plot_window(len(x))
+
+        # a long history is reduced to the minimum and the maximum of every
+        # few iterations, about two points for every column of the plot. The
+        # pyramids are updated with the new iterations only.
+        values = OrderedDict()
+        if max_i - min_i > 2 * width:
+            for key in self._plot_vars:
+                starts, mins, maxs = adflow_vars.pyramid(key).window(min_i, max_i, width)
+                values[key] = np.empty(2 * len(starts))
+                values[key][0::2] = mins
+                values[key][1::2] = maxs
+            rows = np.empty(2 * len(starts), dtype=np.int64)
+            rows[0::2] = starts
+            rows[1::2] = (starts + np.append(starts[1:], max_i)) // 2
+        else:
+            for key in self._plot_vars:
+                values[key] = adflow_vars[key][min_i:max_i]
+            rows = np.arange(min_i, max_i)
+        x = x[rows]
 
         # set marker for solver
         line_marker = []
         solvers_in_use = []
-        for solver in self.adData.adflow_vars_raw['Iter_Type'][min_i:]:
+        for row in rows.tolist():
+            solver = adflow_vars.raw('Iter_Type', row)
             pc_marker = None
             if solver[0] == '*':
                 solver = solver[1:]
@@ -472,7 +644,7 @@ class ADFlowPlot():
 
         # add plot data
         for key, color in self._plot_vars.items():
-            y = self.adData.adflow_vars[key][min_i:]
+            y = values[key]
 
             # take log of y values
             if self._plot_log:
@@ -485,11 +657,11 @@ class ADFlowPlot():
             # calculate automatic limits
             if ylim is None and len(y) >= 2:
                 ylim = [
-                    min(y),
-                    max(y)]
+                    y.min(),
+                    y.max()]
             else:
-                ylim = [min(min(y), ylim[0]),
-                        max(max(y), ylim[1])]
+                ylim = [min(y.min(), ylim[0]),
+                        max(y.max(), ylim[1])]
 
         # set user limits
         if self._ymin is not None:
@@ -508,36 +680,42 @@ class ADFlowPlot():
         plx.set_ylim(ylim)
         plx._set_xlim()
         plx._set_ylim()
-        plx._set_grid()
-        plx._add_yaxis()
-        plx._add_xaxis()
-
-        # draw plot
-        lines = []
-        for r in range(len(plx._vars.grid) -1, -1, -1):
-            lines.append("".join(plx._vars.grid[r]))
-
-        len_lines = len(lines)
-        for n in range(len_lines):
-
-            # plot in proper colors
-            sub_lines = lines[n].split('\033')[1:]
-            x = 0
-            for sub_line in sub_lines:
-                color_str = sub_line.split('m')[0]
-                string = sub_line[len(color_str)+1:]
-
-                self.screen.addstr(
-                    self._n_adflowout + n, x,
-                    string,
-                    curses.color_pair(int(color_str[1:])))
-                x += len(string)
+        plx._set_runs()
+
+        # the runs of the plot in proper colors. The pane has been cleared,
+        # so blank runs are left out.
+        raster = []
+        for n, runs in enumerate(plx._vars.runs):
+            for x, string, color in runs:
+                if not string.isspace():
+                    raster.append((n, x, string, color))
+        return raster
+
+    def plot_window(self, n):
+        # the rows of the iterations shown: the ones of the iterations
+        # command, zoomed and panned
+        min_i = 0
+        if self._n_plot_iterations > 0:
+            min_i =  n - min(n, self._n_plot_iterations)
+        elif self._n_plot_iterations < 0:
+            min_i = min(n - 2, -self._n_plot_iterations + 1)
+
+        width = max(int((n - min_i) / self._plot_zoom), 2)
+        max_i = min(max(n - self._plot_pan, min_i + width), n)
+        return max(max_i - width, min_i), max_i
 
     def parse_key_input(self):
+        # all keys that have been pressed since the last time
+        while self.parse_key():
+            if self.commandBuffer._has_new_commited:
+                self.parse_command()
+
+    def parse_key(self):
+        # returns False if there was no key
         try:
             c = self.screen.getch()
             if c == curses.ERR:
-                return
+                return False
 
             if isinstance(c, int):
 
@@ -554,7 +732,8 @@ class ADFlowPlot():
                 if c > 31 and c < 127:
                     self.commandBuffer.add(chr(c))
         except curses.error:
-            pass
+            return False
+        return True
 
     def parse_command(self):
         new_command = self.commandBuffer.get_commited()
@@ -608,6 +787,16 @@ class ADFlowPlot():
                             'positive int   shows the last x iterations.\n' \
                             'negative int   does\'t show the first x iterations\n' \
                             'no argument    shows all iterations'],
+            'zoom':         [self.cmd_zoom,
+                            ['z', 'zoom'],
+                            'Zooms into the iterations shown.',
+                            'float > 1      shows the last 1/x of them.\n' \
+                            'no argument    shows all of them again.'],
+            'pan':          [self.cmd_pan,
+                            ['p', 'pan'],
+                            'Moves the zoomed plot back in the iteration history.',
+                            'int            ends the plot x iterations before the newest one.\n' \
+                            'no argument    follows the newest iterations.'],
             'ymin':         [self.cmd_ymin,
                             ['ymin'],
                             'Sets the minimum of the y axis.',
@@ -626,6 +815,24 @@ class ADFlowPlot():
                             ['hlog'],
                             'Sets the height of console window at the top.',
                             'int            height in lines.'],
+            'runs':         [self.cmd_runs,
+                            ['runs'],
+                            'Lists the runs of the log file.'],
+            'run':          [self.cmd_run,
+                            ['run'],
+                            'Shows a single run of the log file.',
+                            'positive int   shows this run, the first one is 1.\n' \
+                            'no argument    shows the run going on.'],
+            'scroll':       [self.cmd_scroll,
+                            ['s', 'scroll'],
+                            'Scrolls the console window at the top back.',
+                            'positive int   shows the output up to x lines before the newest one.\n' \
+                            'no argument    follows the newest output.'],
+            'search':       [self.cmd_search,
+                            ['/', 'search'],
+                            'Scrolls the console window back to a text.',
+                            'str            searched above the last line shown.\n' \
+                            'no argument    searches for the last text again.'],
         }
 
         # prepare command switcher
@@ -685,9 +892,9 @@ class ADFlowPlot():
             self.message.set('', Message.typeNone)
 
     def cmd_list_var(self, args):
-        if len(self.adData.adflow_vars) > 0:
+        if len(self.runData.adflow_vars) > 0:
             text = 'Plottable ADflow variables:\n'
-            for var in self.adData.adflow_vars.keys():
+            for var in self.runData.adflow_vars.keys():
                 if var in self.adData.not_plottable_vars:
                     continue
                 if var in self._plot_vars:
@@ -712,7 +919,7 @@ class ADFlowPlot():
         # check if value exists and get proper case
         exists = False
         n_color = 0
-        for var in self.adData.adflow_vars:
+        for var in self.runData.adflow_vars:
             # if var is not plotable, continue
             if var in self.adData.not_plottable_vars:
                 continue
@@ -803,6 +1010,45 @@ class ADFlowPlot():
         else:
             self.message.set('Showing all iterations.', Message.typeSuccess)
 
+    def cmd_zoom(self, args):
+        # no argument shows everything again
+        if len(args) == 0:
+            self._plot_zoom = 1.0
+            self._plot_pan = 0
+            self.message.set('Not zoomed.', Message.typeSuccess)
+            return
+
+        try:
+            value = float(args[0])
+        except ValueError:
+            self.message.set('Zoom must be a number.', Message.typeError)
+            return
+
+        if not value >= 1 or math.isinf(value):
+            self.message.set('Zoom must at least be 1.', Message.typeError)
+            return
+
+        self._plot_zoom = value
+        self.message.set('Zoomed in {} times.'.format(value), Message.typeSuccess)
+
+    def cmd_pan(self, args):
+        # check if there is an arg
+        if len(args) == 0:
+            value = '0'
+        else:
+            value = args[0]
+
+        if not value.isdigit():
+            self.message.set('Pan must be a positive integer.', Message.typeError)
+            return
+
+        self._plot_pan = int(value)
+        if self._plot_pan > 0:
+            self.message.set('Plot ends {} iterations before the newest one.'.format(
+                self._plot_pan), Message.typeSuccess)
+        else:
+            self.message.set('Following the newest iterations.', Message.typeSuccess)
+
     def cmd_ymin(self, args):
         # check if there is an arg
         if len(args) == 0:
@@ -876,6 +1122,99 @@ class ADFlowPlot():
         self._n_adflowout = value
         self.message.set('Log height was set to "{}"'.format(value), Message.typeSuccess)
 
+    def cmd_runs(self, args):
+        if self.adData.run_index is None:
+            self.message.set('Runs are only known in a log file.', Message.typeError)
+            return
+
+        self.adData.run_index.update()
+        if len(self.adData.run_index) == 0:
+            self.message.set('There are no runs yet.', Message.typeError)
+            return
+
+        text = 'Runs:\n'
+        for run in self.adData.run_index.runs:
+            rel_res = '-'
+            if run['first_res'] and run['final_res']:
+                rel_res = '{:.2e}'.format(run['final_res'] / run['first_res'])
+            text += '{: >4} {: <20} {: >7} iterations, relRes {}\n'.format(
+                run['run'], run['ap_name'], run['n_iterations'], rel_res)
+        self.message.set(text[:-1], Message.typeNone)
+
+    def cmd_run(self, args):
+        if len(args) == 0:
+            self._run_view = None
+            self.message.set('Showing the run going on.', Message.typeSuccess)
+            return
+
+        if self.adData.run_index is None:
+            self.message.set('Runs can only be picked in a log file.', Message.typeError)
+            return
+
+        value = args[0]
+        if not value.isdigit():
+            self.message.set('Run must be a positive integer.', Message.typeError)
+            return
+
+        try:
+            self._run_view = self.adData.load_run(int(value))
+        except IndexError:
+            self.message.set('Run {} does not exist.'.format(value), Message.typeError)
+            return
+        self.message.set('Showing run {}.'.format(value), Message.typeSuccess)
+
+    def cmd_scroll(self, args):
+        if len(args) == 0:
+            self._log_end = None
+            self.message.set('Following the output.', Message.typeSuccess)
+            return
+
+        value = args[0]
+
+        if not value.isdigit():
+            self.message.set('Scroll distance must be a positve integer.', Message.typeError)
+            return
+
+        value = int(value)
+        self._log_end = max(len(self.adData.stdout_lines) - value, 0)
+        self.message.set('Scrolled back {} lines.'.format(value), Message.typeSuccess)
+
+    def cmd_search(self, args):
+        if len(args) > 0:
+            self._log_search = ' '.join(args)
+        if self._log_search == '':
+            self.message.set('Nothing to search for.', Message.typeError)
+            return
+
+        # search above the last line shown
+        end = self._log_end
+        if end is not None:
+            end -= 1
+        index = self.adData.stdout_lines.search(self._log_search, end)
+        if index < 0:
+            self.message.set('"{}" not found.'.format(self._log_search), Message.typeError)
+            return
+
+        self._log_end = index + 1
+        self.message.set('"{}" found {} lines back.'.format(
+            self._log_search, len(self.adData.stdout_lines) - index - 1),
+            Message.typeSuccess)
+
+
+class RunView():
+    """
+    A finished or running run of a log file, as ADflowData.load_run reads
+    it. It has the same attributes as ADflowData, which the plot needs.
+    """
+    def __init__(self, run, adflow_vars):
+        self.run = run
+        self.adflow_vars = adflow_vars
+        self.ap_name = run['ap_name']
+        self.hist_iteration = run['run']
+        self.has_finished = run['end'] is not None
+        self.has_finished_total_call_time = run['call_time']
+        self.has_finished_total_func_time = run['func_time']
+
 
 class ADflowData():
     """
@@ -889,22 +1228,35 @@ class ADflowData():
         self.not_plottable_vars = ['Iter_Type', 'Iter']
         self.flush_hist_n = 20
 
+        # how many lines of an existing log file are kept for the output
+        # window, when it is read in bulk
+        self.ingest_n_lines = 1000
+
+        # from how many iteration rows on they are parsed column by column
+        self.vectorize_n_rows = 64
+
+        # how many lines of the output are kept in memory. Older ones are
+        # moved to a temporary file
+        self.stdout_n_lines = 10000
+
         # adflow process vars
         self.adflow_process = None
-        # self.adflow_queue = None
-        self.adflow_queue = queue.Queue()
-        self.adflow_thread = None
+        self.adflow_stdout = None
+        self.adflow_partial = b''
+        self.log_follower = None
+        self.log_restarts = 0
+        self.run_index = None
 
         # state vars
-        self.stdout_lines = []
+        self.stdout_lines = LineBuffer(self.stdout_n_lines)
         self.has_finished = True
         self.has_finished_total_call_time = None
         self.has_finished_total_func_time = None
         self.ap_name = ''
         self.hist_file = None
         self.hist_iteration = 0
-        self.adflow_vars = OrderedDict()
-        self.adflow_vars_raw = OrderedDict()
+        self.adflow_vars = ColumnStore()
+        self.log_parser = LogParser(self)
 
         # init functions
         self.parse_input_args(args if args is not None else sys.argv[1:])
@@ -914,10 +1266,11 @@ class ADflowData():
         # kill adflow
         if self.adflow_process is not None:
             self.adflow_process.kill()
+        if self.log_follower is not None:
+            self.log_follower.close()
 
     def reset_vars(self):
-        self.adflow_vars = OrderedDict()
-        self.adflow_vars_raw = OrderedDict()
+        self.adflow_vars = ColumnStore()
         self.hist_iteration += 1
 
     def start(self):
@@ -936,16 +1289,101 @@ class ADflowData():
         self.start_logfile()
 
     def start_logfile(self):
-        self.adflow_process = subprocess.Popen(
-            ['tail', '-f', '-n', '+1', self.args.inputfile],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            bufsize=1, close_fds=ON_POSIX)
+        # read what is already there in bulk. The history file needs every
+        # single run, so in this case the log is parsed line by line.
+        offset = 0
+        self.run_index = RunIndex(self.args.inputfile)
+        if not self.args.hist and os.path.isfile(self.args.inputfile):
+            offset = self.ingest_logfile(self.args.inputfile)
 
-        # Pipe thread
-        self.adflow_thread = threading.Thread(
-            target=enqueue_output, args=(self.adflow_process.stdout, self.adflow_queue))
-        self.adflow_thread.daemon = True # thread dies with the program
-        self.adflow_thread.start()
+        # and only follow what comes after
+        self.log_follower = LogFollower(self.args.inputfile, offset)
+
+    def ingest_logfile(self, filename):
+        """
+        Reads an existing log file in bulk and returns the byte offset up to
+        which it has been read.
+
+        The file is memory-mapped and only the header blocks and end markers
+        are searched for. Just the iteration rows of the last run are parsed,
+        all at once. This leads to the same state as parsing every line, but
+        a log of several GB takes seconds instead of minutes.
+        """
+        if self.run_index is None:
+            self.run_index = RunIndex(filename)
+
+        with open(filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return 0
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return self.ingest_log_data(data)
+
+    def ingest_log_data(self, data):
+        # only complete lines are read, the rest is followed later on
+        end = data.rfind(b'\n') + 1
+
+        # the runs are found without reading the lines
+        n_runs = self.run_index.update(data, end)
+        if n_runs == 0:
+            return 0
+        run = self.run_index.get(n_runs)
+        run_end = run['end'] if run['end'] is not None else end
+
+        # the name of the first AeroProblem
+        name_start = data.find(ap_name_string, 0, end)
+        if name_start >= 0:
+            name_end = data.find(b'\n', name_start, end)
+            self.ap_name = data[name_start:name_end].decode('utf-8').rstrip()[29:-2].strip()
+
+        # the same state as the line by line parser after the header
+        self.hist_iteration += n_runs - 1
+        self.reset_vars()
+        self.has_finished = False
+        self.has_finished_total_call_time = None
+        self.has_finished_total_func_time = None
+        self.adflow_vars = self.read_run(data, run, run_end)
+        self.log_parser.set_header(self.adflow_vars.names[:-1])
+
+        # the last lines before the end of the run, for the output window
+        start = run_end
+        for n in range(self.ingest_n_lines):
+            start = data.rfind(b'\n', 0, max(start - 1, 0)) + 1
+            if start == 0:
+                break
+        self.stdout_lines.extend(
+            line.rstrip() for line in
+            data[start:run_end].decode('utf-8', 'replace').splitlines())
+
+        # the few lines after the run take the usual way
+        self.parse_lines([
+            line.rstrip() for line in
+            data[run_end:end].decode('utf-8', 'replace').splitlines()])
+
+        return end
+
+    def read_run(self, data, run, run_end):
+        # the iterations of a run of the RunIndex, all rows at once
+        var_desc_lines = data[run['header']:run['iterations']].decode('utf-8').splitlines()
+        adflow_vars = self.parse_adflow_var_names(var_desc_lines[1:3])
+        rows = [
+            line for line in data[run['iterations']:run_end].split(b'\n')
+            if line[0:5] == b'     ']
+        self.parse_adflow_var_columns(rows, adflow_vars)
+        return adflow_vars
+
+    def load_run(self, k):
+        """
+        Returns run k (the first one is 1) of the log file as a RunView. Only
+        this run is read, with the offsets of the RunIndex.
+        """
+        self.run_index.update()
+        run = self.run_index.get(k)
+        with open(self.run_index.filename, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                run_end = run['end']
+                if run_end is None:
+                    run_end = data.rfind(b'\n') + 1
+                return RunView(run, self.read_run(data, run, run_end))
 
     def start_adflow(self):
         # run adflow script
@@ -954,13 +1392,24 @@ class ADflowData():
         self.adflow_process = subprocess.Popen(
             shlex.split(command), env=os.environ,
             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.PIPE,
-            bufsize=1, close_fds=ON_POSIX)
+            bufsize=0, close_fds=ON_POSIX)
+
+        # the pipe is read whenever select says so, it never blocks
+        self.adflow_stdout = self.adflow_process.stdout.fileno()
+        os.set_blocking(self.adflow_stdout, False)
+
+    def fileno(self):
+        # the fd that gets readable with new output, None if there is none
+        if self.log_follower is not None:
+            return self.log_follower.fileno()
+        return self.adflow_stdout
 
-        # Pipe thread
-        self.adflow_thread = threading.Thread(
-            target=enqueue_output, args=(self.adflow_process.stdout, self.adflow_queue))
-        self.adflow_thread.daemon = True # thread dies with the program
-        self.adflow_thread.start()
+    def timeout(self):
+        # seconds until the output has to be read, even if fileno() has not
+        # become readable. None if that is not needed.
+        if self.log_follower is not None:
+            return max(self.log_follower.next_poll - time.monotonic(), 0.0)
+        return None
 
     def create_adflow_run_command(self):
         command = ''
@@ -979,15 +1428,50 @@ class ADflowData():
         return command
 
     def read_stdout_lines(self):
+        if self.log_follower is not None:
+            self.read_log_lines()
+            return
+
+        if self.adflow_stdout is None:
+            return
+
+        chunks = []
         while True:
             try:
-                line = self.adflow_queue.get_nowait()
-            except queue.Empty:
+                chunk = os.read(self.adflow_stdout, 2**16)
+            except BlockingIOError:
                 break
-            else:
-                # parse the line
-                self.stdout_lines.append(line.decode("utf-8").rstrip())
-                self.parse_stdout_line()
+            if not chunk:
+                # ADflow has finished and closed the pipe
+                self.adflow_process.stdout.close()
+                self.adflow_stdout = None
+                break
+            chunks.append(chunk)
+
+        # complete lines are parsed, the rest waits for its line break. The
+        # last line does not need one.
+        data = self.adflow_partial + b''.join(chunks)
+        end = data.rfind(b'\n') + 1
+        if self.adflow_stdout is None:
+            end = len(data)
+        self.adflow_partial = data[end:]
+
+        lines = data[:end].split(b'\n')
+        if lines[-1] == b'':
+            lines.pop()
+        self.parse_lines([line.decode('utf-8', 'replace').rstrip() for line in lines])
+
+    def read_log_lines(self):
+        lines = self.log_follower.read_lines()
+
+        # the log has been truncated or replaced, a new job writes to it
+        if self.log_follower.restarts != self.log_restarts:
+            self.log_restarts = self.log_follower.restarts
+            self.has_finished = True
+            self.ap_name = ''
+            self.log_parser.reset()
+
+        self.parse_lines([line.decode('utf-8', 'replace').rstrip() for line in lines])
 
     def parse_input_args(self, args):
         # input file
@@ -1014,128 +1498,147 @@ class ADflowData():
 
         self.args = self.parser.parse_args(args)
 
+    def parse_lines(self, lines):
+        # new lines of the output
+        self.stdout_lines.extend(lines)
+        self.log_parser.feed_lines(lines)
+
     def parse_stdout_line(self):
-        # parse every stdout line and do the appropriate action
+        # parses the newest line of the output
+        self.log_parser.feed(self.stdout_lines[-1])
 
-        # if the AeroProblem Name is not set, do it
-        if self.ap_name == '':
-            if self.stdout_lines[-1][0:29] == '|  Switching to Aero Problem:':
-                self.ap_name = self.stdout_lines[-1][29:-2].strip()
+    # LogParser handler
+    def on_header(self, names):
+        self.reset_vars()
+        self.has_finished = False
+        self.has_finished_total_call_time = None
+        self.has_finished_total_func_time = None
+        self.adflow_vars = ColumnStore(names + ['relRes'])
 
+    def on_iterations(self, lines):
+        # many rows at once are parsed with NumPy, the history file needs
+        # them one by one
+        if len(lines) >= self.vectorize_n_rows and not self.args.hist:
+            self.parse_adflow_var_columns(lines)
+            return
+        self.append_iterations(self.log_parser.tokenize_rows(lines))
 
-        # if len(self.adflow_vars) == 0:
-        if self.has_finished:
-            if len(self.stdout_lines) <= 3:
-                return
+    def append_iterations(self, rows):
+        # calculate relative convergence
+        i_total_res = self.adflow_vars.names.index('totalRes')
+        first = None
+        if self.adflow_vars.n_rows > 0:
+            first = self.adflow_vars.raw('totalRes', 0)
+            if isinstance(first, str):
+                first = 0.0
+
+        for values in rows:
+            total_res = values[i_total_res]
+            if isinstance(total_res, str):
+                total_res = 0.0
+            if first is None:
+                first = total_res
+                rel_res = 0.0
+            elif total_res != 0:
+                rel_res = first / total_res
+            else:
+                rel_res = float('inf')
+            values.append(float(rel_res))
 
-            # figure out if the line is a var description
-            var_desc_string = '#---------'
-            if (self.stdout_lines[-4][0:10] == var_desc_string and
-                self.stdout_lines[-3][0:10] == '#  Grid  |' and
-                self.stdout_lines[-2][0:10] == '#  level |' and
-                self.stdout_lines[-1][0:10] == var_desc_string):
-                # reset vars
-                self.reset_vars()
-                self.has_finished = False
-                self.has_finished_total_call_time = None
-                self.has_finished_total_func_time = None
-
-                # parse new vars
-                adflow_vars = self.parse_adflow_var_names(self.stdout_lines[-3:-1])
-                self.adflow_vars = adflow_vars
-                self.adflow_vars_raw = copy.deepcopy(adflow_vars)
-            # return
-
-        # figure out if this is an iteration ouput
-        if self.stdout_lines[-1][0:5] == '     ':
-            self.parse_adflow_var_values(self.stdout_lines[-1])
+            self.adflow_vars.append_row(values)
 
             # write the history File
             if self.args.hist:
                 self.write_history()
 
-        # figure out if the end has been reached
-        if self.stdout_lines[-1] == '#':
-            # save stuff
-            self.has_finished = True
-
-            # close history file
-            if self.hist_file is not None:
-                self.hist_file.close()
-                self.hist_file = None
-
-
-        # if adflow has finished, figure out how long it took
-        if self.has_finished:
-            if self.stdout_lines[-1][0:17] == '| Total Call Time':
-                tmp1 = self.stdout_lines[-1].split(':')[1]
-                self.has_finished_total_call_time = str2number(tmp1.split()[0])
-
-            if self.stdout_lines[-1][0:32] == '| Total Function Evaluation Time':
-                tmp1 = self.stdout_lines[-1].split(':')[1]
-                self.has_finished_total_func_time = str2number(tmp1.split()[0])
-
-    def parse_adflow_var_values(self, stdout_lines):
-        bits = stdout_lines.split()
-
-        n = 0
-        for adflow_var in self.adflow_vars:
-            if adflow_var == 'relRes':
-                continue
+    def on_finished(self):
+        self.has_finished = True
 
-            bit = str2number(bits[n])
-            self.adflow_vars_raw[adflow_var].append(bit)
-            self.adflow_vars[adflow_var].append(bit)
+        # close history file
+        if self.hist_file is not None:
+            self.hist_file.close()
+            self.hist_file = None
 
-            if isinstance(bit, str):
-                self.adflow_vars[adflow_var][-1] = 0.0
+    def on_timing(self, name, value):
+        if name == 'call':
+            self.has_finished_total_call_time = value
+        elif name == 'func':
+            self.has_finished_total_func_time = value
 
-            # self.adflow_vars[adflow_var].append(str_to_number(bits[n]))
-            n += 1
+    def on_aero_problem(self, name):
+        # the name of the first AeroProblem
+        if self.ap_name == '':
+            self.ap_name = name
+
+    def parse_adflow_var_values(self, stdout_line):
+        n_vars = len(self.adflow_vars) - 1
+        self.append_iterations([RowTokenizer(n_vars)(stdout_line)])
+
+    def parse_adflow_var_columns(self, rows, adflow_vars=None):
+        # parses many iteration rows (bytes or str) at once. The result is the
+        # same as parse_adflow_var_values for every single row.
+        import numpy as np
+
+        if adflow_vars is None:
+            adflow_vars = self.adflow_vars
+
+        def split(rows):
+            if len(rows) > 0 and isinstance(rows[0], str):
+                return ' '.join(rows).encode('utf-8').split()
+            return b' '.join(rows).split()
+
+        n_vars = len(adflow_vars) - 1
+        tokens = split(rows)
+        if len(tokens) != len(rows) * n_vars:
+            # some rows are broken, skip them
+            rows = [row for row in rows if len(row.split()) == n_vars]
+            tokens = split(rows)
+        if len(rows) == 0:
+            return
+        table = np.array(tokens).reshape(len(rows), n_vars)
+
+        columns = OrderedDict()
+        for adflow_var, column in zip(adflow_vars, table.T):
+            # only a column that starts with an int can be all ints
+            if isinstance(str2number(column[0].decode('utf-8')), int):
+                try:
+                    columns[adflow_var] = column.astype(np.int64)
+                    continue
+                except ValueError:
+                    pass
+            try:
+                columns[adflow_var] = column.astype(float)
+            except ValueError:
+                # there are only a few different strings in a column,
+                # like the iteration types
+                unique, inverse = np.unique(column, return_inverse=True)
+                unique_values = [str2number(bit.decode('utf-8')) for bit in unique]
+                columns[adflow_var] = (unique_values, inverse)
 
         # calculate relative convergence
-        if len(self.adflow_vars['totalRes']) > 1:
-            rel_conv = self.adflow_vars['totalRes'][0] / self.adflow_vars['totalRes'][-1]
+        total_res = columns['totalRes']
+        if isinstance(total_res, tuple):
+            total_res = np.array([
+                0.0 if isinstance(value, str) else value
+                for value in total_res[0]], dtype=float)[total_res[1]]
+        total_res = total_res.astype(float)
+        if adflow_vars.n_rows > 0:
+            first = adflow_vars['totalRes'][0]
         else:
-            rel_conv = 0.0
+            first = total_res[0]
+        rel_res = first / total_res
+        if adflow_vars.n_rows == 0:
+            rel_res[0] = 0.0
+        columns['relRes'] = rel_res
 
-        self.adflow_vars_raw['relRes'].append(rel_conv)
-        self.adflow_vars['relRes'].append(rel_conv)
+        adflow_vars.extend(columns)
 
     def parse_adflow_var_names(self, stdout_lines):
-        # split all lines
-        var_bits = []
-        for line in stdout_lines:
-            var_bits.append(line[1:-1].split('|')) # split and remove first '#'
-
-        # create variables from lines
-        adflow_vars = []
-        n = 0
-        for line in var_bits:
-            m = 0
-            for bit in line:
-                bit_stripped = bit.strip()
-                bit_stripped = bit_stripped.replace(' ', '_')
-                if n == 0:
-                    adflow_vars.append(bit_stripped)
-                else:
-                    if bit_stripped != '':
-                        adflow_vars[m] += '_' + bit_stripped
-                m += 1
-            n += 1
-
-        # convert it to a ordered dict that is empty
-        adflow_vars_dict = OrderedDict()
-        for adflow_var in adflow_vars:
-            adflow_vars_dict[adflow_var] = []
-
-        # add relative convergence
-        adflow_vars_dict['relRes'] = []
-
-        return adflow_vars_dict
+        # an empty store for the iterations, with the relative convergence
+        return ColumnStore(parse_var_names(stdout_lines) + ['relRes'])
 
     def write_history(self):
-        if len(self.adflow_vars_raw) == 0:
+        if len(self.adflow_vars) == 0:
             return False
 
         delimeter = str(self.args.histDel)
@@ -1148,19 +1651,19 @@ class ADflowData():
             self.hist_file = open(filename, 'w')
 
             header_str = ''
-            for key in self.adflow_vars_raw.keys():
+            for key in self.adflow_vars.keys():
                 header_str += key + delimeter
             self.hist_file.write(header_str + '\n')
 
         # write iteration
-        if len(self.adflow_vars_raw['Iter']) > 0:
+        if len(self.adflow_vars['Iter']) > 0:
             iter_str = ''
-            for value in self.adflow_vars_raw.values():
-                iter_str += str(value[-1]) + delimeter
+            for value in self.adflow_vars.raw_row(-1):
+                iter_str += str(value) + delimeter
             self.hist_file.write(iter_str + '\n')
 
             # flush only all xx iterations
-            if len(self.adflow_vars_raw['Iter']) % self.flush_hist_n == 0:
+            if len(self.adflow_vars['Iter']) % self.flush_hist_n == 0:
                 self.hist_file.flush()
 
 
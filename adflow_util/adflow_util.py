@@ -1,55 +1,68 @@
 from tabulate import tabulate
 import numpy as np
 import os
-from os import listdir
-from os.path import isfile, join
 import copy
-
-
-# ADFLOW_AVAIL existst so this script can be testet on a windows machine
-try:
-    from adflow import ADFLOW
-    from baseclasses import *
-    from mpi4py import MPI
-    ADFLOW_AVAIL = True
-except ImportError:
-    print('Could not import adflow. Only ADFLOW_AVAIL available.')
-    ADFLOW_AVAIL = False
-
-# This values can not be iterated on as they are allowed to be arreys
-is_arraylike = [
-    'coefPol',
-    'cosCoefFourier',
-    'sinCoefFourier',
-    'momentAxis',
-    'solverOptions',
-    'evalFuncs'
-]
-
-
-class Error(Exception):
+from collections import OrderedDict
+
+from .error import Error
+from .sweep_plan import SweepPlan
+from .results import ResultsStore, same_point
+from .cache import ResultCache, hash_file
+from .timing import PhaseTimer
+from .restart import RestartIndex
+from .output import Output
+
+
+# ADFLOW_AVAIL existst so this script can be testet on a windows machine.
+# ADflow, baseclasses and mpi4py are only imported, once the first
+# ADFLOW_UTIL is created. Importing this package (for example to run
+# adflow_plot on a login node) does not pay for them.
+ADFLOW_AVAIL = False
+ADFLOW = None
+AeroProblem = None
+MPI = None
+_ADFLOW_LOADED = False
+
+
+def _load_adflow():
+    global ADFLOW_AVAIL, ADFLOW, AeroProblem, MPI, _ADFLOW_LOADED
+    if _ADFLOW_LOADED:
+        return
+    _ADFLOW_LOADED = True
+
+    try:
+        from adflow import ADFLOW
+        from baseclasses import AeroProblem
+        from mpi4py import MPI
+        ADFLOW_AVAIL = True
+    except ImportError:
+        print('Could not import adflow. Only ADFLOW_AVAIL available.')
+        ADFLOW_AVAIL = False
+
+
+def extrapolation_weights(positions, position):
     """
-    Format the error message in a box to make it clear this
-    was a explicitly raised exception.
+    Returns the lagrange weights to extrapolate from values at the given
+    positions to a new position, or None if two positions are the same.
     """
-
-    def __init__(self, message):
-        msg = '\n+'+'-'*78+'+'+'\n' + '| adflow_util Error: '
-        i = 14
-        for word in message.split():
-            if len(word) + i + 1 > 78:  # Finish line and start new one
-                msg += ' '*(78-i)+'|\n| ' + word + ' '
-                i = 1 + len(word)+1
-            else:
-                msg += word + ' '
-                i += len(word)+1
-        msg += ' '*(78-i) + '|\n' + '+'+'-'*78+'+'+'\n'
-        print(msg)
-        Exception.__init__(self)
+    weights = []
+    for i, position_i in enumerate(positions):
+        weight = 1.0
+        for j, position_j in enumerate(positions):
+            if i == j:
+                continue
+            if position_i == position_j:
+                return None
+            weight *= (position - position_j) / (position_i - position_j)
+        weights.append(weight)
+    return weights
 
 
 class ADFLOW_UTIL:
     def __init__(self, aeroOptions, solverOptions, options=None):
+        # the solver stack is only needed from here on
+        _load_adflow()
+
         self.aeroOptions = aeroOptions
         self.solverOptions = solverOptions
 
@@ -62,12 +75,20 @@ class ADFLOW_UTIL:
             # solver kicks in before the residual can climb cause NK to diverge
             "resetAP": False,
 
-            # If ADflow automatically should restart if a restart-file with the
-            # exact Name is found.  the script looks in the output folder for
-            # the restart file "disableNumberSolutions" must be set to "True"
-            # to use this function
+            # If ADflow automatically should restart from a restart-file in the
+            # output folder. The file of the exact same point is used if it
+            # exists, otherwise the one of the closest point of the sweep.
+            # "disableNumberSolutions" must be set to "True" to use this
+            # function
             "autoRestart": False,
 
+            # Disk quota in bytes for the volume solutions of "autoRestart".
+            # If they get larger, the solutions furthest away from the points
+            # still to be solved are deleted (the least recently used ones
+            # first, if they are equally far). None means no limit. With
+            # "nGroups" > 1, every group gets an equal part of it.
+            "restartQuota": None,
+
             # this automatically disables numbering of solutions. Usually it is
             # okey, because adflow_util picks a unique name by its own
             "disableNumberSolutions": True,
@@ -85,6 +106,90 @@ class ADFLOW_UTIL:
             #   n:              Which run it is (0-based)
             "preRunCallback": None,
             "postRunCallback": None,
+
+            # Splits MPI.COMM_WORLD into this many groups. Every group gets
+            # its own ADflow instance and solves its own share of the sweep
+            # points. The results are gathered on rank 0 at the end of the
+            # run and written to a single '.out' file.
+            "nGroups": 1,
+
+            # How the sweep variables (lists in aeroOptions) are combined:
+            #   'zip':      the n-th point takes the n-th value of every list
+            #   'product':  every combination of all lists (full factorial)
+            #   'lhs':      latin hypercube sampling of "nSamples" points
+            #   'sobol':    sobol sequence of "nSamples" points
+            # For 'lhs' and 'sobol' every list holds the bounds [min, max]
+            "sweepPlan": 'zip',
+            "nSamples": None,
+            "sampleSeed": 0,
+
+            # The order in which the points are solved:
+            #   'input':    as they are defined in aeroOptions
+            #   'nearest':  every point is solved right after its closest
+            #               neighbour, so a restarted solve (resetAP=False)
+            #               starts from a similar flow state. The results are
+            #               still written in the original order.
+            "pointOrder": 'input',
+
+            # Directory of a persistent result cache. If it is set, every
+            # solved point is stored there and a point that has been solved
+            # before (same AeroProblem, solver options and grid) is not
+            # solved again. "cacheMaxSize" is the size limit in bytes, above
+            # it the entries used least recently are deleted. The cache needs
+            # the 'gridFile' solver option, without it the cache is disabled.
+            "cacheDirectory": None,
+            "cacheMaxSize": 100e6,
+
+            # Continue an interrupted sweep. The points found in
+            # '<name>.jsonl' are loaded and not solved again. The first point
+            # that is solved restarts from the volume solution of the last
+            # finished one, if there is one.
+            "resume": False,
+
+            # Adaptive refinement of a polar. The sweep starts with the values
+            # of the (single) sweep variable given in aeroOptions. Then new
+            # points are inserted in the middle of the interval where one of
+            # the "adaptiveFuncs" (for example ['cl', 'cd', 'cmz']) is the
+            # furthest away from a straight line. This is repeated until this
+            # error (relative to the range of the func) is below
+            # "adaptiveTol", or "adaptiveBudget" points have been inserted.
+            "adaptiveFuncs": None,
+            "adaptiveTol": 1e-3,
+            "adaptiveBudget": 10,
+
+            # Builds the initial guess of a point by extrapolating the flow
+            # states of the last converged points along the sweep:
+            #   0:  off, the point starts from the state of the last one
+            #   1:  linear extrapolation of the last two states
+            #   2:  quadratic extrapolation of the last three states
+            # Can not be used together with "resetAP".
+            "stateExtrapolation": 0,
+
+            # If a point fails (NaNs, ADflow fail flags or "failTol" not
+            # reached), it is solved again from free stream with every entry
+            # of this list until it does not fail anymore. Every entry is a
+            # dict of ADflow options, for example:
+            #   [{'CFL': 0.5}, {'CFL': 0.2, 'nCycles': 2000}]
+            # A smaller 'nCycles' lets hopeless attempts stop early. If all
+            # entries fail, the point is marked as failed in the summary.
+            "retryOptions": [],
+
+            # A point also fails, if its final totalRes relative to the
+            # initial one is larger than this. None means no check.
+            "failTol": None,
+
+            # Solves a point in chunks of this many cycles and checks the
+            # residual after every chunk. If it is NaN or larger than
+            # "divergenceTol" times the initial one, the solve stops right
+            # away instead of running all 'nCycles'. None solves in one go.
+            # Every chunk is a new ADflow call, so the CFL ramp (and ANK)
+            # starts again with every chunk.
+            "divergenceCycles": None,
+            "divergenceTol": 1e2,
+
+            # Writes the wall-clock and CPU time of every phase of every point
+            # (min, max and mean over all ranks) to '<name>_timing.json'.
+            "timing": False,
         }
 
         # Get keys for every option
@@ -95,46 +200,365 @@ class ADFLOW_UTIL:
         self._checkOptions(options, defaultOptions)
 
         self.CFDSolver = None
-
+        self.sweepPlan = None
+        self.comm = None
+        self.group = 0
+        self.output = Output()
+
+        self.resultsStore = None
+        self.resumeRestartFile = None
+        self.stateHistory = []
+        self.iterTot = 0
+        self.resultCache = None
+        self.cacheEnabled = False
+        self.restartIndex = None
+        self.pendingPoints = []
+        self.timer = PhaseTimer()
+        self.gridHash = None
         self.funcs_data = []
 
     def run(self):
         # init stuff
         self.check_ap_input()
+        self.create_comm()
         self.create_solver()
         self.create_aeroProblem()
+        self.create_results_store()
+        self.create_result_cache()
+        self.create_restart_index()
+
+        # loop through all design points of this group
+        schedule = self.sweepPlan.schedule(self.options['pointorder'])
+        completed = dict((result['n'], result) for result in self.funcs_data)
+        group_points = [schedule[k] for k in self.get_group_points(len(schedule))]
+        for i, n in enumerate(group_points):
+            # the points still to come decide which restart files to keep
+            self.pendingPoints = [m for m in group_points[i + 1:] if m not in completed]
+
+            # skip the points that have been solved before the resume
+            if n in completed:
+                if not completed[n].get('failed', False):
+                    self.resumeRestartFile = completed[n].get('restartFile')
+                continue
 
-        # run loop
-        arrays = self.find_array_aeroOptions()
-
-        # loop through all design points
-        if len(arrays) > 0:
-            for n in range(len(self.aeroOptions[arrays[0]])):
-                # reset AP
-                if self.options['resetap']:
+            # reset AP
+            if self.options['resetap']:
+                with self.timer.phase(n, 'aeroProblem'):
                     self.create_aeroProblem()
-                self.run_point(n)
-        else:
-            self.run_point()
+            self.run_point(n)
+        self.pendingPoints = []
+
+        # insert points where the polar needs them
+        if self.options['adaptivefuncs'] is not None:
+            self.run_adaptive()
+
+        # collect the results of all groups on rank 0, only it writes them
+        if self.options['ngroups'] > 1:
+            self.gather_results()
+        self.write_summary()
+
+        if self.options['timing']:
+            self.write_timing()
+
+    def write_timing(self):
+        # the statistics are collected over all ranks of all groups
+        profile = self.timer.profile(self.output.comm)
+        self.output.write_json(
+            self.options['name'] + '_timing.json', {'points': profile})
+
+    def run_adaptive(self):
+        for m in range(self.options['adaptivebudget']):
+            value = self.find_adaptive_point()
+            if value is None:
+                break
+
+            # add the new point to the sweep
+            self.aeroOptions[self.sweepPlan.names[0]].append(value)
+            self.create_sweep_plan()
+
+            n = len(self.sweepPlan) - 1
+            if self.options['resetap']:
+                with self.timer.phase(n, 'aeroProblem'):
+                    self.create_aeroProblem()
+            self.run_point(n)
 
-    def run_point(self, n=0):
-        ap_arrays = self.find_array_aeroOptions()
+    def find_adaptive_point(self):
+        """
+        Returns the value of the sweep variable where the next point should
+        be inserted, or None if the polar is fine enough.
+        """
+        name = self.sweepPlan.names[0]
+        results = [
+            result for result in self.funcs_data if not result.get('failed', False)]
+        x = np.array([result['point'][name] for result in results], dtype=float)
+
+        # a value can be in the sweep more than once. Only one of its points
+        # is used, zero-length intervals would break the interpolation.
+        x, unique = np.unique(x, return_index=True)
+        results = [results[i] for i in unique]
+        if len(x) < 3:
+            return None
+
+        # error of every interval: how far the funcs at both ends are off
+        # a straight line through their neighbours
+        interval_error = np.zeros(len(x) - 1)
+        for func in self.options['adaptivefuncs']:
+            if func not in results[0]['funcs']:
+                raise Error(
+                    '"{}" from "adaptiveFuncs" is not in "evalFuncs".'.format(func))
+
+            f = np.array([result['funcs'][func] for result in results], dtype=float)
+            f_range = f.max() - f.min()
+            if f_range == 0:
+                continue
+
+            f_interp = f[:-2] + (f[2:] - f[:-2]) * (x[1:-1] - x[:-2]) / (x[2:] - x[:-2])
+            point_error = np.abs(f[1:-1] - f_interp) / f_range
+
+            interval_error[:-1] = np.maximum(interval_error[:-1], point_error)
+            interval_error[1:] = np.maximum(interval_error[1:], point_error)
 
-        # figure out how the name should be
-        name = self.options['name']
-        if len(ap_arrays) > 0:
-            for ar in ap_arrays:
-                name += "_{}{}".format(ar, self.aeroOptions[ar][n])
-        self.aeroProblem.name = name
+        # an interval where a point failed is done, another point in there
+        # would most likely fail as well. So is a value that has been tried.
+        failed = [
+            result['point'][name] for result in self.funcs_data
+            if result.get('failed', False)]
+        tried = set(float(value) for value in self.aeroOptions[name])
 
-        # set all AP variables
-        if len(ap_arrays) > 0:
-            for ar in ap_arrays:
-                setattr(self.aeroProblem, ar, self.aeroOptions[ar][n])
+        for i in np.argsort(-interval_error, kind='stable'):
+            if interval_error[i] < self.options['adaptivetol']:
+                return None
+            if any(x[i] < value < x[i + 1] for value in failed):
+                continue
+
+            value = float((x[i] + x[i + 1]) / 2)
+            if value not in tried:
+                return value
+        return None
+
+    def check_state_extrapolation(self):
+        order = self.options['stateextrapolation']
+        if order not in [0, 1, 2]:
+            raise Error('"stateExtrapolation" must be 0, 1 or 2.')
+
+        if order > 0 and self.options['resetap']:
+            raise Error('"stateExtrapolation" can not be used with "resetAP".')
+
+    def check_adaptive(self):
+        if self.options['adaptivefuncs'] is None:
+            return
+
+        if (self.sweepPlan.mode != 'zip' or len(self.sweepPlan.names) != 1 or
+                not isinstance(self.aeroOptions[self.sweepPlan.names[0]], list)):
+            raise Error('"adaptiveFuncs" needs exactly one sweep variable given as a list.')
+
+        if self.options['ngroups'] > 1:
+            raise Error('"adaptiveFuncs" can not be used with "nGroups" > 1.')
+
+        # new points are added to this list, the one of the user stays as is
+        name = self.sweepPlan.names[0]
+        self.aeroOptions[name] = list(self.aeroOptions[name])
+        self.create_sweep_plan()
+
+    def create_comm(self):
+        n_groups = self.options['ngroups']
+        if n_groups < 1:
+            raise Error('"nGroups" must be at least 1.')
+
+        if not ADFLOW_AVAIL:
+            if n_groups > 1:
+                raise Error('"nGroups" > 1 needs mpi4py and ADflow.')
+            return
+
+        world = MPI.COMM_WORLD
+        self.output = Output(world)
+        if n_groups > world.Get_size():
+            raise Error(
+                '"nGroups" can not be larger than the number of MPI processes.')
+
+        # neighbouring ranks end up in the same group, so a group usually
+        # stays on as few nodes as possible
+        self.group = world.Get_rank() * n_groups // world.Get_size()
+        if n_groups > 1:
+            self.comm = world.Split(self.group, world.Get_rank())
+        else:
+            self.comm = world
+
+    def get_group_points(self, n_points):
+        # every group gets a contiguous block of the schedule. This way the
+        # flow state carried over from one point to the next stays close
+        n_groups = self.options['ngroups']
+        start = self.group * n_points // n_groups
+        end = (self.group + 1) * n_points // n_groups
+        return range(start, end)
+
+    def gather_results(self):
+        # send the results of every group to rank 0. Only the root of each
+        # group contributes, the other ranks hold the same data
+        local = None
+        if self.is_group_root():
+            local = self.funcs_data
+        results = self.output.gather(local)
+
+        if not self.output.is_root():
+            return
+
+        # after a resume every group knows the points loaded from the store
+        funcs_data = OrderedDict()
+        for result in results:
+            if result is not None:
+                for point_result in result:
+                    funcs_data[point_result['n']] = point_result
+        self.funcs_data = list(funcs_data.values())
+
+    def is_group_root(self):
+        return self.comm is None or self.comm.Get_rank() == 0
+
+    def create_results_store(self):
+        # every point is streamed to '<name>.jsonl' as soon as it is solved.
+        # The '.out' file is only rendered from it at the end.
+        self.resultsStore = ResultsStore(self.options['name'] + '.jsonl')
+
+        if self.options['resume']:
+            self.load_results()
+            return
+
+        self.output.clear(self.resultsStore.filename)
+
+    def load_results(self):
+        # only rank 0 reads the store, everybody else gets a copy
+        records = None
+        if self.output.is_root():
+            self.resultsStore.repair()
+            records = self.resultsStore.read()
+        records = self.output.bcast(records)
+
+        # only take the points that still belong to the same sweep
+        plan = self.get_sweep_plan()
+        funcs_data = OrderedDict()
+        for record in records:
+            n = record.get('n')
+            if not isinstance(n, int) or n < 0 or n >= len(plan):
+                continue
+            if not same_point(record.get('point'), plan.point(n)):
+                continue
+            funcs_data[n] = record
+        self.funcs_data = list(funcs_data.values())
+
+    def create_restart_index(self):
+        if not self.options['autorestart']:
+            return
+
+        # every group gets its part of the quota and only deletes its own
+        # files. The files of earlier runs belong to the first group.
+        quota = self.options['restartquota']
+        if quota is not None:
+            quota /= self.options['ngroups']
+        self.restartIndex = RestartIndex(
+            self.solverOptions['outputDirectory'], self.options['name'],
+            self.sweepPlan.names, self.sweepPlan.spans(),
+            quota, owns_existing=self.group == 0)
+
+        # only the root of a group looks at the output directory
+        if self.is_group_root():
+            self.restartIndex.build()
+        if self.comm is not None:
+            self.restartIndex.entries = self.comm.bcast(
+                self.restartIndex.entries, root=0)
+
+    def evict_restart_files(self, keep=None):
+        # only the root of a group deletes files, the others are told which
+        evicted = None
+        if self.is_group_root():
+            plan = self.get_sweep_plan()
+            pending = [plan.point(n) for n in self.pendingPoints]
+            evicted = self.restartIndex.evict(pending, keep)
+        if self.comm is not None:
+            evicted = self.comm.bcast(evicted, root=0)
+            self.restartIndex.remove(evicted)
+        return evicted
+
+    def create_result_cache(self):
+        if self.options['cachedirectory'] is None:
+            return
+
+        # the grid is part of the key. ADflow options are case insensitive.
+        grid_file = None
+        for name, value in self.solverOptions.items():
+            if name.lower() == 'gridfile':
+                grid_file = value
+
+        # without the grid, a result of an other grid could be taken
+        if ADFLOW_AVAIL and grid_file is None:
+            if self.output.is_root():
+                print('No "gridFile" in solverOptions, the result cache is disabled.')
+            return
+        self.cacheEnabled = True
+
+        # only the root of a group touches the cache, the others get the
+        # answers broadcasted
+        if self.is_group_root():
+            self.resultCache = ResultCache(
+                self.options['cachedirectory'], self.options['cachemaxsize'])
+            if grid_file is not None:
+                self.gridHash = hash_file(grid_file)
+        if self.comm is not None:
+            self.gridHash = self.comm.bcast(self.gridHash, root=0)
+
+    def get_cache_key(self, n):
+        return self.resultCache.key(
+            self.get_sweep_plan().kwargs(n), self.solverOptions, self.gridHash)
+
+    def get_cached_result(self, n):
+        result = None
+        if self.resultCache is not None:
+            result = self.resultCache.get(self.get_cache_key(n))
+        if self.comm is not None:
+            result = self.comm.bcast(result, root=0)
+        return result
+
+    def run_point(self, n=0):
+        with self.timer.phase(n, 'aeroProblem'):
+            point = self.get_sweep_plan().point(n)
+
+            # figure out how the name should be
+            name = self.options['name']
+            for ar, value in point.items():
+                name += "_{}{}".format(ar, value)
+            self.aeroProblem.name = name
+
+            # set all AP variables
+            for ar, value in point.items():
+                setattr(self.aeroProblem, ar, value)
+
+        # if this point has been solved before, take the cached result
+        if self.cacheEnabled:
+            with self.timer.phase(n, 'cache'):
+                cached = self.get_cached_result(n)
+            if cached is not None:
+                cached['n'] = n
+                cached['point'] = point
+                with self.timer.phase(n, 'summary'):
+                    self.add_result(cached)
+                return
 
          # auto restart solution
+        temp_solverOptions = {}
         if self.options['autorestart']:
-            temp_solverOptions = self.auto_restart()
+            with self.timer.phase(n, 'autoRestart'):
+                temp_solverOptions = self.auto_restart(point)
+
+        # after a resume, continue from the last finished point
+        resume_restart = False
+        if self.resumeRestartFile is not None:
+            if (not self.options['resetap'] and
+                    'restartfile' not in temp_solverOptions and
+                    os.path.isfile(self.resumeRestartFile)):
+                temp_solverOptions['restartfile'] = self.resumeRestartFile
+                resume_restart = True
+            self.resumeRestartFile = None
+
+        if len(temp_solverOptions) > 0:
             # add solver options to existing onesj
             if 'adflow' not in self.aeroProblem.solverOptions:
                 self.aeroProblem.solverOptions = {'adflow': {}}
@@ -143,22 +567,208 @@ class ADFLOW_UTIL:
                 self.aeroProblem.solverOptions['adflow'][key] = value
 
         # solve
-        if ADFLOW_AVAIL:
+        funcs, failed = self.solve_point(point, n)
+
+        # the resume restart file is only for this very point
+        if resume_restart:
+            del self.aeroProblem.solverOptions['adflow']['restartfile']
+
+        with self.timer.phase(n, 'summary'):
+            result = self.add_funcs_data(funcs, n, failed)
+
+        # the solution of this point is a restart candidate from now on.
+        # Every rank adds it, so the index stays the same everywhere.
+        if self.restartIndex is not None and not failed and 'restartFile' in result:
+            self.restartIndex.add(
+                result['restartFile'], point, write=self.is_group_root())
+            if self.options['restartquota'] is not None:
+                with self.timer.phase(n, 'restartQuota'):
+                    self.evict_restart_files(result['restartFile'])
+
+        # failed points are not cached, so they are tried again next time
+        if self.resultCache is not None and not failed:
+            with self.timer.phase(n, 'cache'):
+                cached = dict(
+                    (key, value) for key, value in result.items()
+                    if key not in ['n', 'point'])
+                self.resultCache.put(self.get_cache_key(n), cached)
+
+    def solve_point(self, point, n=0):
+        """
+        Solves the AeroProblem and returns its funcs and if it failed.
+
+        If the solution fails, it is solved again from free stream with
+        every entry of "retryOptions", until it does not fail anymore.
+        """
+        if not ADFLOW_AVAIL:
+            with self.timer.phase(n, 'evalFunctions'):
+                funcs = self.eval_funcs()
+            return funcs, self.check_failed(funcs)
+
+        retries = self.options['retryoptions']
+        original_options = {}
+        for attempt in range(len(retries) + 1):
+            if attempt > 0:
+                # every entry starts from the original options
+                for key, value in original_options.items():
+                    self.CFDSolver.setOption(key, value)
+                for key, value in retries[attempt - 1].items():
+                    if key not in original_options:
+                        original_options[key] = self.CFDSolver.getOption(key)
+                    self.CFDSolver.setOption(key, value)
+
+                # do not start from the diverged state again
+                self.CFDSolver.resetFlow(self.aeroProblem)
+
             if self.options["preruncallback"] is not None:
-                self.options["preruncallback"](
-                        self.CFDSolver, self.aeroProblem, n
-                )
+                with self.timer.phase(n, 'preCallback'):
+                    self.options["preruncallback"](
+                            self.CFDSolver, self.aeroProblem, n
+                    )
 
-            self.CFDSolver(self.aeroProblem)
+            # build the initial guess from the last converged states
+            if attempt == 0 and self.options['stateextrapolation'] > 0:
+                with self.timer.phase(n, 'initialGuess'):
+                    self.extrapolate_state(point)
+
+            with self.timer.phase(n, 'solve'):
+                self.call_solver()
 
             if self.options["postruncallback"] is not None:
-                self.options["postruncallback"](
-                        self.CFDSolver, self.aeroProblem, n
-                )
+                with self.timer.phase(n, 'postCallback'):
+                    self.options["postruncallback"](
+                            self.CFDSolver, self.aeroProblem, n
+                    )
+
+            with self.timer.phase(n, 'evalFunctions'):
+                funcs = self.eval_funcs()
+            failed = self.check_failed(funcs)
+            if not failed:
+                break
+
+        # the next point starts with the original options again
+        for key, value in original_options.items():
+            self.CFDSolver.setOption(key, value)
+
+        # and not from the diverged state of this one
+        if failed:
+            self.CFDSolver.resetFlow(self.aeroProblem)
+
+        if self.options['stateextrapolation'] > 0 and not failed:
+            self.store_state(point)
 
-        self.write_summary(n)
+        return funcs, failed
 
-    def auto_restart(self):
+    def call_solver(self):
+        """
+        Runs ADflow on the AeroProblem. With "divergenceCycles", it runs in
+        chunks of that many cycles and stops as soon as it diverges.
+        """
+        chunk = self.options['divergencecycles']
+        if chunk is None:
+            self.CFDSolver(self.aeroProblem)
+            self.iterTot = int(self.CFDSolver.adflow.iteration.itertot)
+            return
+
+        n_cycles = self.CFDSolver.getOption('nCycles')
+        l2_convergence = self.CFDSolver.getOption('L2Convergence')
+        self.iterTot = 0
+        try:
+            for cycle in range(0, n_cycles, chunk):
+                # every chunk continues from the state of the last one. The
+                # solution is only written once, after the last chunk.
+                self.CFDSolver.setOption('nCycles', min(chunk, n_cycles - cycle))
+                self.CFDSolver(self.aeroProblem, writeSolution=False)
+                self.iterTot += int(self.CFDSolver.adflow.iteration.itertot)
+
+                total_res = self.CFDSolver.adflow.iteration.totalrfinal
+                total_res_0 = self.CFDSolver.adflow.iteration.totalr0
+                if not np.isfinite(total_res):
+                    break
+                if total_res > self.options['divergencetol'] * total_res_0:
+                    break
+                if total_res <= l2_convergence * total_res_0:
+                    break
+        finally:
+            self.CFDSolver.setOption('nCycles', n_cycles)
+
+        self.CFDSolver.writeSolution()
+
+    def check_failed(self, funcs):
+        # NaNs in the funcs
+        for value in funcs.values():
+            if not np.all(np.isfinite(value)):
+                return True
+
+        if not ADFLOW_AVAIL:
+            return False
+
+        # fail flags of ADflow
+        if getattr(self.aeroProblem, 'solveFailed', False):
+            return True
+        if getattr(self.aeroProblem, 'fatalFail', False):
+            return True
+
+        # the residual must be a number and low enough
+        total_res = self.CFDSolver.adflow.iteration.totalrfinal
+        if not np.isfinite(total_res):
+            return True
+
+        total_res_0 = self.CFDSolver.adflow.iteration.totalr0
+        if self.options['failtol'] is not None:
+            if total_res_0 > 0 and total_res / total_res_0 > self.options['failtol']:
+                return True
+
+        # a solve stopped by the divergence check
+        if self.options['divergencecycles'] is not None:
+            if total_res > self.options['divergencetol'] * total_res_0:
+                return True
+
+        return False
+
+    def extrapolate_state(self, point):
+        order = self.options['stateextrapolation']
+        if len(self.stateHistory) < order + 1:
+            return
+
+        # the positions along the line from the new point to the last one.
+        # If the sweep turned (for example at the end of a 'product' row),
+        # the points are not on one line and there is nothing to extrapolate
+        values = np.array(list(point.values()), dtype=float)
+        direction = self.stateHistory[-1][0] - values
+        length = np.linalg.norm(direction)
+        if length == 0:
+            return
+        direction /= length
+
+        positions = []
+        for state_point, states in self.stateHistory:
+            offset = state_point - values
+            position = np.dot(offset, direction)
+            if np.linalg.norm(offset - position * direction) > 1e-8 * np.linalg.norm(offset):
+                return
+            positions.append(position)
+
+        weights = extrapolation_weights(positions, 0.0)
+        if weights is None:
+            return
+
+        guess = 0.0
+        for weight, (state_point, states) in zip(weights, self.stateHistory):
+            guess = guess + weight * states
+
+        # switch to the new AP first, otherwise it would overwrite the guess
+        self.CFDSolver.setAeroProblem(self.aeroProblem)
+        self.CFDSolver.setStates(guess)
+
+    def store_state(self, point):
+        # keep as many converged states as the extrapolation needs
+        order = self.options['stateextrapolation']
+        values = np.array(list(point.values()), dtype=float)
+        self.stateHistory.append((values, self.CFDSolver.getStates()))
+        self.stateHistory = self.stateHistory[-(order + 1):]
+
+    def auto_restart(self, point=None):
         # only do this if there is nothing about restart in the solver options
         if 'solRestart' in self.solverOptions:
             if not self.solverOptions['solRestart']:
@@ -171,12 +781,24 @@ class ADFLOW_UTIL:
 
         temp_solverOptions = dict()
 
-        # look for the restart sol file
-        out_dir = self.solverOptions['outputDirectory']
-        out_file = os.path.join(out_dir, self.aeroProblem.name + '_vol.cgns')
-        if os.path.isfile(out_file):
-            temp_solverOptions['restartfile'] = out_file
-            # temp_solverOptions['solrestart'] = True
+        # look for the restart sol file of this point or the closest one
+        if self.restartIndex is not None:
+            if point is None:
+                point = self.get_sweep_plan().point(0)
+            # the root looks for the file, so the group agrees on it
+            out_file = None
+            if self.is_group_root():
+                write = self.options['restartquota'] is not None
+                out_file = self.restartIndex.find(point, write=write)
+            if self.comm is not None:
+                out_file = self.comm.bcast(out_file, root=0)
+            if out_file is not None:
+                temp_solverOptions['restartfile'] = out_file
+        else:
+            out_dir = self.solverOptions['outputDirectory']
+            out_file = os.path.join(out_dir, self.aeroProblem.name + '_vol.cgns')
+            if os.path.isfile(out_file):
+                temp_solverOptions['restartfile'] = out_file
 
         # make sure some needed adflow-options are saved
         temp_solverOptions['writevolumesolution'] = True
@@ -184,33 +806,88 @@ class ADFLOW_UTIL:
 
         return temp_solverOptions
 
-    def create_funcs_table(self, funcs, n=0):
-        header = []
-        data = []
-
-        # add array variables
-        arrays = self.find_array_aeroOptions()
-        for ar in arrays:
-            header.append(ar)
-            data.append(self.aeroOptions[ar][n])
+    def add_funcs_data(self, funcs, n=0, failed=False):
+        # one record per point
+        result = {
+            'n': n,
+            'point': self.get_sweep_plan().point(n),
+            'funcs': {},
+        }
 
         # add result
         for name, value in funcs.items():
-            header.append(name.replace(self.aeroProblem.name + '_', ''))
-            data.append(value)
+            result['funcs'][name.replace(self.aeroProblem.name + '_', '')] = value
+
+        if failed:
+            result['failed'] = True
 
         # add solver information
         if ADFLOW_AVAIL:
-            header.append('totalRes')
-            data.append(copy.copy(self.CFDSolver.adflow.iteration.totalrfinal))
-            header.append('iterTot')
-            data.append(copy.copy(int(self.CFDSolver.adflow.iteration.itertot)))
+            result['totalRes'] = copy.copy(self.CFDSolver.adflow.iteration.totalrfinal)
+            result['iterTot'] = self.iterTot
+
+            # remember the volume solution, a resumed sweep restarts from it.
+            # The solution of a failed point is no good restart.
+            restart_file = None
+            if not failed:
+                restart_file = self.get_volume_solution_file()
+            if restart_file is not None:
+                result['restartFile'] = restart_file
+
+        self.add_result(result)
+        return result
+
+    def add_result(self, result):
+        # add it to the global data array and stream it to the store
+        self.funcs_data.append(result)
+        if self.resultsStore is not None and self.is_group_root():
+            self.resultsStore.append(result)
+
+    def get_volume_solution_file(self):
+        # the file name is only known if the solutions are not numbered
+        if not self.options['disablenumbersolutions']:
+            return None
+
+        if not (self.options['autorestart'] or
+                self.CFDSolver.getOption('writeVolumeSolution')):
+            return None
 
-        # add it to the global data array
-        self.funcs_data.append(data)
+        out_dir = self.CFDSolver.getOption('outputDirectory')
+        return os.path.join(out_dir, self.aeroProblem.name + '_vol.cgns')
+
+    def create_funcs_table(self):
+        # collect the columns of all points
+        header = []
+        header_funcs = []
+        header_solver = []
+        for result in self.funcs_data:
+            for name in result['point']:
+                if name not in header:
+                    header.append(name)
+            for name in result['funcs']:
+                if name not in header_funcs:
+                    header_funcs.append(name)
+            for name in ['totalRes', 'iterTot', 'failed']:
+                if name in result and name not in header_solver:
+                    header_solver.append(name)
+
+        # the rows are always listed in the order of the sweep. An adaptive
+        # polar is sorted by the sweep variable instead.
+        def sort_key(result):
+            if self.options['adaptivefuncs'] is not None:
+                return tuple(result['point'].values())
+            return result['n']
+
+        data = []
+        for result in sorted(self.funcs_data, key=sort_key):
+            row = [result['point'].get(name, '') for name in header]
+            row += [result['funcs'].get(name, '') for name in header_funcs]
+            row += [result.get(name, '') for name in header_solver]
+            data.append(row)
 
         data_string = tabulate(
-            self.funcs_data, headers=header, floatfmt=".8f") + "\n"
+            data, headers=header + header_funcs + header_solver,
+            floatfmt=".8f") + "\n"
 
         return data_string
 
@@ -228,30 +905,30 @@ class ADFLOW_UTIL:
         return funcs
 
     def find_array_aeroOptions(self):
-        arrays = []
-        for name, value in self.aeroOptions.items():
-            if name in is_arraylike:
-                continue
-
-            if isinstance(value, (list, np.ndarray)):
-                arrays.append(name)
-        return arrays
+        # the sweep variables, as the sweep plan sees them
+        return list(self.build_sweep_plan().names)
 
     def check_ap_input(self):
-        # if one or more are arrays, all arrays should be the same legth
+        # the sweep plan checks the sweep variables while it is created.
+        # For 'zip', all arrays must be the same length.
+        self.create_sweep_plan()
+        self.check_adaptive()
+        self.check_state_extrapolation()
 
-        # find all arrays
-        arrays = self.find_array_aeroOptions()
+        return True
 
-        # if there are more arrays, check if they are the same length
-        if len(arrays) > 1:
-            a_length = len(self.aeroOptions[arrays[0]])
-            for name in arrays:
-                # check if they are the same length, if they can be array_like, it doesnt matter
-                if a_length != len(self.aeroOptions[name]) and not name in is_arraylike:
-                    raise Error('All sweep variables must be the same length.')
+    def build_sweep_plan(self):
+        return SweepPlan(
+            self.aeroOptions, self.options['sweepplan'],
+            self.options['nsamples'], self.options['sampleseed'])
 
-        return True
+    def create_sweep_plan(self):
+        self.sweepPlan = self.build_sweep_plan()
+
+    def get_sweep_plan(self):
+        if self.sweepPlan is None:
+            self.create_sweep_plan()
+        return self.sweepPlan
 
     def create_solver(self):
         # disable autmatic numbering of solution
@@ -260,14 +937,12 @@ class ADFLOW_UTIL:
 
         # only create solver if not ADFLOW_AVAIL
         if ADFLOW_AVAIL:
-            self.CFDSolver = ADFLOW(options=self.solverOptions)
+            # create output folder if it does not exist. Every rank waits
+            # until it is there.
+            if "outputDirectory" in self.solverOptions:
+                self.output.makedirs(self.solverOptions['outputDirectory'])
 
-            # create output folder if it does not exist
-            if MPI.COMM_WORLD.Get_rank() == 0:
-                if "outputDirectory" in self.solverOptions:
-                    out_dir = self.solverOptions['outputDirectory']
-                    if not os.path.exists(out_dir):
-                        os.makedirs(out_dir)
+            self.CFDSolver = ADFLOW(options=self.solverOptions, comm=self.comm)
 
             # create the surface families
             if self.options['surfacefamilygroups'] is not None:
@@ -275,7 +950,7 @@ class ADFLOW_UTIL:
                     self.CFDSolver.addFamilyGroup(group_name, surfaces)
 
     def create_aeroProblem(self):
-        kwargs = self.get_ap_kwargs()
+        kwargs = self.get_sweep_plan().kwargs()
 
         if ADFLOW_AVAIL:
             self.aeroProblem = AeroProblem(name=self.options['name'], **kwargs)
@@ -286,22 +961,14 @@ class ADFLOW_UTIL:
                 setattr(self.aeroProblem, name, value)
 
     def get_ap_kwargs(self, n=0):
-        kwargs = {}
-        for name, value in self.aeroOptions.items():
-            # if not name in iteratable:
-            #     continue
+        # the AeroProblem kwargs of point n, from the current aeroOptions.
+        # The plan of the sweep is left alone.
+        return self.build_sweep_plan().kwargs(n)
 
-            if isinstance(value, list) and not name in is_arraylike:
-                value_single = value[n]
-            else:
-                value_single = value
-
-            kwargs[name] = value_single
-
-        return kwargs
-
-    def write_summary(self, n=0):
-        file = open(self.options['name'] + '.out', 'w')
+    def write_summary(self):
+        # renders the human readable '.out' file from all results so far.
+        # Only rank 0 writes it, in one go.
+        file = self.output.buffer()
 
         # write options
         file.write(self.options['name'] + "\n\n")
@@ -318,12 +985,16 @@ class ADFLOW_UTIL:
             aero_data.append([name, value_str])
         file.write(tabulate(aero_data))
 
+        # write the sweep plan if it is not the default one
+        if self.sweepPlan is not None and self.sweepPlan.mode != 'zip':
+            file.write('\n\nSweep Plan: {} ({} points)'.format(
+                self.sweepPlan.mode, len(self.sweepPlan)))
+
         # write results
         file.write("\n\n\n RESULTS \n")
-        funcs = self.eval_funcs()
-        file.write(self.create_funcs_table(funcs, n))
+        file.write(self.create_funcs_table())
 
-        file.close()
+        self.output.write(self.options['name'] + '.out', file.getvalue())
 
     def _checkOptions(self, options, defaultOptions):
         """
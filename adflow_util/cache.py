@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import time
+
+from .results import _to_json
+
+
+# These solver options only change what is written to disk or printed, not
+# the result. They are left out of the cache key.
+cache_ignored_options = [
+    'outputdirectory',
+    'numbersolutions',
+    'printiterations',
+    'printtiming',
+    'printwarnings',
+    'monitorvariables',
+    'surfacevariables',
+    'volumevariables',
+    'isovariables',
+    'isosurface',
+    'outputsurfacefamily',
+    'writesurfacesolution',
+    'writevolumesolution',
+    'writetecplotsurfacesolution',
+    'solutionprecision',
+    'solutionprecisionsurface',
+    'restartfile',
+    'solrestart',
+    'storerindlayer',
+]
+
+
+def hash_file(filename, chunk_size=2**20):
+    # hashes the content of a file without reading it completely into memory
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent cache of solved points.
+
+    Every entry is stored in its own file '<key>.json', where the key is a
+    hash of everything that changes the result of a point. The file
+    'index.json' keeps track of the size and the last use of every entry.
+    If the cache gets larger than maxSize (in bytes), the entries used least
+    recently are deleted.
+
+    Several processes (the roots of the groups) can share a cache. Each of
+    them merges its index with the one on disk before writing it, so no
+    entry gets lost and maxSize holds for all of them together.
+    """
+
+    def __init__(self, directory, maxSize=None):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.index_file = os.path.join(directory, 'index.json')
+
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._read_index()
+        self.removed = set()
+
+    def key(self, ap_kwargs, solverOptions, grid_hash=None):
+        """
+        Returns the key of a point from its AeroProblem kwargs, the relevant
+        solver options and the hash of the grid file.
+        """
+        options = {}
+        for name, value in solverOptions.items():
+            if name.lower() not in cache_ignored_options:
+                options[name.lower()] = value
+
+        content = json.dumps(
+            [ap_kwargs, options, grid_hash], sort_keys=True,
+            default=_to_json_or_str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        # returns the cached result or None
+        if key not in self.index:
+            return None
+
+        try:
+            with open(self._entry_file(key), 'r') as file:
+                result = json.load(file)
+        except (OSError, ValueError):
+            # the entry is gone or broken, forget about it
+            del self.index[key]
+            self.removed.add(key)
+            self._write_index()
+            return None
+
+        self.index[key]['used'] = time.time()
+        self._write_index()
+        return result
+
+    def put(self, key, result):
+        content = json.dumps(result, default=_to_json)
+
+        # write to a temporary file first, so an entry is either complete
+        # or not there at all
+        entry_file = self._entry_file(key)
+        tmp_file = '{}.{}.tmp'.format(entry_file, os.getpid())
+        with open(tmp_file, 'w') as file:
+            file.write(content)
+        os.replace(tmp_file, entry_file)
+
+        self.index[key] = {'size': len(content), 'used': time.time()}
+        self.removed.discard(key)
+        self._write_index()
+
+    def size(self):
+        return sum(entry['size'] for entry in self.index.values())
+
+    def evict(self):
+        if self.maxSize is None:
+            return
+
+        # least recently used first
+        keys = sorted(self.index, key=lambda key: self.index[key]['used'])
+        total = self.size()
+        for key in keys:
+            if total <= self.maxSize:
+                break
+            total -= self.index[key]['size']
+            del self.index[key]
+            try:
+                os.remove(self._entry_file(key))
+            except OSError:
+                pass
+
+    def _entry_file(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def _load_index(self):
+        if not os.path.isfile(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _read_index(self):
+        index = self._load_index()
+
+        # entries can be missing in the index, if several processes wrote
+        # it at the same time. Add them and drop the ones that are gone.
+        entries = {}
+        for filename in os.listdir(self.directory):
+            key, ext = os.path.splitext(filename)
+            if ext != '.json' or filename == 'index.json':
+                continue
+            if key in index:
+                entries[key] = index[key]
+            else:
+                stat = os.stat(os.path.join(self.directory, filename))
+                entries[key] = {'size': stat.st_size, 'used': stat.st_mtime}
+        return entries
+
+    def _merge_index(self):
+        # take over what the other processes wrote in the meantime. An entry
+        # that is only known here is either new or has been deleted by an
+        # other process, its file tells which one.
+        index = self._load_index()
+        for key in self.removed:
+            index.pop(key, None)
+        for key, entry in self.index.items():
+            if key in index:
+                if entry['used'] > index[key]['used']:
+                    index[key] = entry
+            elif os.path.isfile(self._entry_file(key)):
+                index[key] = entry
+        self.index = index
+        self.removed = set()
+
+    def _write_index(self):
+        self._merge_index()
+        self.evict()
+
+        tmp_file = '{}.{}.tmp'.format(self.index_file, os.getpid())
+        with open(tmp_file, 'w') as file:
+            json.dump(self.index, file)
+        os.replace(tmp_file, self.index_file)
+
+
+def _to_json_or_str(value):
+    # the key only has to be stable, so anything unknown is hashed by its str
+    try:
+        return _to_json(value)
+    except TypeError:
+        return str(value)
@@ -0,0 +1,332 @@
+from collections import OrderedDict
+
+# numpy is imported with the first store that has columns (or the first
+# plot), so adflow_plot starts without it
+np = None
+
+
+def import_numpy():
+    # imports numpy once and returns it, plot.py uses it as well
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+class _Column:
+    """
+    One column of a ColumnStore.
+
+    The numbers are kept in a NumPy buffer (int64 as long as there are only
+    ints, float64 otherwise), which grows by doubling. Tokens that are not a
+    number (like '----' or 'ANK') are 0.0 in this buffer. Their value is kept
+    in "categories" and "codes" points to it, -1 means the entry is a
+    number. The codes are only allocated once the first token that is not a
+    number shows up.
+    """
+
+    def __init__(self, capacity):
+        self.values = np.zeros(capacity, dtype=np.int64)
+        self.codes = None
+        self.categories = []
+        self.category_codes = {}
+
+    def resize(self, capacity):
+        values = np.zeros(capacity, dtype=self.values.dtype)
+        values[:len(self.values)] = self.values[:capacity]
+        self.values = values
+
+        if self.codes is not None:
+            codes = np.full(capacity, -1, dtype=np.int32)
+            codes[:len(self.codes)] = self.codes[:capacity]
+            self.codes = codes
+
+    def to_float(self):
+        if self.values.dtype != np.float64:
+            self.values = self.values.astype(np.float64)
+
+    def code(self, value):
+        # the code of a value that is not a number
+        if self.codes is None:
+            self.codes = np.full(len(self.values), -1, dtype=np.int32)
+        code = self.category_codes.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self.category_codes[value] = code
+        return code
+
+    def set(self, i, value):
+        if isinstance(value, str):
+            code = self.code(value)
+            self.codes[i] = code
+            self.values[i] = 0
+            return
+
+        if isinstance(value, float):
+            self.to_float()
+        self.values[i] = value
+        if self.codes is not None:
+            self.codes[i] = -1
+
+    def set_categorical(self, start, end, values, inverse):
+        # values[inverse] are the entries start to end, values holds every
+        # different value once
+        codes = np.full(len(values), -1, dtype=np.int32)
+        numbers = np.zeros(len(values))
+        for i, value in enumerate(values):
+            if isinstance(value, str):
+                codes[i] = self.code(value)
+            else:
+                numbers[i] = value
+
+        if any(isinstance(value, float) for value in values):
+            self.to_float()
+        self.values[start:end] = numbers[inverse]
+        if self.codes is not None:
+            self.codes[start:end] = codes[inverse]
+
+
+class MinMaxPyramid:
+    """
+    The minimum and the maximum of a column over blocks of rows.
+
+    Level k has blocks of 2**k rows, every level is made from the one
+    below. So the extremes of any window can be read from a few blocks per
+    bin: a window of a million rows is reduced to a few hundred bins in the
+    time of a few hundred rows, and a single spike is never averaged away.
+
+    Only the last block of every level changes when rows are added, so
+    updating the pyramid takes about as long as the new rows.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self.dtype = None
+        self.mins = [None]   # mins[k] for level k, level 0 is the column
+        self.maxs = [None]
+        self.n_blocks = [0]
+
+    def update(self, values):
+        # brings the pyramid up to date with the column
+        import_numpy()
+        n = len(values)
+        if n < self.n_rows or values.dtype != self.dtype:
+            self.__init__()
+            self.dtype = values.dtype
+        if n == self.n_rows:
+            return
+
+        # the first block of each level that has changed
+        start = self.n_rows
+        mins = maxs = values
+        k = 1
+        while n > 2**(k - 1):
+            start //= 2
+            n_blocks = (n + 2**k - 1) // 2**k
+            if k == len(self.mins):
+                self.mins.append(np.empty(0, dtype=values.dtype))
+                self.maxs.append(np.empty(0, dtype=values.dtype))
+                self.n_blocks.append(0)
+            if len(self.mins[k]) < n_blocks:
+                self.grow(k, 2 * n_blocks)
+
+            # the blocks are made of pairs of the level below
+            pairs = np.arange(2 * start, len(mins), 2)
+            self.mins[k][start:n_blocks] = np.fmin.reduceat(mins[2 * start:], pairs - 2 * start)
+            self.maxs[k][start:n_blocks] = np.fmax.reduceat(maxs[2 * start:], pairs - 2 * start)
+            self.n_blocks[k] = n_blocks
+
+            mins = self.mins[k][:n_blocks]
+            maxs = self.maxs[k][:n_blocks]
+            k += 1
+        self.n_rows = n
+
+    def grow(self, k, capacity):
+        for levels in (self.mins, self.maxs):
+            level = np.empty(capacity, dtype=self.dtype)
+            level[:self.n_blocks[k]] = levels[k][:self.n_blocks[k]]
+            levels[k] = level
+
+    def window(self, start, stop, n_bins):
+        """
+        Reduces the rows start to stop to n_bins to 2 * n_bins bins, the
+        blocks of the highest level that gives enough of them. Returns the
+        first row, the minimum and the maximum of every bin. The first and
+        the last bin can reach a few rows beyond start and stop.
+        """
+        bin_size = max(int(stop - start) // n_bins, 2)
+        k = min(bin_size.bit_length() - 1, len(self.mins) - 1)
+        block = 2**k
+        first = start // block
+        last = min((stop + block - 1) // block, self.n_blocks[k])
+
+        rows = np.maximum(np.arange(first, last) * block, start)
+        return rows, self.mins[k][first:last], self.maxs[k][first:last]
+
+
+class ColumnStore:
+    """
+    Columnar storage of the parsed iterations.
+
+    It behaves like an OrderedDict of the column names to their values.
+    store[name] is a zero-copy view of the numbers of a column, where tokens
+    that are not a number are 0.0. The values as they were in the log (with
+    the tokens that are not a number) are returned by raw(). The buffers grow
+    by doubling, so appending a row is amortized O(1) and a long history
+    takes 8 bytes per value instead of two Python objects.
+
+    Appended rows are collected in a list first and moved to the buffers all
+    at once, as soon as the data is read.
+    """
+
+    def __init__(self, names=(), capacity=1024):
+        self.names = list(names)
+        self.capacity = capacity
+        self.columns = OrderedDict()
+        self.pending = []
+        self.pyramids = {}
+        self._n_rows = 0
+        if len(self.names) > 0:
+            import_numpy()
+            for name in self.names:
+                self.columns[name] = _Column(capacity)
+
+    # dict-like access
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def keys(self):
+        return list(self.names)
+
+    @property
+    def n_rows(self):
+        return self._n_rows + len(self.pending)
+
+    def __getitem__(self, name):
+        self.flush()
+        return self.columns[name].values[:self.n_rows]
+
+    def valid(self, name):
+        # True where the token was a number
+        self.flush()
+        codes = self.columns[name].codes
+        if codes is None:
+            return np.ones(self.n_rows, dtype=bool)
+        return codes[:self.n_rows] < 0
+
+    def pyramid(self, name):
+        # the min/max pyramid of a column, with the rows added since the
+        # last time
+        pyramid = self.pyramids.get(name)
+        if pyramid is None:
+            pyramid = self.pyramids[name] = MinMaxPyramid()
+        pyramid.update(self[name])
+        return pyramid
+
+    def raw(self, name, index):
+        # the value of a single entry, as it was in the log
+        if index < 0:
+            index += self.n_rows
+        if not 0 <= index < self.n_rows:
+            raise IndexError('row {} is not in the store'.format(index))
+        if index >= self._n_rows:
+            self.flush()
+
+        column = self.columns[name]
+        if column.codes is not None and column.codes[index] >= 0:
+            return column.categories[column.codes[index]]
+        return column.values[index].item()
+
+    def raw_column(self, name, start=0):
+        # all values of a column from start on, as they were in the log
+        self.flush()
+        column = self.columns[name]
+        values = column.values[start:self.n_rows].tolist()
+        if column.codes is not None:
+            codes = column.codes[start:self.n_rows]
+            for i in np.flatnonzero(codes >= 0).tolist():
+                values[i] = column.categories[codes[i]]
+        return values
+
+    def raw_row(self, index=-1):
+        return [self.raw(name, index) for name in self.names]
+
+    def append_row(self, values):
+        # appends one row, the values are in the order of the names
+        self.pending.append(values)
+
+    def flush(self):
+        # moves the appended rows to the buffers
+        if len(self.pending) == 0:
+            return
+        rows = self.pending
+        self.pending = []
+        self.extend(OrderedDict(zip(self.names, map(list, zip(*rows)))))
+
+    def extend(self, columns):
+        """
+        Appends many rows at once. columns is a dict of every name to its
+        values, one of:
+          - a NumPy array of numbers
+          - a list of values, some of which can be strings
+          - a tuple (values, inverse) where values[inverse] are the entries.
+            This is the fastest way for columns with a few different
+            strings.
+        All of them must have the same length.
+        """
+        self.flush()
+        if len(columns) == 0:
+            return
+        first = next(iter(columns.values()))
+        n_new = len(first[1]) if isinstance(first, tuple) else len(first)
+        if self.n_rows + n_new > self.capacity:
+            capacity = self.capacity
+            while capacity < self.n_rows + n_new:
+                capacity *= 2
+            self.grow(capacity)
+
+        start = self._n_rows
+        end = start + n_new
+        for name, values in columns.items():
+            column = self.columns[name]
+            if isinstance(values, tuple):
+                column.set_categorical(start, end, *values)
+                continue
+
+            if not isinstance(values, np.ndarray):
+                array = np.asarray(values)
+                if array.dtype.kind not in 'if':
+                    for i, value in enumerate(values, start):
+                        column.set(i, value)
+                    continue
+                values = array
+
+            if values.dtype.kind == 'f':
+                column.to_float()
+            column.values[start:end] = values
+            if column.codes is not None:
+                column.codes[start:end] = -1
+        self._n_rows = end
+
+    def grow(self, capacity):
+        for column in self.columns.values():
+            column.resize(capacity)
+        self.capacity = capacity
+
+    def nbytes(self):
+        # memory of all buffers
+        self.flush()
+        total = 0
+        for column in self.columns.values():
+            total += column.values.nbytes
+            if column.codes is not None:
+                total += column.codes.nbytes
+        return total
@@ -0,0 +1,143 @@
+import collections
+import itertools
+import tempfile
+from array import array
+
+
+class LineBuffer:
+    """
+    All lines ADflow has printed, with only the recent ones in memory.
+
+    It behaves like a list of strings, that can only be appended to. At
+    least the last "capacity" lines are kept in memory. Older lines are spilled in
+    batches to an anonymous temporary file, which is gone as soon as the
+    buffer is closed. The byte offset of every spilled line is kept, so any
+    line can still be read back for scrollback and search. The memory this
+    takes does not grow with the length of the session (apart from 8 bytes
+    per spilled line for its offset).
+    """
+
+    def __init__(self, capacity=10000, lines=()):
+        self.capacity = max(capacity, 1)
+
+        # lines are spilled in batches, so the file sees a few large writes
+        self.spill_batch = max(self.capacity // 4, 1)
+
+        self.lines = collections.deque()
+        self.spill_file = None
+        self.spill_offsets = array('q', [0])
+
+        self.extend(lines)
+
+    @property
+    def n_spilled(self):
+        return len(self.spill_offsets) - 1
+
+    def __len__(self):
+        return self.n_spilled + len(self.lines)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, end, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, end, step)]
+            return self.get_lines(start, end)
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('line {} is not in the buffer'.format(index))
+
+        n_spilled = self.n_spilled
+        if index >= n_spilled:
+            return self.lines[index - n_spilled]
+        return self.read_spilled(index, index + 1)[0]
+
+    def get_lines(self, start, end):
+        # the lines start to end (exclusive)
+        n_spilled = self.n_spilled
+        lines = self.read_spilled(start, min(end, n_spilled))
+        if end > n_spilled:
+            lines += itertools.islice(
+                self.lines, max(start - n_spilled, 0), end - n_spilled)
+        return lines
+
+    def __iter__(self):
+        # the spilled lines are read back in batches
+        for start in range(0, self.n_spilled, self.spill_batch):
+            yield from self.read_spilled(
+                start, min(start + self.spill_batch, self.n_spilled))
+        yield from list(self.lines)
+
+    def append(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= self.capacity + self.spill_batch:
+            self.spill(self.spill_batch)
+
+    def extend(self, lines):
+        self.lines.extend(lines)
+        while len(self.lines) >= self.capacity + self.spill_batch:
+            self.spill(self.spill_batch)
+
+    def spill(self, n):
+        # moves the n oldest lines from memory to the file
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile()
+
+        lines = [self.lines.popleft() for _ in range(n)]
+        text = '\n'.join(lines) + '\n'
+        data = text.encode('utf-8', 'surrogateescape')
+
+        # with only ASCII, the length of a line is its length in bytes
+        if len(data) == len(text):
+            lengths = map(len, lines)
+        else:
+            lengths = (len(line.encode('utf-8', 'surrogateescape')) for line in lines)
+        offset = self.spill_offsets[-1]
+        self.spill_offsets.extend(
+            itertools.accumulate((length + 1 for length in lengths), initial=offset))
+        del self.spill_offsets[-1 - n]
+
+        self.spill_file.seek(offset)
+        self.spill_file.write(data)
+
+    def read_spilled(self, start, end):
+        # the spilled lines start to end (exclusive)
+        if start >= end:
+            return []
+        self.spill_file.seek(self.spill_offsets[start])
+        data = self.spill_file.read(self.spill_offsets[end] - self.spill_offsets[start])
+        return data.decode('utf-8', 'surrogateescape').split('\n')[:-1]
+
+    def search(self, text, end=None):
+        """
+        Returns the index of the last line before end, that contains text.
+        -1 if there is none. The lines in memory are searched first, the
+        spilled ones are read back in batches from the newest on.
+        """
+        if end is None or end > len(self):
+            end = len(self)
+
+        n_spilled = self.n_spilled
+        lines = list(self.lines)[:max(end - n_spilled, 0)]
+        for n in range(len(lines) - 1, -1, -1):
+            if text in lines[n]:
+                return n_spilled + n
+
+        batch_end = min(end, n_spilled)
+        while batch_end > 0:
+            batch_start = max(batch_end - self.spill_batch, 0)
+            lines = self.read_spilled(batch_start, batch_end)
+            for n in range(len(lines) - 1, -1, -1):
+                if text in lines[n]:
+                    return batch_start + n
+            batch_end = batch_start
+        return -1
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def __del__(self):
+        self.close()
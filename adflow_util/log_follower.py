@@ -0,0 +1,213 @@
+import os
+import select
+import time
+
+# inotify events, see 'man inotify'
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+
+_file_mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF
+_dir_mask = IN_CREATE | IN_MOVED_TO
+
+
+class LogFollower:
+    """
+    Follows a growing log file, like 'tail -f' does, but without a process
+    or a thread.
+
+    New bytes are read in large chunks and handed out as complete lines.
+    On Linux, inotify tells when the file has changed, everywhere else the
+    file is polled. The polling interval grows while nothing happens and
+    drops back as soon as there is new data. inotify does not see writes of
+    other nodes on network file systems, so with inotify the file is still
+    polled every max_interval seconds. If the file gets truncated or
+    replaced by a new one (log rotation, a new job with the same log file),
+    it is read from the start again and "restarts" is increased.
+    """
+    chunk_size = 2**20
+
+    def __init__(self, filename, offset=0, use_inotify=True,
+                 min_interval=0.01, max_interval=1.0):
+        self.filename = filename
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        # byte offset of the first line that has not been handed out yet
+        self.offset = offset
+        self.restarts = 0
+
+        self.file = None
+        self.partial = b''
+        self.interval = min_interval
+        self.next_poll = 0.0
+
+        self.inotify_fd = None
+        self.file_watch = None
+        if use_inotify:
+            self._init_inotify()
+
+        self._open()
+
+    def fileno(self):
+        # the fd to wait on with select, if there is one
+        return self.inotify_fd
+
+    def read_lines(self):
+        """
+        Returns all complete lines (bytes, without the line break) that have
+        been written since the last call. It never blocks.
+        """
+        if not self._changed():
+            return []
+
+        if self.file is None and not self._open():
+            self._update_interval(False)
+            return []
+
+        data = self._read()
+        lines = self._split(data)
+
+        # the file could have been truncated or replaced in the meantime.
+        # What was left in the old one has been read above.
+        if self._truncated() or self._replaced():
+            self.restarts += 1
+            self.partial = b''
+            self.offset = 0
+            if self.file is not None or self._open():
+                new_data = self._read()
+                lines += self._split(new_data)
+                data += new_data
+
+        self._update_interval(len(data) > 0)
+        return lines
+
+    def _split(self, data):
+        # complete lines are handed out, the rest waits for its line break
+        if len(data) == 0:
+            return []
+        data = self.partial + data
+        end = data.rfind(b'\n') + 1
+        self.partial = data[end:]
+        self.offset += end
+        return [line.rstrip(b'\r') for line in data[:end].split(b'\n')[:-1]]
+
+    def wait(self, timeout):
+        # blocks until the file might have changed, at most timeout seconds
+        timeout = max(min(self.next_poll - time.monotonic(), timeout), 0.0)
+        if self.inotify_fd is not None:
+            select.select([self.inotify_fd], [], [], timeout)
+        else:
+            time.sleep(timeout)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+    def __del__(self):
+        self.close()
+
+    def _open(self):
+        try:
+            self.file = open(self.filename, 'rb')
+        except OSError:
+            self.file = None
+            return False
+
+        # a smaller file than the offset is not the one we were reading
+        if os.fstat(self.file.fileno()).st_size < self.offset:
+            self.offset = 0
+            self.restarts += 1
+        self.file.seek(self.offset)
+
+        if self.inotify_fd is not None:
+            self._add_file_watch()
+        return True
+
+    def _read(self):
+        chunks = []
+        while True:
+            chunk = self.file.read(self.chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def _truncated(self):
+        size = os.fstat(self.file.fileno()).st_size
+        if size >= self.offset + len(self.partial):
+            return False
+        self.file.seek(0)
+        return True
+
+    def _replaced(self):
+        # a different file under the same name. Everything of the old one has
+        # been read already.
+        try:
+            path_stat = os.stat(self.filename)
+        except OSError:
+            return False
+
+        file_stat = os.fstat(self.file.fileno())
+        if (path_stat.st_ino, path_stat.st_dev) == (file_stat.st_ino, file_stat.st_dev):
+            return False
+
+        self.file.close()
+        self.file = None
+        return True
+
+    def _changed(self):
+        # the file is looked at, if inotify says so or once per interval
+        changed = False
+        while self.inotify_fd is not None:
+            try:
+                events = os.read(self.inotify_fd, 4096)
+            except BlockingIOError:
+                break
+            if not events:
+                break
+            changed = True
+
+        return changed or time.monotonic() >= self.next_poll
+
+    def _update_interval(self, has_data):
+        if self.inotify_fd is not None:
+            self.interval = self.max_interval
+        elif has_data:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(2 * self.interval, self.max_interval)
+        self.next_poll = time.monotonic() + self.interval
+
+    def _init_inotify(self):
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            self._inotify_add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError, TypeError):
+            return
+
+        fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return
+        self.inotify_fd = fd
+
+        # the directory tells if the file is created or replaced
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        if self._inotify_add_watch(fd, directory.encode(), _dir_mask) < 0:
+            self.close()
+
+    def _add_file_watch(self):
+        # a new watch for a new file, the old one is gone with the old file
+        self.file_watch = self._inotify_add_watch(
+            self.inotify_fd, self.filename.encode(), _file_mask)
@@ -0,0 +1,253 @@
+"""
+A streaming parser of the ADflow output.
+
+It does not depend on curses or the plot, so anything that reads ADflow
+output (a pipe, a log file, a replay) can use it.
+"""
+import re
+
+# states of the parser
+STATE_OUTPUT = 0        # between the runs, a header is looked for
+STATE_HEADER_GRID = 1   # after the first '#-----' line of a header
+STATE_HEADER_LEVEL = 2  # after the '#  Grid  |' line
+STATE_HEADER_END = 3    # after the '#  level |' line
+STATE_ITERATIONS = 4    # after the header, until the end marker '#'
+
+_header_line = '#---------'
+_grid_line = '#  Grid  |'
+_level_line = '#  level |'
+_ap_name_line = '|  Switching to Aero Problem:'
+_call_time_line = '| Total Call Time'
+_func_time_line = '| Total Function Evaluation Time'
+
+# to find the blocks of a log file without reading it line by line
+var_desc_pattern = re.compile(
+    rb'#---------.*\n#  Grid  \|.*\n#  level \|.*\n#---------.*\n')
+ap_name_string = b'|  Switching to Aero Problem:'
+
+
+def str2number(s):
+    # converts a string to int or float if possible
+    # if it is neither, it returns the string itself
+
+    # check fo int
+    is_int = False
+    if s[0] in ('-', '+'):
+        is_int = s[1:].isdigit()
+    else:
+        is_int = s.isdigit()
+
+    if is_int:
+        return int(s)
+
+    # check for float
+    try:
+        return float(s)
+    except ValueError:
+        return s
+
+
+def find_lines(data, string, start, end):
+    # returns the start of every line in data[start:end] that begins with
+    # string. bytes.find is a lot faster than a regex with re.M.
+    positions = []
+    if data[start:start + len(string)] == string:
+        positions.append(start)
+    string = b'\n' + string
+    i = data.find(string, start, end)
+    while i >= 0:
+        positions.append(i + 1)
+        i = data.find(string, i + 1, end)
+    return positions
+
+
+def count_lines(data, string, start, end, chunk_size=2**24):
+    # counts the lines in data[start:end] that begin with string (not the
+    # first one). data is copied in chunks that end at a line break, so no
+    # line is split and a large mmap is never copied at once.
+    string = b'\n' + string
+    count = 0
+    while start < end:
+        stop = end
+        if end - start > chunk_size:
+            stop = data.rfind(b'\n', start + 1, start + chunk_size)
+            if stop < 0:
+                stop = end
+        count += data[start:stop].count(string)
+        start = stop
+    return count
+
+
+def parse_var_names(lines):
+    # the variable names from the '#  Grid  |' and '#  level |' lines
+    var_bits = []
+    for line in lines:
+        var_bits.append(line[1:-1].split('|')) # split and remove first '#'
+
+    names = []
+    for n, line in enumerate(var_bits):
+        for m, bit in enumerate(line):
+            bit_stripped = bit.strip().replace(' ', '_')
+            if n == 0:
+                names.append(bit_stripped)
+            elif bit_stripped != '':
+                names[m] += '_' + bit_stripped
+    return names
+
+
+class RowTokenizer:
+    """
+    Turns an iteration row into its values, the same ones str2number gives.
+
+    The type of every column is taken from the first row: ints and floats
+    are converted with int() and float() directly. Columns with strings
+    (like the iteration type) remember every string they have seen, so
+    they do not need a failing float() each time. If a row does not fit
+    the types, it is converted token by token with str2number.
+    """
+
+    def __init__(self, n_vars):
+        self.n_vars = n_vars
+        self.converters = None
+
+    def __call__(self, line):
+        tokens = line.split()
+        if len(tokens) < self.n_vars:
+            raise IndexError('the iteration has too few values')
+        del tokens[self.n_vars:]
+
+        if self.converters is None:
+            self.converters = [self.compile(token) for token in tokens]
+
+        try:
+            return [convert(token) for convert, token in zip(self.converters, tokens)]
+        except ValueError:
+            return [str2number(token) for token in tokens]
+
+    @staticmethod
+    def compile(token):
+        value = str2number(token)
+        if isinstance(value, int):
+            return int
+        if isinstance(value, float):
+            return float
+
+        strings = {}
+        def convert(token):
+            value = strings.get(token)
+            if value is None:
+                value = str2number(token)
+                if isinstance(value, str):
+                    strings[token] = value
+            return value
+        return convert
+
+
+class LogParser:
+    """
+    Parses the ADflow output line by line, with a state for every part of
+    it: the output between the runs, the lines of the header and the
+    iterations of a run. A line is only compared with what can come next
+    in the current state, nothing is looked at twice.
+
+    What has been found is passed to the handler, which needs these
+    methods:
+        on_header(names)        a run with these variables has started
+        on_iterations(lines)    iteration rows, as they are in the output
+        on_finished()           the run has finished
+        on_timing(name, value)  'call' or 'func' time of the last run
+        on_aero_problem(name)   ADflow switched to this AeroProblem
+
+    The iteration rows are handed over together, when the run has finished
+    or all lines given to feed_lines have been parsed. This way, the
+    handler can convert many of them at once (see
+    ADflowData.parse_adflow_var_columns) or a few with tokenize_rows.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.state = STATE_OUTPUT
+        self.header_lines = []
+        self.tokenizer = None
+
+    def reset(self):
+        # a new output starts, like a new job in the same log file
+        self.state = STATE_OUTPUT
+        self.header_lines = []
+
+    def set_header(self, names):
+        # continues with the iterations of a run with these variables
+        self.tokenizer = RowTokenizer(len(names))
+        self.state = STATE_ITERATIONS
+
+    def tokenize_rows(self, lines):
+        # the values of iteration rows of the current run
+        rows = []
+        for line in lines:
+            try:
+                rows.append(self.tokenizer(line))
+            except IndexError:
+                # a broken row, like the last one of a crashed run
+                pass
+        return rows
+
+    def feed(self, line):
+        self.feed_lines((line,))
+
+    def feed_lines(self, lines):
+        rows = []
+        for line in lines:
+            # the iterations come first, they are by far the most lines
+            if self.state == STATE_ITERATIONS:
+                if line[0:5] == '     ':
+                    rows.append(line)
+                    continue
+                if line == '#':
+                    if len(rows) > 0:
+                        self.handler.on_iterations(rows)
+                        rows = []
+                    self.state = STATE_OUTPUT
+                    self.handler.on_finished()
+                    continue
+            elif self.state != STATE_OUTPUT:
+                self.parse_header(line)
+
+            if line[0:1] == '|':
+                self.parse_info(line)
+            elif self.state == STATE_OUTPUT and line[0:10] == _header_line:
+                self.state = STATE_HEADER_GRID
+
+        if len(rows) > 0:
+            self.handler.on_iterations(rows)
+
+    def parse_header(self, line):
+        # the header lines have to come in order, otherwise it is no header
+        start = line[0:10]
+        if self.state == STATE_HEADER_GRID and start == _grid_line:
+            self.header_lines = [line]
+            self.state = STATE_HEADER_LEVEL
+        elif self.state == STATE_HEADER_LEVEL and start == _level_line:
+            self.header_lines.append(line)
+            self.state = STATE_HEADER_END
+        elif self.state == STATE_HEADER_END and start == _header_line:
+            names = parse_var_names(self.header_lines)
+            self.set_header(names)
+            self.handler.on_header(names)
+        elif start != _header_line:
+            self.state = STATE_OUTPUT
+        else:
+            self.state = STATE_HEADER_GRID
+
+    def parse_info(self, line):
+        # lines that start with '|'
+        if line[0:29] == _ap_name_line:
+            self.handler.on_aero_problem(line[29:-2].strip())
+            return
+
+        # the timing is printed after a run has finished
+        if self.state == STATE_ITERATIONS:
+            return
+        if line[0:17] == _call_time_line:
+            self.handler.on_timing('call', str2number(line.split(':')[1].split()[0]))
+        elif line[0:32] == _func_time_line:
+            self.handler.on_timing('func', str2number(line.split(':')[1].split()[0]))
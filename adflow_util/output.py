@@ -0,0 +1,66 @@
+import io
+import json
+import os
+
+from .results import _to_json
+
+
+class Output:
+    """
+    All files ADFLOW_UTIL writes at the end of a run go through here.
+
+    Only rank 0 of comm writes, everybody else skips the write. A file is
+    rendered into memory first and then written with a single write to a
+    temporary file, which replaces the old one. This way the file system
+    sees one writer and one metadata operation per file, and a reader never
+    sees a half written file. Without a comm (no MPI), this process is rank
+    0.
+    """
+
+    def __init__(self, comm=None):
+        self.comm = comm
+
+    def is_root(self):
+        return self.comm is None or self.comm.Get_rank() == 0
+
+    def barrier(self):
+        if self.comm is not None:
+            self.comm.Barrier()
+
+    def bcast(self, value):
+        if self.comm is None:
+            return value
+        return self.comm.bcast(value, root=0)
+
+    def gather(self, value):
+        # returns the values of all ranks on rank 0 and None everywhere else
+        if self.comm is None:
+            return [value]
+        return self.comm.gather(value, root=0)
+
+    def makedirs(self, directory):
+        # rank 0 creates it, nobody continues before it is there
+        if self.is_root() and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.barrier()
+
+    def buffer(self):
+        # the file is rendered into this, before it is written
+        return io.StringIO()
+
+    def write(self, filename, content):
+        if not self.is_root():
+            return
+
+        tmp_file = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmp_file, 'w') as file:
+            file.write(content)
+        os.replace(tmp_file, filename)
+
+    def write_json(self, filename, data):
+        self.write(filename, json.dumps(data, indent=1, default=_to_json))
+
+    def clear(self, filename):
+        # starts with an empty file, which everybody sees afterwards
+        self.write(filename, '')
+        self.barrier()
@@ -7,6 +7,11 @@ import sys
 import os
 import math
 
+from adflow_util.column_store import import_numpy
+
+# numpy is imported with the first plot, so adflow_plot starts without it
+np = None
+
 ##############################################
 ###########    Basic Functions    ############
 ##############################################
@@ -169,6 +174,10 @@ class _vars_class():
         self.decimals = 2
 
         self.grid = [[]]
+        self.chars = None
+        self.colors = None
+        self.marker_codes = {}
+        self.runs = []
         self.no_color = False
         self.canvas = ""
 
@@ -322,8 +331,10 @@ def _set_xlim(xlim = None):
 # the set minimum (maximum) value should be inside the first (last) data bin
 # this changes the actual minimum (maximum) value by a bin_offset 
 def _set_lim(z = [], zmin = None, zmax = None, bins = 2):
-    zmin = _set_var_if_none(zmin, min(map(min, z)))
-    zmax = _set_var_if_none(zmax, max(map(max, z)))
+    if zmin is None:
+        zmin = min(_min_max(z_n)[0] for z_n in z)
+    if zmax is None:
+        zmax = max(_min_max(z_n)[1] for z_n in z)
     if zmin == zmax:
         zm=[0.5 * zmin, 1.5 * zmax]
         zm.sort()
@@ -337,71 +348,147 @@ def _set_ylim(ylim = None):
     _vars.ymin, _vars.ymax=_set_lim(_vars.y, _vars.ymin, _vars.ymax, _vars.rows)
     _vars.dy = 1.*(_vars.ymax - _vars.ymin) / _vars.rows
 
+def _min_max(z):
+    # the limits of the values, which are a number
+    global np
+    np = import_numpy()
+    z = np.asarray(z, dtype=float)
+    z = z[np.isfinite(z)]
+    if len(z) == 0:
+        return 0., 0.
+    return z.min(), z.max()
+
 def _set_grid():
+    _rasterize()
     space = _set_color(" ", background = _vars.background)
-    _vars.grid = [[space for c in range(_vars.cols)] for r in range(_vars.rows)]
+    cells = {(32, 0): space}
+    _vars.grid = []
+    for chars, colors in zip(_vars.chars.tolist(), _vars.colors.tolist()):
+        row = []
+        for cell in zip(chars, colors):
+            text = cells.get(cell)
+            if text is None:
+                text = _set_color(chr(cell[0]), cell[1], _vars.background)
+                cells[cell] = text
+            row.append(text)
+        _vars.grid.append(row)
+
+# all series are rasterized at once into _vars.chars (the char codes) and
+# _vars.colors (the color codes), one row of the plot per row of the arrays
+def _rasterize():
+    global np
+    np = import_numpy()
+    x, y, chars, colors = [], [], [], []
     for s in range(len(_vars.x)):
+        x_s = np.asarray(_vars.x[s], dtype=float)
+        y_s = np.asarray(_vars.y[s], dtype=float)
         if _vars.line[s]:
-            _add_to_grid(*_get_line(_vars.x[s], _vars.y[s], _vars.line_marker[s]), _vars.line_color[s])
+            x_line, y_line, markers = _get_line(x_s, y_s, _vars.line_marker[s])
+            x.append(x_line)
+            y.append(y_line)
+            chars.append(markers)
+            colors.append(np.full(len(x_line), _color_code(_vars.line_color[s])))
         if _vars.point[s]:
-            _add_to_grid(_vars.x[s], _vars.y[s], _vars.point_marker[s], _vars.point_color[s])
+            x.append(x_s)
+            y.append(y_s)
+            chars.append(np.full(len(x_s), ord(_vars.point_marker[s])))
+            colors.append(np.full(len(x_s), _color_code(_vars.point_color[s])))
+
+    _vars.chars = np.full((_vars.rows, _vars.cols), 32, dtype=np.int32)
+    _vars.colors = np.zeros((_vars.rows, _vars.cols), dtype=np.int32)
+    if len(x) == 0:
+        return
+    x = np.concatenate(x)
+    y = np.concatenate(y)
+    chars = np.concatenate(chars)
+    colors = np.concatenate(colors)
+
+    # the cell of every sample, like int() does it
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        c = (x - _vars.xmin) / _vars.dx
+        r = (y - _vars.ymin) / _vars.dy
+    index = np.flatnonzero(np.isfinite(c) & np.isfinite(r))
+    c = np.clip(c[index], -1, _vars.cols).astype(np.int64)
+    r = np.clip(r[index], -1, _vars.rows).astype(np.int64)
+    inside = (0 <= r) & (r < _vars.rows) & (0 <= c) & (c < _vars.cols)
+    index = index[inside]
+    cells = r[inside] * _vars.cols + c[inside]
+
+    # a later sample covers an earlier one in the same cell
+    cells, first = np.unique(cells[::-1], return_index = True)
+    last = index[::-1][first]
+    _vars.chars.flat[cells] = chars[last]
+    _vars.colors.flat[cells] = colors[last]
 
 def _set_color(text = "", color = 0, background = None):
     if color == 'norm':
         color = 0
     return '\033[' + str(color) + 'm' + text # + '\033[0m'
 
-def _add_to_grid(x, y, marker, color):
-    for n in range(len(x)):
-        c = int((x[n] - _vars.xmin) / _vars.dx)
-        r = int((y[n] - _vars.ymin) / _vars.dy)
-        if 0 <= r < _vars.rows and 0 <= c < _vars.cols:
-            _vars.grid[r][c]=_set_color(marker[n], color, _vars.background)
-    return _vars.grid
-
-# it returns all the lines connecting the data points 
-def _get_line(x, y, markers_raw): 
-    x_line = []
-    y_line = []
-    markers = []
-    for n in range(len(x) - 1):
-        slope = 1. * (y[n + 1] - y[n]) / (x[n + 1] - x[n])
-        dy = slope * _vars.dx
-        x_line_n = _range(x[n], x[n + 1], _vars.dx)
-
-        # prepare marker
-        marker = markers_raw[n + 1]
-        pc_marker = None
-        if len(marker) > 1:
-            pc_marker = marker[0]
-            marker = marker[1]
-        markers_n = [marker] * len(x_line_n)
-        if pc_marker is not None:
-            markers_n[0] = pc_marker
-        
-        if dy == 0:
-            y_line_n = [y[n]] * len(x_line_n)
-        else:
-            # y_line_n = _range(y[n], y[n + 1], dy)
-            y_line_n = [(x_line_n[i]-x[n])*slope+y[n] for i in range(len(x_line_n))]
-        x_line.extend(x_line_n)
-        y_line.extend(y_line_n)
-        markers.extend(markers_n)
-    return x_line, y_line, markers
-
-def _range(start, stop, step = 1):
-    res=[]
-    i=start
-    while i<stop:
-        res.append(i)
-        i=i+step
-        #i=_round(i,14)
-    return res
+def _color_code(color):
+    if color == 'norm':
+        return 0
+    return int(color)
+
+# the char codes of the markers of the points: the marker itself and the one
+# of the first sample of a line, which starts at the point (a marker like
+# 'Xo' starts with an 'X')
+def _marker_codes(markers, n):
+    markers = _set_var_if_none(markers, "•")
+    if isinstance(markers, str):
+        return np.full(n, ord(markers[-1])), np.full(n, ord(markers[0]))
+
+    # the series of a plot usually share their markers
+    key = (id(markers), n)
+    if key not in _vars.marker_codes:
+        values, inverse = np.unique(np.asarray(markers[:n], dtype=str), return_inverse = True)
+        last = np.array([ord(value[-1]) for value in values])
+        first = np.array([ord(value[0]) for value in values])
+        _vars.marker_codes[key] = (markers, last[inverse], first[inverse])
+    return _vars.marker_codes[key][1:]
+
+# it returns all the lines connecting the data points. Every line is sampled
+# once per column, starting at its first point. The last point closes the
+# last line.
+def _get_line(x, y, markers_raw):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) < 2:
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64)
+    marker, pc_marker = _marker_codes(markers_raw, len(x))
+
+    # the number of samples of every line
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        dx = np.diff(x)
+        slope = np.diff(y) / dx
+        n = np.ceil(dx / _vars.dx)
+    n[~(dx > 0) | ~np.isfinite(n)] = 0
+    n = n.astype(np.int64)
+
+    line = np.repeat(np.arange(len(n)), n)
+    i = np.arange(len(line)) - np.repeat(np.cumsum(n) - n, n)
+    x_line = x[line] + i * _vars.dx
+    y_line = y[line] + i * _vars.dx * slope[line]
+
+    markers = marker[line + 1]
+    first = i == 0
+    markers[first] = pc_marker[line[first] + 1]
+    return (np.append(x_line, x[-1]), np.append(y_line, y[-1]),
+            np.append(markers, marker[-1]))
 
 def _round(n, dec):
     return round(n * 10 ** dec) / 10 ** dec
 
 def _add_yaxis():
+    axis, ticks = _get_yaxis()
+    for r in range(_vars.rows):
+        if _vars.axes[1]:
+            _vars.grid[r].append(_set_color(axis[r], _vars.axes_color, _vars.background))
+        if _vars.ticks[1] * _vars.spacing[1]:
+            _vars.grid[r].append(_set_color(ticks[r], _vars.axes_color, _vars.background))
+
+# the axis and the ticks of every row, without colors
+def _get_yaxis():
     spacing = _vars.spacing[1] * _vars.ticks[1]
     axis = ["│" for r in range(_vars.rows)]
     dr = len(str(_vars.rows))
@@ -411,12 +498,7 @@ def _add_yaxis():
             axis[r] = "├"
             space = " " * (dr - len(str(r)))
             ticks[r] = str(_get_yaxis_ticks(r)) + space
-        axis[r] = _set_color(axis[r], _vars.axes_color, _vars.background)
-        ticks[r] = _set_color(ticks[r], _vars.axes_color, _vars.background)
-        if _vars.axes[1]:
-            _vars.grid[r].append(axis[r]) 
-        if _vars.ticks[1] * _vars.spacing[1]:
-            _vars.grid[r].append(ticks[r])
+    return axis, ticks
 
 def _get_yaxis_ticks(r=0):
     if r == 0:
@@ -427,6 +509,16 @@ def _get_yaxis_ticks(r=0):
         return r/_vars.rows* (_vars.ymax-_vars.ymin) + _vars.ymin
 
 def _add_xaxis():
+    axis, ticks = _get_xaxis()
+    axis = [_set_color(el, _vars.axes_color, _vars.background) for el in axis]
+    ticks = [_set_color(el, _vars.axes_color, _vars.background) for el in ticks]
+    if _vars.axes[0]:
+        _vars.grid.insert(0, axis) 
+    if _vars.ticks[0] * _vars.spacing[0]:
+        _vars.grid.insert(0, ticks) 
+
+# the characters of the axis and the ticks, without colors
+def _get_xaxis():
     spacing = _vars.spacing[0] * _vars.ticks[0]
     axis = ["─" for r in range(_vars.cols)]
     ticks = [" " for r in range(_vars.cols)]
@@ -444,12 +536,7 @@ def _add_xaxis():
                 ticks[c : c + dc] = new
                 axis[c : c + dc] = "┬" + "─" * (dc - 1)
         c += dc
-    axis = [_set_color(el, _vars.axes_color, _vars.background) for el in axis]
-    ticks = [_set_color(el, _vars.axes_color, _vars.background) for el in ticks]
-    if _vars.axes[0]:
-        _vars.grid.insert(0, axis) 
-    if _vars.ticks[0] * _vars.spacing[0]:
-        _vars.grid.insert(0, ticks) 
+    return axis, ticks
 
 def _get_xaxis_ticks(r=0):
     if r == 0:
@@ -459,6 +546,48 @@ def _get_xaxis_ticks(r=0):
     else:
         return r/_vars.cols* (_vars.xmax-_vars.xmin) + _vars.xmin
 
+# the plot as rows of runs (col, text, color code), from the top to the
+# bottom. Neighbouring cells of the same color are one run, so a terminal
+# library can draw them without any escape sequences.
+def _set_runs():
+    _rasterize()
+    axes_color = _color_code(_vars.axes_color)
+    text = _vars.chars.astype('<u4').tobytes().decode('utf-32-le')
+
+    # the color changes within the rows of the plot
+    changes = np.diff(_vars.colors, axis = 1) != 0
+    rows = []
+    axis, ticks = _get_yaxis()
+    for r in range(_vars.rows):
+        starts = [0] + (np.flatnonzero(changes[r]) + 1).tolist()
+        stops = starts[1:] + [_vars.cols]
+        colors = _vars.colors[r, starts].tolist()
+        line = text[r * _vars.cols : (r + 1) * _vars.cols]
+        runs = [[start, line[start:stop], color] for start, stop, color in zip(starts, stops, colors)]
+
+        tail = ""
+        if _vars.axes[1]:
+            tail += axis[r]
+        if _vars.ticks[1] * _vars.spacing[1]:
+            tail += ticks[r]
+        _add_run(runs, _vars.cols, tail, axes_color)
+        rows.append(runs)
+
+    axis, ticks = _get_xaxis()
+    if _vars.axes[0]:
+        rows.insert(0, [[0, "".join(axis), axes_color]])
+    if _vars.ticks[0] * _vars.spacing[0]:
+        rows.insert(0, [[0, "".join(ticks), axes_color]])
+    _vars.runs = [[tuple(run) for run in runs] for runs in rows[::-1]]
+
+def _add_run(runs, col, text, color):
+    if text == "":
+        return
+    if len(runs) > 0 and runs[-1][2] == color:
+        runs[-1][1] += text
+    else:
+        runs.append([col, text, color])
+
 def _set_canvas():
     canvas = '\n'
     for r in range(len(_vars.grid) -1, -1, -1):
@@ -0,0 +1,207 @@
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .results import ResultsStore
+
+
+class RestartIndex:
+    """
+    Index of the volume solutions in the output directory.
+
+    It maps every '<name>_..._vol.cgns' file to the values of the sweep
+    variables of its point, so a new point can restart from the closest
+    solution there is. The index is built once from the sidecar file
+    'restart_index.jsonl' and one listing of the directory. After that, it
+    is only updated in memory (and appended to the sidecar) when a point is
+    finished.
+
+    Every entry also keeps the size of its file and when it was last used.
+    If the files get larger than quota (in bytes), the ones that are the
+    least likely to be a good restart for the points still to come are
+    deleted. Only the files the index owns count and can be deleted: the
+    ones it has added and, if owns_existing is True, the ones found by
+    build(). So several groups can share a directory, each with its own
+    part of the quota.
+    """
+    suffix = '_vol.cgns'
+
+    def __init__(self, directory, name, names, spans=None, quota=None, owns_existing=True):
+        self.directory = directory
+        self.quota = quota
+        self.name = name
+        self.names = list(names)
+        self.spans = spans if spans is not None else {}
+        self.owns_existing = owns_existing
+        self.entries = OrderedDict()
+        self.owned = set()
+        self.sidecar = ResultsStore(os.path.join(directory, 'restart_index.jsonl'))
+
+    def build(self):
+        # files that are really there
+        files = {}
+        if os.path.isdir(self.directory):
+            for dir_entry in os.scandir(self.directory):
+                filename = dir_entry.name
+                if filename.startswith(self.name + '_') and filename.endswith(self.suffix):
+                    files[os.path.join(self.directory, filename)] = dir_entry.stat()
+
+        # points known from earlier runs. A file can have several records,
+        # the last one is the most recent.
+        for record in self.sidecar.read():
+            if record.get('file') in files:
+                self.entries[record['file']] = record
+
+        # files without an entry get their point from the file name
+        for filename in sorted(set(files) - set(self.entries)):
+            point = self.parse_filename(filename)
+            if point is not None:
+                self.entries[filename] = {'file': filename, 'point': point}
+
+        # the size is always taken from the file itself, it could have been
+        # overwritten since the record was written
+        for filename, entry in self.entries.items():
+            entry['size'] = files[filename].st_size
+            entry.setdefault('used', files[filename].st_mtime)
+        if self.owns_existing:
+            self.owned.update(self.entries)
+
+    def parse_filename(self, filename):
+        """
+        Returns the point of a file named '<name>_<var1><value1>_..._vol.cgns'
+        or None if it does not belong to this sweep.
+        """
+        basename = os.path.basename(filename)
+        remainder = basename[len(self.name) + 1:-len(self.suffix)]
+        if len(self.names) == 0:
+            return OrderedDict() if remainder == '' else None
+
+        bits = remainder.split('_')
+        if len(bits) != len(self.names):
+            return None
+
+        point = OrderedDict()
+        for name, bit in zip(self.names, bits):
+            if not bit.startswith(name):
+                return None
+            try:
+                point[name] = float(bit[len(name):])
+            except ValueError:
+                return None
+        return point
+
+    def add(self, filename, point, write=True):
+        # only the writer looks at the file, the others do not need its size
+        size = 0
+        if write and os.path.isfile(filename):
+            size = os.path.getsize(filename)
+
+        entry = {'file': filename, 'point': point, 'size': size, 'used': time.time()}
+
+        # re-insert it, so the entries stay in the order they were written
+        self.entries.pop(filename, None)
+        self.entries[filename] = entry
+        self.owned.add(filename)
+        if write:
+            self.sidecar.append(entry)
+
+    def find(self, point, write=False):
+        """
+        Returns the file closest to the point, or None if there is none.
+        Every variable is scaled by its span, so they all count the same.
+        Files that are gone (another group can delete the ones that were
+        there at the start) are forgotten.
+        """
+        distances = []
+        for filename, entry in self.entries.items():
+            distance = self.distance(entry['point'], point)
+            if distance < np.inf:
+                distances.append((distance, filename))
+
+        best_file = None
+        gone = []
+        for distance, filename in sorted(distances):
+            if os.path.isfile(filename):
+                best_file = filename
+                break
+            gone.append(filename)
+        self.remove(gone)
+
+        # remember the use, so the file is not evicted next
+        if best_file is not None:
+            entry = self.entries[best_file]
+            entry['used'] = time.time()
+            if write:
+                self.sidecar.append(entry)
+        return best_file
+
+    def size(self):
+        # the size of the files this index owns
+        return sum(
+            entry.get('size', 0) for filename, entry in self.entries.items()
+            if filename in self.owned)
+
+    def evict(self, pending=None, keep=None):
+        """
+        Deletes files until they fit into the quota and returns the deleted
+        ones. The file furthest away from all pending points goes first, so
+        the closest neighbours of the coming points survive. Without pending
+        points (or between files at the same distance), the one used least
+        recently goes first. The file keep and files that are not owned are
+        never deleted.
+        """
+        if self.quota is None:
+            return []
+
+        total = self.size()
+        if total <= self.quota:
+            return []
+
+        pending = pending if pending is not None else []
+
+        def score(filename):
+            entry = self.entries[filename]
+            distance = min(
+                [self.distance(entry['point'], point) for point in pending],
+                default=0.0)
+            return (-distance, entry['used'])
+
+        evicted = []
+        for filename in sorted(self.entries, key=score):
+            if total <= self.quota:
+                break
+            if filename == keep or filename not in self.owned:
+                continue
+            total -= self.entries[filename].get('size', 0)
+            evicted.append(filename)
+            try:
+                os.remove(filename)
+            except OSError:
+                # another group could have deleted it already
+                pass
+
+        self.remove(evicted)
+        return evicted
+
+    def remove(self, filenames):
+        # forgets about files, that have been deleted
+        for filename in filenames:
+            self.entries.pop(filename, None)
+            self.owned.discard(filename)
+
+    def distance(self, point, other):
+        if set(point) != set(self.names) or set(other) != set(self.names):
+            return np.inf
+
+        distance = 0.0
+        for name in self.names:
+            try:
+                delta = float(point[name]) - float(other[name])
+            except (TypeError, ValueError):
+                if point[name] != other[name]:
+                    return np.inf
+                continue
+            distance += (delta / self.spans.get(name, 1.0))**2
+        return np.sqrt(distance)
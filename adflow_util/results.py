@@ -0,0 +1,85 @@
+import json
+import os
+
+import numpy as np
+
+
+def _to_json(value):
+    # numpy types are not serializable by json itself
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, complex):
+        return value.real
+    if isinstance(value, (int, float, str, bool)) or value is None:
+        return value
+    raise TypeError('{} is not JSON serializable'.format(type(value)))
+
+
+class ResultsStore:
+    """
+    Append-only store of the results of a sweep.
+
+    Every solved point is written as one JSON line to the file right away.
+    Nothing that has been written is ever touched again, so writing a point
+    costs the same no matter how many points are in the file already. The
+    file doubles as the manifest to resume an interrupted sweep.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def clear(self):
+        # start with an empty file
+        open(self.filename, 'w').close()
+
+    def append(self, record):
+        line = json.dumps(record, default=_to_json) + '\n'
+
+        # one single write with O_APPEND, so lines of different writers
+        # never end up mixed. The record is on disk before the next point
+        # starts, so a killed job never loses a finished point.
+        fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode('utf-8'))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def repair(self):
+        # cuts off a line that was not written completely, so the next
+        # record starts on a line of its own
+        if not os.path.isfile(self.filename):
+            return
+
+        with open(self.filename, 'rb+') as file:
+            content = file.read()
+            if len(content) == 0 or content.endswith(b'\n'):
+                return
+            file.truncate(content.rfind(b'\n') + 1)
+
+    def read(self):
+        """
+        Returns all records in the file. A line that was not written
+        completely (for example because the job was killed) is skipped.
+        """
+        records = []
+        if not os.path.isfile(self.filename):
+            return records
+
+        with open(self.filename, 'r') as file:
+            for line in file:
+                if not line.endswith('\n'):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+
+def same_point(point, other):
+    # compares two points the way they end up in the store
+    return (json.dumps(point, default=_to_json, sort_keys=True) ==
+            json.dumps(other, default=_to_json, sort_keys=True))
@@ -0,0 +1,233 @@
+import bisect
+import json
+import mmap
+import os
+
+from .log_parser import (ap_name_string, count_lines, find_lines,
+                         parse_var_names, str2number, var_desc_pattern)
+
+
+class RunIndex:
+    """
+    Index of the runs in an ADflow log file.
+
+    The log of a sweep has a run for every point: a header, the iterations,
+    the end marker '#' and the timing. For every run, the index keeps the
+    byte offsets of these blocks and a few numbers about it: the
+    AeroProblem, the number of iterations, the first and the final total
+    residual and the timings. Any run can then be read straight from its
+    offsets, no matter how many runs come before it.
+
+    The index is kept in the sidecar file '<log file>.runs.jsonl'. It is
+    built once. Afterwards, only the last run (which might still be going
+    on) and what has been added after it are scanned again. If the sidecar
+    can not be written (for example the log of somebody else), the index is
+    only kept in memory.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.sidecar = filename + '.runs.jsonl'
+        self.runs = []
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.runs)
+
+    def get(self, k):
+        # the record of run k, the first run is 1
+        if not 1 <= k <= len(self.runs):
+            raise IndexError('run {} is not in the log'.format(k))
+        return self.runs[k - 1]
+
+    def load(self):
+        # the runs known from the sidecar. A run can have several records,
+        # the last one is the most recent.
+        self.loaded = True
+        runs = {}
+        for record in self.read_sidecar():
+            runs[record.get('run')] = record
+
+        self.runs = []
+        for k in range(1, len(runs) + 1):
+            if k not in runs:
+                # not a sidecar this index has written
+                self.runs = []
+                return
+            self.runs.append(runs[k])
+
+    def update(self, data=None, end=None):
+        """
+        Adds what has been written to the log since the last update and
+        returns the number of runs. data can be the content of the log
+        (like a mmap of it), which is up to date to end.
+        """
+        if data is None:
+            if not os.path.isfile(self.filename) or os.path.getsize(self.filename) == 0:
+                return len(self.runs)
+            with open(self.filename, 'rb') as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    return self.update(data)
+
+        if end is None:
+            end = data.rfind(b'\n') + 1
+        if not self.loaded:
+            self.load()
+
+        # a log that has been truncated or replaced starts from scratch
+        rewrite = not self.is_valid(data, end)
+        if rewrite:
+            self.runs = []
+
+        # the last run is scanned again, it might have changed
+        start = 0
+        last = None
+        if len(self.runs) > 0:
+            last = self.runs.pop()
+            start = last['header']
+        runs = self.scan(data, start, end)
+
+        # only runs that have changed are written
+        changed = runs
+        if len(runs) > 0 and runs[0] == last:
+            changed = runs[1:]
+        self.runs += runs
+        self.write_sidecar(changed, rewrite)
+        return len(self.runs)
+
+    def is_valid(self, data, end):
+        # the last run known has to be where it was
+        if len(self.runs) == 0:
+            return True
+        header = self.runs[-1]['header']
+        if header >= end:
+            return False
+        var_desc = var_desc_pattern.match(data, header, end)
+        return var_desc is not None and var_desc.end() == self.runs[-1]['iterations']
+
+    def scan(self, data, start, end):
+        # the records of all runs that start in data[start:end]
+        var_descs = []
+        for line_start in find_lines(data, b'#---------', start, end):
+            var_desc = var_desc_pattern.match(data, line_start, end)
+            if var_desc is not None:
+                var_descs.append(var_desc)
+        ends = sorted(
+            find_lines(data, b'#\n', start, end) + find_lines(data, b'#\r\n', start, end))
+
+        # a header only starts a new run, if the last one has finished
+        run_starts = []
+        last_start = -1
+        for var_desc in var_descs:
+            i = bisect.bisect_left(ends, last_start)
+            if len(run_starts) == 0 or (i < len(ends) and ends[i] < var_desc.start()):
+                run_starts.append(var_desc)
+            last_start = var_desc.start()
+
+        records = []
+        for n, var_desc in enumerate(run_starts):
+            # the run goes until the next end marker
+            i = bisect.bisect_left(ends, var_desc.end())
+            run_end = ends[i] if i < len(ends) else None
+
+            # the AeroProblem is set before the header, without a switch it
+            # is still the one of the run before
+            previous = run_starts[n - 1].end() if n > 0 else 0
+            ap_name = records[-1]['ap_name'] if n > 0 else ''
+            if n == 0 and len(self.runs) > 0:
+                previous = self.runs[-1]['iterations']
+                ap_name = self.runs[-1]['ap_name']
+            name_start = data.rfind(ap_name_string, previous, var_desc.start())
+            if name_start >= 0:
+                name_end = data.find(b'\n', name_start, end)
+                ap_name = data[name_start:name_end].decode('utf-8', 'replace').rstrip()[29:-2].strip()
+
+            # the timing comes after the end marker
+            next_start = run_starts[n + 1].start() if n + 1 < len(run_starts) else end
+            timing = None
+            call_time = None
+            func_time = None
+            if run_end is not None:
+                timing = data.find(b'\n| Total Call Time', run_end, next_start)
+                if timing >= 0:
+                    timing += 1
+                    call_time = self.parse_time(data, timing, end)
+                else:
+                    timing = None
+                func_start = data.find(b'\n| Total Function Evaluation Time', run_end, next_start)
+                if func_start >= 0:
+                    func_time = self.parse_time(data, func_start + 1, end)
+
+            record = {
+                'run': len(self.runs) + n + 1,
+                'ap_name': ap_name,
+                'header': var_desc.start(),
+                'iterations': var_desc.end(),
+                'end': run_end,
+                'timing': timing,
+                'call_time': call_time,
+                'func_time': func_time,
+            }
+            record.update(self.iteration_stats(
+                data, var_desc, run_end if run_end is not None else end))
+            records.append(record)
+        return records
+
+    def iteration_stats(self, data, var_desc, stop):
+        # the number of iterations and the first and final total residual
+        stats = {
+            'n_iterations': count_lines(data, b'     ', var_desc.end() - 1, stop),
+            'first_res': None,
+            'final_res': None,
+        }
+        if stats['n_iterations'] == 0:
+            return stats
+
+        header_lines = data[var_desc.start():var_desc.end()].decode('utf-8', 'replace').splitlines()
+        names = parse_var_names(header_lines[1:3])
+        if 'totalRes' not in names:
+            return stats
+        i = names.index('totalRes')
+
+        first = data.find(b'\n     ', var_desc.end() - 1, stop) + 1
+        last = data.rfind(b'\n     ', var_desc.end() - 1, stop) + 1
+        for name, start in (('first_res', first), ('final_res', last)):
+            bits = data[start:data.find(b'\n', start, stop + 1)].split()
+            if len(bits) > i:
+                stats[name] = str2number(bits[i].decode('utf-8', 'replace'))
+        return stats
+
+    def parse_time(self, data, start, end):
+        # the time of a line like '| Total Call Time     :   582.610 sec'
+        line = data[start:data.find(b'\n', start, end)].decode('utf-8', 'replace')
+        try:
+            return str2number(line.split(':')[1].split()[0])
+        except IndexError:
+            return None
+
+    # sidecar
+    def read_sidecar(self):
+        records = []
+        try:
+            with open(self.sidecar, 'r') as file:
+                for line in file:
+                    # a line that was not written completely is skipped
+                    if not line.endswith('\n'):
+                        break
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return records
+
+    def write_sidecar(self, records, rewrite=False):
+        if len(records) == 0 and not rewrite:
+            return
+        content = ''.join(json.dumps(record) + '\n' for record in records)
+        try:
+            with open(self.sidecar, 'w' if rewrite else 'a') as file:
+                file.write(content)
+        except OSError:
+            pass
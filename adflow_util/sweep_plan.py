@@ -0,0 +1,339 @@
+import numpy as np
+from collections import OrderedDict
+
+from .error import Error
+
+
+# This values can not be iterated on as they are allowed to be arreys
+is_arraylike = [
+    'coefPol',
+    'cosCoefFourier',
+    'sinCoefFourier',
+    'momentAxis',
+    'solverOptions',
+    'evalFuncs'
+]
+
+# Direction numbers for the sobol sequence (Joe & Kuo, new-joe-kuo-6.21201).
+# Every entry is (s, a, m) for one dimension. The first dimension is the van
+# der Corput sequence and needs no direction numbers.
+_sobol_directions = [
+    (1, 0, [1]),
+    (2, 1, [1, 3]),
+    (3, 1, [1, 3, 1]),
+    (3, 2, [1, 1, 1]),
+    (4, 1, [1, 1, 3, 3]),
+    (4, 4, [1, 3, 5, 13]),
+    (5, 2, [1, 1, 5, 5, 17]),
+    (5, 4, [1, 1, 5, 5, 5]),
+    (5, 7, [1, 1, 7, 11, 19]),
+    (5, 11, [1, 1, 5, 1, 1]),
+    (5, 13, [1, 1, 1, 3, 11]),
+    (5, 14, [1, 3, 5, 5, 31]),
+]
+_sobol_bits = 32
+
+
+class SweepPlan:
+    """
+    Expands the sweep variables of the aeroOptions into single points.
+
+    A variable is a sweep variable if it is a list (and not in is_arraylike).
+    How the sweep variables are combined depends on the mode:
+        zip:        point n takes the n-th value of every list. All lists
+                    must have the same length.
+        product:    every combination of all lists (full factorial).
+        lhs:        latin hypercube sampling. Every list holds the bounds
+                    [min, max] of the variable.
+        sobol:      sobol sequence. Every list holds the bounds [min, max].
+
+    The points are never stored, they are computed from their index when
+    they are needed.
+    """
+    modes = ('zip', 'product', 'lhs', 'sobol')
+
+    def __init__(self, aeroOptions, mode='zip', nSamples=None, seed=0):
+        if mode not in self.modes:
+            raise Error('"{}" is not a valid sweep plan. Choose one of: {}.'.format(
+                mode, ', '.join(self.modes)))
+
+        self.mode = mode
+        self.seed = seed
+        self.keys = list(aeroOptions.keys())
+        self.names = []
+        self.values = OrderedDict()
+        self.base = {}
+
+        # split the options in sweep variables and constant ones
+        for name, value in aeroOptions.items():
+            if name not in is_arraylike and isinstance(value, (list, np.ndarray)):
+                self.names.append(name)
+                self.values[name] = value
+            else:
+                self.base[name] = value
+
+        self.n_points = self._count_points(nSamples)
+        self._permutations = None
+
+    def __len__(self):
+        return self.n_points
+
+    def __iter__(self):
+        for n in range(self.n_points):
+            yield self.point(n)
+
+    def _count_points(self, nSamples):
+        if len(self.names) == 0:
+            return 1
+
+        if self.mode == 'zip':
+            n_points = len(self.values[self.names[0]])
+            for name in self.names:
+                if len(self.values[name]) != n_points:
+                    raise Error('All sweep variables must be the same length.')
+            return n_points
+
+        if self.mode == 'product':
+            n_points = 1
+            for name in self.names:
+                n_points *= len(self.values[name])
+            return n_points
+
+        # sampled plans need the bounds of every variable
+        for name in self.names:
+            if len(self.values[name]) != 2:
+                raise Error(
+                    'With sweep plan "{}", "{}" must be given as [min, max].'.format(
+                        self.mode, name))
+
+        if nSamples is None or nSamples < 1:
+            raise Error(
+                'Sweep plan "{}" needs "nSamples" to be set.'.format(self.mode))
+
+        if self.mode == 'sobol' and len(self.names) > len(_sobol_directions) + 1:
+            raise Error('Sweep plan "sobol" supports at most {} variables.'.format(
+                len(_sobol_directions) + 1))
+
+        return nSamples
+
+    def point(self, n):
+        """
+        Returns the values of all sweep variables of point n.
+        """
+        if n < 0 or n >= self.n_points:
+            raise IndexError('Sweep point {} does not exist.'.format(n))
+
+        point = OrderedDict()
+        if self.mode == 'zip':
+            for name in self.names:
+                point[name] = self.values[name][n]
+
+        elif self.mode == 'product':
+            # decode n like a number with mixed radix. The last variable
+            # changes fastest.
+            for name in reversed(self.names):
+                values = self.values[name]
+                n, i = divmod(n, len(values))
+                point[name] = values[i]
+            point = OrderedDict((name, point[name]) for name in self.names)
+
+        else:
+            if self.mode == 'lhs':
+                unit = self._lhs(n)
+            else:
+                unit = self._sobol(n)
+
+            for d, name in enumerate(self.names):
+                lower, upper = self.values[name]
+                value = lower + unit[d] * (upper - lower)
+                # keep the names of the AeroProblems readable
+                point[name] = float('{:.6g}'.format(value))
+
+        return point
+
+    def spans(self):
+        """
+        Returns the range (max - min) of every sweep variable. Variables that
+        are not numeric or do not change get a range of 1.
+        """
+        spans = {}
+        for name in self.names:
+            try:
+                values = np.asarray(self.values[name], dtype=float)
+                span = values.max() - values.min()
+            except (TypeError, ValueError):
+                span = 0.0
+            spans[name] = span if span > 0 else 1.0
+        return spans
+
+    def schedule(self, order='input'):
+        """
+        Returns the sequence in which the points should be solved.
+
+        order:
+            input:      the points are solved as they are defined.
+            nearest:    consecutive points are as close as possible to each
+                        other, so every solve starts from a similar state.
+                        Product plans are walked like a snake: every
+                        variable is walked monotonically and the direction
+                        is reversed whenever a slower variable steps.
+                        All other plans are ordered by a greedy nearest
+                        neighbour search.
+        """
+        if order == 'input' or self.n_points <= 2:
+            return range(self.n_points)
+
+        if order != 'nearest':
+            raise Error('"{}" is not a valid point order. Choose "input" or "nearest".'.format(order))
+
+        if self.mode == 'product':
+            return _SnakeSchedule(
+                [self._value_order(name) for name in self.names])
+
+        return self._nearest_neighbour_schedule()
+
+    def _value_order(self, name):
+        # the indices of the values of a variable, sorted by value
+        values = self._numeric(self.values[name], name)
+        return list(np.argsort(values, kind='stable'))
+
+    def _numeric(self, values, name):
+        try:
+            return np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            raise Error(
+                'Point order "nearest" needs numeric sweep variables, "{}" is not.'.format(name))
+
+    def _nearest_neighbour_schedule(self):
+        # coordinates of all points, scaled so every variable spans 0 to 1
+        coords = np.empty((self.n_points, len(self.names)))
+        for n in range(self.n_points):
+            coords[n] = self._numeric(
+                list(self.point(n).values()), ', '.join(self.names))
+        span = coords.max(axis=0) - coords.min(axis=0)
+        span[span == 0] = 1.0
+        coords = (coords - coords.min(axis=0)) / span
+
+        # start in the lowest corner and always go to the closest point left
+        schedule = np.empty(self.n_points, dtype=int)
+        todo = np.ones(self.n_points, dtype=bool)
+        current = int(np.lexsort(coords.T[::-1])[0])
+        for k in range(self.n_points):
+            schedule[k] = current
+            todo[current] = False
+            if k == self.n_points - 1:
+                break
+            dist = np.sum((coords - coords[current])**2, axis=1)
+            dist[~todo] = np.inf
+            current = int(np.argmin(dist))
+
+        return [int(n) for n in schedule]
+
+    def kwargs(self, n=0):
+        """
+        Returns all AeroProblem kwargs of point n.
+        """
+        point = self.point(n) if len(self.names) > 0 else {}
+
+        kwargs = {}
+        for name in self.keys:
+            if name in point:
+                kwargs[name] = point[name]
+            else:
+                kwargs[name] = self.base[name]
+        return kwargs
+
+    def _lhs(self, n):
+        # one random permutation of the strata per variable. The position
+        # inside the stratum is random as well, but reproducible per point.
+        if self._permutations is None:
+            rng = np.random.default_rng(self.seed)
+            self._permutations = [
+                rng.permutation(self.n_points) for name in self.names]
+
+        jitter = np.random.default_rng([self.seed, n]).random(len(self.names))
+        return [
+            (self._permutations[d][n] + jitter[d]) / self.n_points
+            for d in range(len(self.names))]
+
+    def _sobol(self, n):
+        # gray code of n. Point n is the XOR of the direction numbers of
+        # all bits set in it, so every point can be computed on its own.
+        gray = n ^ (n >> 1)
+
+        unit = []
+        for d in range(len(self.names)):
+            directions = _sobol_direction_numbers(d)
+            x = 0
+            bit = 0
+            while gray >> bit:
+                if (gray >> bit) & 1:
+                    x ^= directions[bit]
+                bit += 1
+            unit.append(x / 2.0**_sobol_bits)
+        return unit
+
+
+class _SnakeSchedule:
+    """
+    Boustrophedon order of a product plan. The schedule is computed from
+    its position, so it never has to be stored.
+    """
+    def __init__(self, value_orders):
+        self.value_orders = value_orders
+        self.n_points = 1
+        for order in value_orders:
+            self.n_points *= len(order)
+
+    def __len__(self):
+        return self.n_points
+
+    def __iter__(self):
+        for k in range(self.n_points):
+            yield self[k]
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += self.n_points
+        if k < 0 or k >= self.n_points:
+            raise IndexError('Schedule position {} does not exist.'.format(k))
+
+        # digits of k, the first variable is the most significant one
+        digits = []
+        for order in reversed(self.value_orders):
+            k, digit = divmod(k, len(order))
+            digits.insert(0, digit)
+
+        # reverse a digit if the positions before it add up to an odd number.
+        # Then map the sorted position back to the index of the value
+        n = 0
+        parity = 0
+        for order, digit in zip(self.value_orders, digits):
+            position = len(order) - 1 - digit if parity % 2 else digit
+            parity += position
+            n = n * len(order) + int(order[position])
+        return n
+
+
+_sobol_cache = {}
+
+
+def _sobol_direction_numbers(d):
+    # returns the direction numbers v_i (scaled to _sobol_bits) of dimension d
+    if d in _sobol_cache:
+        return _sobol_cache[d]
+
+    if d == 0:
+        v = [1 << (_sobol_bits - 1 - i) for i in range(_sobol_bits)]
+    else:
+        s, a, m = _sobol_directions[d - 1]
+        v = [m[i] << (_sobol_bits - 1 - i) for i in range(s)]
+        for i in range(s, _sobol_bits):
+            value = v[i - s] ^ (v[i - s] >> s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    value ^= v[i - k]
+            v.append(value)
+
+    _sobol_cache[d] = v
+    return v
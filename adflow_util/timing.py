@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """
+    Measures the wall-clock and CPU time of every phase of every point.
+
+    The times of a phase are added up, if it runs several times for the
+    same point (for example when a point is retried).
+    """
+
+    def __init__(self):
+        # {n: {phase: [wall, cpu]}}
+        self.points = OrderedDict()
+
+    @contextmanager
+    def phase(self, n, name):
+        wall_0 = time.perf_counter()
+        cpu_0 = time.process_time()
+        try:
+            yield
+        finally:
+            times = self.points.setdefault(n, OrderedDict()).setdefault(name, [0.0, 0.0])
+            times[0] += time.perf_counter() - wall_0
+            times[1] += time.process_time() - cpu_0
+
+    def profile(self, comm=None):
+        """
+        Returns the min, max and mean times of every phase and point over
+        all ranks of comm. Ranks that did not solve a point (because they
+        are in a different group) are not part of its statistics. Only the
+        root gets the profile, all other ranks get None.
+        """
+        if comm is None:
+            all_points = [self.points]
+        else:
+            all_points = comm.gather(self.points, root=0)
+            if comm.Get_rank() != 0:
+                return None
+
+        # collect the times of all ranks: {n: {phase: [[wall, cpu], ...]}}
+        collected = {}
+        for points in all_points:
+            for n, phases in points.items():
+                for name, times in phases.items():
+                    collected.setdefault(n, OrderedDict()).setdefault(name, []).append(times)
+
+        profile = []
+        for n in sorted(collected):
+            phases = OrderedDict()
+            for name, times in collected[n].items():
+                phases[name] = OrderedDict([
+                    ('wall', _statistics([t[0] for t in times])),
+                    ('cpu', _statistics([t[1] for t in times])),
+                ])
+            ranks = max(len(times) for times in collected[n].values())
+            profile.append(OrderedDict([('n', n), ('ranks', ranks), ('phases', phases)]))
+
+        return profile
+
+
+def _statistics(values):
+    return OrderedDict([
+        ('min', min(values)),
+        ('max', max(values)),
+        ('mean', sum(values) / len(values)),
+    ])
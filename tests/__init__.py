@@ -1,2 +1,15 @@
 from .test_adflow_plot import *
-from .test_adflow_util import *
\ No newline at end of file
+from .test_adflow_util import *
+from .test_cache import *
+from .test_column_store import *
+from .test_import import *
+from .test_line_buffer import *
+from .test_log_follower import *
+from .test_log_parser import *
+from .test_output import *
+from .test_plot import *
+from .test_restart import *
+from .test_results import *
+from .test_run_index import *
+from .test_sweep_plan import *
+from .test_timing import *
\ No newline at end of file
@@ -1,8 +1,13 @@
 from adflow_util import ADflowData
 from adflow_util.adflow_plot import *
 from collections import OrderedDict
+import os
+import select
 import sys
+import numpy as np
+import tempfile
 import unittest
+from unittest import mock
 
 class util_func_Tests(unittest.TestCase):
 
@@ -108,6 +113,94 @@ class BaseBuffer_Tests(unittest.TestCase):
 
 
 
+class Pane_Tests(unittest.TestCase):
+    def test_dirty(self):
+        pane = Pane()
+        self.assertTrue(pane.dirty(None))
+        self.assertFalse(pane.dirty(None))
+        self.assertTrue(pane.dirty((1, 'a')))
+        self.assertFalse(pane.dirty((1, 'a')))
+
+        pane.invalidate()
+        self.assertTrue(pane.dirty((1, 'a')))
+
+
+class ADFlowPlot_draw_Tests(unittest.TestCase):
+    def setUp(self):
+        # the screen records what is drawn on it
+        ad_data = ADflowData(args=['-i', 'test.log'])
+        with mock.patch('adflow_util.adflow_plot.curses'), \
+                mock.patch('adflow_util.adflow_plot.ADflowData', return_value=ad_data):
+            self.plot = ADFlowPlot()
+        self.plot._n_adflowout = 5
+        self.test_log = [line.rstrip('\n') for line in open('tests/test.log')]
+        self.plot.adData.parse_lines(self.test_log[:400])
+
+    def tearDown(self):
+        self.plot.screen = None
+
+    def draw(self):
+        self.plot.screen.reset_mock()
+        with mock.patch('adflow_util.adflow_plot.curses'):
+            self.plot.draw(40, 120)
+        return [call[1][0] for call in self.plot.screen.addstr.mock_calls]
+
+    def test_unchanged(self):
+        self.assertGreater(len(self.draw()), 0)
+        self.assertEqual(self.draw(), [])
+
+    def test_output_only(self):
+        self.draw()
+
+        # a line that is no iteration does not change the plot
+        self.plot.adData.parse_lines(['some output'])
+        self.assertEqual(self.draw(), list(range(5)))
+
+    def test_new_iteration(self):
+        self.draw()
+        raster = self.plot._plot_raster
+        self.plot.adData.parse_lines(self.test_log[400:401])
+        rows = self.draw()
+        self.assertIn(20, rows)
+        self.assertNotIn(39, rows)
+        self.assertIsNot(self.plot._plot_raster, raster)
+        self.plot.commandBuffer.add('q')
+        self.assertEqual(self.draw(), [39])
+
+
+    def test_zoom_pan(self):
+        self.plot.cmd_zoom(['4'])
+        self.assertEqual(self.plot.plot_window(1000), (750, 1000))
+        self.plot.cmd_pan(['100'])
+        self.assertEqual(self.plot.plot_window(1000), (650, 900))
+
+        # the window stays in the iterations shown
+        self.plot.cmd_pan(['5000'])
+        self.assertEqual(self.plot.plot_window(1000), (0, 250))
+        self.plot._n_plot_iterations = 400
+        self.assertEqual(self.plot.plot_window(1000), (600, 700))
+
+        self.plot.cmd_zoom(['0.5'])
+        self.assertEqual(self.plot.message._type, Message.typeError)
+        self.plot.cmd_pan(['-1'])
+        self.assertEqual(self.plot.message._type, Message.typeError)
+        self.plot.cmd_zoom([])
+        self.assertEqual(self.plot.plot_window(1000), (600, 1000))
+
+    def test_reduced_history(self):
+        # a history longer than the plot is wide, shows the same extremes
+        self.plot.adData.parse_lines(self.test_log[400:1300])
+        self.plot._plot_vars = OrderedDict([('totalRes', 1)])
+        raster = self.plot.plot_raster(40, 20)
+        self.assertLess(len(plx._vars.x[0]), 2 * len(self.plot.adData.adflow_vars['Iter']))
+        self.assertLessEqual(len(plx._vars.x[0]), 4 * 40)
+
+        y = np.log10(self.plot.adData.adflow_vars['totalRes'])
+        self.assertAlmostEqual(plx._vars.y[0].max(), y.max())
+        self.assertAlmostEqual(plx._vars.y[0].min(), y.min())
+        self.assertGreater(len(raster), 0)
+
+
 class ADFLOW_PLOT_Tests(unittest.TestCase):
     def setUp(self):
         self.ap = ADflowData(args=['-i', 'test.py'])
@@ -118,11 +211,10 @@ class ADFLOW_PLOT_Tests(unittest.TestCase):
     def test_parse_adflow_vars(self):
         stdout_line = self.test_log[335:337]
         supposed = ["Grid_level", "Iter", "Iter_Tot", "Iter_Type", "CFL", "Step", "Lin_Res", "Res_rho", "Res_nuturb", "C_lift", "C_drag", "totalRes", 'relRes']
-        supposed_dict = OrderedDict()
-        for sup in supposed:
-            supposed_dict[sup] = []
 
-        self.assertEqual(self.ap.parse_adflow_var_names(stdout_line), supposed_dict)
+        adflow_vars = self.ap.parse_adflow_var_names(stdout_line)
+        self.assertEqual(list(adflow_vars), supposed)
+        self.assertEqual(adflow_vars.n_rows, 0)
     
 
     # parse_adflow_iteration
@@ -130,29 +222,27 @@ class ADFLOW_PLOT_Tests(unittest.TestCase):
         stdout_line = self.test_log[335:337]
         supposed = ["Grid_level", "Iter", "Iter_Tot", "Iter_Type", "CFL", "Step", "Lin_Res", "Res_rho", "Res_nuturb", "C_lift", "C_drag", "totalRes", 'relRes']
         supposed_values = [1, 0, 0, 'None', 0.00E+00, 1.00, '----', 0.7320062894350213E+04, 0.1153951480946582E-01, 0.9149551373100052E-01, 0.3701037668832862E+01, 0.6673485782026773E+07, 0.0]
-        supposed_dict = OrderedDict()
-        n = 0
-        for sup in supposed:
-            supposed_dict[sup] = [supposed_values[n]]
-            n += 1
         self.ap.adflow_vars = self.ap.parse_adflow_var_names(stdout_line)
-        self.ap.adflow_vars_raw = self.ap.parse_adflow_var_names(stdout_line)
 
         self.ap.parse_adflow_var_values(self.test_log[338])
-        self.assertEqual(self.ap.adflow_vars_raw, supposed_dict)
+        self.assertEqual(list(self.ap.adflow_vars), supposed)
+        self.assertEqual(self.ap.adflow_vars.raw_row(0), supposed_values)
+
+        # tokens that are not a number are 0.0 in the plottable values
+        self.assertEqual(self.ap.adflow_vars['Lin_Res'][0], 0.0)
+        self.assertFalse(self.ap.adflow_vars.valid('Lin_Res')[0])
 
 
     # parse_stdout_line
     def test_parse_stdout_line_adflow_vars(self):
         stdout_line = self.test_log[334:338]
         supposed = ["Grid_level", "Iter", "Iter_Tot", "Iter_Type", "CFL", "Step", "Lin_Res", "Res_rho", "Res_nuturb", "C_lift", "C_drag", "totalRes", 'relRes']
-        supposed_dict = OrderedDict()
-        for sup in supposed:
-            supposed_dict[sup] = []
 
-        self.ap.stdout_lines = stdout_line
-        self.ap.parse_stdout_line()
-        self.assertEqual(self.ap.adflow_vars, supposed_dict)
+        for line in stdout_line:
+            self.ap.stdout_lines.append(line)
+            self.ap.parse_stdout_line()
+        self.assertEqual(list(self.ap.adflow_vars), supposed)
+        self.assertEqual(self.ap.adflow_vars.n_rows, 0)
     
     def test_parse_stdout_line_ap_name(self):
         # Check if the name gets parsed
@@ -178,6 +268,121 @@ class ADFLOW_PLOT_Tests(unittest.TestCase):
 
         self.assertEqual(self.ap.has_finished_total_func_time, 0.003)
 
+
+    # ingest_logfile
+    def parse_lines(self, lines):
+        ap = ADflowData(args=['-i', 'test.log'])
+        for line in lines:
+            ap.stdout_lines.append(line)
+            ap.parse_stdout_line()
+        return ap
+
+    def ingest_lines(self, lines):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'test.log')
+            with open(filename, 'w') as file:
+                file.write('\n'.join(lines) + '\n')
+            ap = ADflowData(args=['-i', filename])
+            offset = ap.ingest_logfile(filename)
+            self.assertEqual(offset, os.path.getsize(filename))
+        return ap
+
+    def assert_same_state(self, ap_1, ap_2):
+        self.assertEqual(ap_1.ap_name, ap_2.ap_name)
+        self.assertEqual(ap_1.hist_iteration, ap_2.hist_iteration)
+        self.assertEqual(ap_1.has_finished, ap_2.has_finished)
+        self.assertEqual(ap_1.has_finished_total_call_time, ap_2.has_finished_total_call_time)
+        self.assertEqual(ap_1.has_finished_total_func_time, ap_2.has_finished_total_func_time)
+        self.assertEqual(list(ap_1.adflow_vars), list(ap_2.adflow_vars))
+        for name in ap_1.adflow_vars:
+            self.assertEqual(
+                ap_1.adflow_vars[name].tolist(), ap_2.adflow_vars[name].tolist())
+            self.assertEqual(
+                ap_1.adflow_vars.raw_column(name), ap_2.adflow_vars.raw_column(name))
+        self.assertEqual(ap_1.stdout_lines[-len(ap_2.stdout_lines):], list(ap_2.stdout_lines))
+
+    def test_ingest_logfile(self):
+        lines = [line.rstrip() for line in self.test_log]
+        self.assert_same_state(self.parse_lines(lines), self.ingest_lines(lines))
+
+    def test_ingest_logfile_unfinished(self):
+        lines = [line.rstrip() for line in self.test_log[:1000]]
+        ap = self.ingest_lines(lines)
+        self.assertFalse(ap.has_finished)
+        self.assert_same_state(self.parse_lines(lines), ap)
+
+    def test_ingest_logfile_two_runs(self):
+        lines = [line.rstrip() for line in self.test_log] * 2
+        ap = self.ingest_lines(lines)
+        self.assertEqual(ap.hist_iteration, 2)
+        self.assert_same_state(self.parse_lines(lines), ap)
+
+    def test_start_logfile_follow(self):
+        lines = [line.rstrip() for line in self.test_log]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'test.log')
+            with open(filename, 'w') as file:
+                file.write('\n'.join(lines[:1000]) + '\n')
+            ap = ADflowData(args=['-i', filename])
+            ap.start()
+            with open(filename, 'a') as file:
+                file.write('\n'.join(lines[1000:]) + '\n')
+            ap.log_follower.next_poll = 0.0
+            ap.read_stdout_lines()
+            ap.log_follower.close()
+        self.assert_same_state(self.parse_lines(lines), ap)
+
+    def test_load_run(self):
+        lines = [line.rstrip() for line in self.test_log]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'test.log')
+            with open(filename, 'w') as file:
+                file.write('\n'.join(lines * 3) + '\n')
+            ap = ADflowData(args=['-i', filename])
+            ap.ingest_logfile(filename)
+            self.assertEqual(len(ap.run_index), 3)
+            run = ap.load_run(2)
+            with self.assertRaises(IndexError):
+                ap.load_run(4)
+
+        supposed = self.parse_lines(lines)
+        self.assertEqual(run.hist_iteration, 2)
+        self.assertEqual(run.ap_name, supposed.ap_name)
+        self.assertTrue(run.has_finished)
+        self.assertEqual(run.has_finished_total_call_time, supposed.has_finished_total_call_time)
+        for name in supposed.adflow_vars:
+            self.assertEqual(
+                run.adflow_vars.raw_column(name), supposed.adflow_vars.raw_column(name))
+
+    def test_read_stdout_lines_pipe(self):
+        lines = [line.rstrip() for line in self.test_log]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log = os.path.join(tmp_dir, 'test.log')
+            with open(log, 'w') as file:
+                file.write('\n'.join(lines))
+            script = os.path.join(tmp_dir, 'test.py')
+            with open(script, 'w') as file:
+                file.write('import sys\nsys.stdout.write(open({!r}).read())\n'.format(log))
+
+            ap = ADflowData(args=['-i', script])
+            ap.start()
+            self.assertIsNone(ap.timeout())
+            while ap.fileno() is not None:
+                select.select([ap.fileno()], [], [], 10)
+                ap.read_stdout_lines()
+            ap.adflow_process.wait()
+
+        # the last line has no line break, it is read when the pipe is closed
+        self.assertEqual(list(ap.stdout_lines), lines)
+        self.assert_same_state(self.parse_lines(lines), ap)
+
+    def test_ingest_logfile_no_iterations(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'test.log')
+            with open(filename, 'w') as file:
+                file.write('\n'.join(self.test_log[:300]))
+            self.assertEqual(self.ap.ingest_logfile(filename), 0)
+
         
 
 if __name__ == '__main__':
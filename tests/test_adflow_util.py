@@ -1,5 +1,11 @@
 from adflow_util import ADFLOW_UTIL
-from adflow_util.adflow_util import Error
+from adflow_util.adflow_util import Error, extrapolation_weights
+from adflow_util.cache import hash_file
+from adflow_util.results import ResultsStore
+from unittest import mock
+import os
+import tempfile
+import numpy as np
 import unittest
 
 class ADFLOW_UTIL_Tests(unittest.TestCase):
@@ -125,6 +131,13 @@ class ADFLOW_UTIL_Tests(unittest.TestCase):
             'cosCoefFourier': [1, 2]
         })
     
+    def test_get_ap_kwargs_keeps_sweep_plan(self):
+        self.au.check_ap_input()
+        sweep_plan = self.au.sweepPlan
+        self.au.get_ap_kwargs(1)
+        self.au.find_array_aeroOptions()
+        self.assertIs(self.au.sweepPlan, sweep_plan)
+
     # run_point
     def test_run_point_arrays(self):
         self.au.create_aeroProblem()
@@ -147,4 +160,384 @@ class ADFLOW_UTIL_Tests(unittest.TestCase):
         except AttributeError:
             pass
         self.assertEqual(self.au.aeroProblem.name, 'test')
-        self.assertEqual(self.au.aeroProblem.mach, 0.1)
\ No newline at end of file
+        self.assertEqual(self.au.aeroProblem.mach, 0.1)
+
+    # get_group_points
+    def test_get_group_points_single_group(self):
+        self.assertEqual(list(self.au.get_group_points(3)), [0, 1, 2])
+
+    def test_get_group_points_all_points_once(self):
+        self.au.setOption('nGroups', 3)
+        points = []
+        for group in range(3):
+            self.au.group = group
+            points.extend(self.au.get_group_points(10))
+        self.assertEqual(points, list(range(10)))
+
+    # create_funcs_table
+    def test_create_funcs_table_sweep_order(self):
+        self.au.funcs_data = [
+            {'n': 2, 'point': {'alpha': 40}, 'funcs': {'cl': 0.3}},
+            {'n': 0, 'point': {'alpha': 10}, 'funcs': {'cl': 0.1}},
+            {'n': 1, 'point': {'alpha': 20}, 'funcs': {'cl': 0.2}},
+        ]
+        lines = self.au.create_funcs_table().splitlines()
+        self.assertEqual(lines[0].split(), ['alpha', 'cl'])
+        self.assertEqual([line.split()[0] for line in lines[2:]], ['10', '20', '40'])
+
+    # add_funcs_data
+    def test_add_funcs_data_record(self):
+        self.au.create_aeroProblem()
+        self.au.aeroProblem.name = 'test_alpha20_reynolds1'
+        self.au.add_funcs_data({'test_alpha20_reynolds1_cl': 0.2}, 1)
+        self.assertEqual(self.au.funcs_data, [{
+            'n': 1,
+            'point': {'alpha': 20, 'reynolds': 1},
+            'funcs': {'cl': 0.2},
+        }])
+
+    def test_run_point_product(self):
+        self.au.setOption('sweepPlan', 'product')
+        self.au.aeroOptions = {
+            'alpha': [10, 20],
+            'mach': [0.1, 0.2],
+            'T': 288,
+        }
+        self.au.check_ap_input()
+        self.au.create_aeroProblem()
+        try:
+            self.au.run_point(2)
+        except AttributeError:
+            pass
+        self.assertEqual(self.au.aeroProblem.name, 'test_alpha20_mach0.1')
+        self.assertEqual(len(self.au.sweepPlan), 4)
+
+    # result cache
+    def test_run_point_cached(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.au.setOption('cacheDirectory', tmp_dir)
+            self.au.create_result_cache()
+            self.au.create_aeroProblem()
+            self.au.run_point(1)
+
+            with mock.patch.object(self.au, 'eval_funcs') as eval_funcs:
+                self.au.run_point(1)
+                eval_funcs.assert_not_called()
+
+        self.assertEqual(len(self.au.funcs_data), 2)
+        self.assertEqual(self.au.funcs_data[0], self.au.funcs_data[1])
+
+    @mock.patch('adflow_util.adflow_util.ADFLOW_AVAIL', True)
+    def test_create_result_cache_grid_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            grid_file = os.path.join(tmp_dir, 'grid.cgns')
+            with open(grid_file, 'wb') as file:
+                file.write(b'grid')
+            self.au.solverOptions['GridFile'] = grid_file
+            self.au.setOption('cacheDirectory', os.path.join(tmp_dir, 'cache'))
+            self.au.create_result_cache()
+
+            self.assertTrue(self.au.cacheEnabled)
+            self.assertEqual(self.au.gridHash, hash_file(grid_file))
+
+    @mock.patch('adflow_util.adflow_util.ADFLOW_AVAIL', True)
+    def test_create_result_cache_no_grid_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.au.setOption('cacheDirectory', tmp_dir)
+            with mock.patch('builtins.print'):
+                self.au.create_result_cache()
+
+        self.assertFalse(self.au.cacheEnabled)
+        self.assertIsNone(self.au.resultCache)
+
+    # resume
+    def test_load_results_resume(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            name = os.path.join(tmp_dir, 'test')
+            self.au.setOption('name', name)
+            self.au.setOption('resume', True)
+
+            store = ResultsStore(name + '.jsonl')
+            store.append({'n': 0, 'point': {'alpha': 10, 'reynolds': 1}, 'funcs': {'cl': 0.1}})
+            store.append({'n': 1, 'point': {'alpha': 99, 'reynolds': 1}, 'funcs': {'cl': 0.2}})
+            store.append({'n': 5, 'point': {'alpha': 10, 'reynolds': 1}, 'funcs': {'cl': 0.3}})
+
+            self.au.create_results_store()
+
+        self.assertEqual(len(self.au.funcs_data), 1)
+        self.assertEqual(self.au.funcs_data[0]['funcs'], {'cl': 0.1})
+
+    def test_run_resume_skips_completed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            name = os.path.join(tmp_dir, 'test')
+            self.au.setOption('name', name)
+            self.au.setOption('resume', True)
+
+            store = ResultsStore(name + '.jsonl')
+            store.append({'n': 0, 'point': {'alpha': 10, 'reynolds': 1}, 'funcs': {'cl': 0.1}})
+
+            with mock.patch.object(self.au, 'eval_funcs', wraps=self.au.eval_funcs) as eval_funcs:
+                self.au.run()
+                self.assertEqual(eval_funcs.call_count, 2)
+
+            self.assertEqual([record['n'] for record in store.read()], [0, 1, 2])
+
+    def test_run_resume_failed_no_restart(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            name = os.path.join(tmp_dir, 'test')
+            self.au.setOption('name', name)
+            self.au.setOption('resume', True)
+
+            restart_file = os.path.join(tmp_dir, 'test_vol.cgns')
+            open(restart_file, 'w').close()
+            store = ResultsStore(name + '.jsonl')
+            store.append({'n': 0, 'point': {'alpha': 10, 'reynolds': 1}, 'funcs': {},
+                          'failed': True, 'restartFile': restart_file})
+
+            restart_files = []
+            def run_point(n):
+                restart_files.append(self.au.resumeRestartFile)
+
+            with mock.patch.object(self.au, 'run_point', side_effect=run_point):
+                self.au.run()
+
+            self.assertEqual(restart_files, [None, None])
+
+    # adaptive refinement
+    def test_check_adaptive_one_variable(self):
+        self.au.setOption('adaptiveFuncs', ['cl'])
+        with self.assertRaises(Error):
+            self.au.check_ap_input()
+
+    def test_run_adaptive(self):
+        def eval_funcs():
+            alpha = self.au.aeroProblem.alpha
+            cl = 0.1 * alpha if alpha <= 10 else 1.0 - 0.1 * (alpha - 10)
+            return {self.au.aeroProblem.name + '_cl': cl}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.au.setOption('name', os.path.join(tmp_dir, 'test'))
+            self.au.setOption('adaptiveFuncs', ['cl'])
+            self.au.setOption('adaptiveBudget', 3)
+            self.au.aeroOptions = {
+                'alpha': [0, 4, 8, 12, 16],
+                'T': 288,
+            }
+            with mock.patch.object(self.au, 'eval_funcs', side_effect=eval_funcs):
+                self.au.run()
+
+        # all new points are around the kink of the polar
+        inserted = self.au.aeroOptions['alpha'][5:]
+        self.assertEqual(len(inserted), 3)
+        self.assertEqual(inserted[0], 10.0)
+        for alpha in inserted:
+            self.assertTrue(8 < alpha < 12)
+
+    def test_run_adaptive_failed_point(self):
+        def eval_funcs():
+            alpha = self.au.aeroProblem.alpha
+            cl = 0.1 * alpha if alpha <= 10 else 1.0 - 0.1 * (alpha - 10)
+            if alpha == 10:
+                cl = float('nan')
+            return {self.au.aeroProblem.name + '_cl': cl}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.au.setOption('name', os.path.join(tmp_dir, 'test'))
+            self.au.setOption('adaptiveFuncs', ['cl'])
+            self.au.setOption('adaptiveBudget', 3)
+            self.au.aeroOptions = {
+                'alpha': [0, 4, 8, 12, 16],
+                'T': 288,
+            }
+            with mock.patch.object(self.au, 'eval_funcs', side_effect=eval_funcs):
+                self.au.run()
+
+        # the failed midpoint is not tried again
+        inserted = self.au.aeroOptions['alpha'][5:]
+        self.assertEqual(inserted[0], 10.0)
+        self.assertEqual(inserted.count(10.0), 1)
+
+    def test_find_adaptive_point_converged(self):
+        self.au.setOption('adaptiveFuncs', ['cl'])
+        self.au.aeroOptions = {'alpha': [0, 1, 2]}
+        self.au.check_ap_input()
+        self.au.funcs_data = [
+            {'n': n, 'point': {'alpha': n}, 'funcs': {'cl': 0.1 * n}} for n in range(3)]
+        self.assertIsNone(self.au.find_adaptive_point())
+
+    def test_find_adaptive_point_repeated_value(self):
+        self.au.setOption('adaptiveFuncs', ['cl'])
+        self.au.aeroOptions = {'alpha': [0, 1, 1, 1, 2]}
+        self.au.check_ap_input()
+        self.au.funcs_data = [
+            {'n': n, 'point': {'alpha': alpha}, 'funcs': {'cl': 0.2 * (alpha == 1)}}
+            for n, alpha in enumerate([0, 1, 1, 1, 2])]
+        self.assertEqual(self.au.find_adaptive_point(), 0.5)
+
+    # state extrapolation
+    def test_check_state_extrapolation_reset_ap(self):
+        self.au.setOption('stateExtrapolation', 1)
+        self.au.setOption('resetAP', True)
+        with self.assertRaises(Error):
+            self.au.check_ap_input()
+
+    def test_extrapolation_weights_linear(self):
+        self.assertEqual(extrapolation_weights([0.0, 1.0], 2.0), [-1.0, 2.0])
+
+    def test_extrapolation_weights_quadratic(self):
+        self.assertEqual(extrapolation_weights([0.0, 1.0, 2.0], 3.0), [1.0, -3.0, 3.0])
+
+    def test_extrapolation_weights_same_position(self):
+        self.assertIsNone(extrapolation_weights([1.0, 1.0], 2.0))
+
+    def test_extrapolate_state(self):
+        self.au.setOption('stateExtrapolation', 1)
+        self.au.CFDSolver = mock.Mock()
+        self.au.stateHistory = [
+            (np.array([0.0]), np.array([1.0, 2.0])),
+            (np.array([1.0]), np.array([2.0, 4.0]))]
+
+        self.au.create_aeroProblem()
+        self.au.extrapolate_state({'alpha': 2.0})
+
+        guess = self.au.CFDSolver.setStates.call_args[0][0]
+        np.testing.assert_allclose(guess, [3.0, 6.0])
+
+    def test_extrapolate_state_turn(self):
+        self.au.setOption('stateExtrapolation', 1)
+        self.au.CFDSolver = mock.Mock()
+        self.au.create_aeroProblem()
+
+        # the last two points are on a line with the new one
+        self.au.stateHistory = [
+            (np.array([0.0, 1.0]), np.array([1.0])),
+            (np.array([0.0, 2.0]), np.array([2.0]))]
+        self.au.extrapolate_state({'mach': 0.0, 'alpha': 4.0})
+        np.testing.assert_allclose(self.au.CFDSolver.setStates.call_args[0][0], [4.0])
+
+        # the sweep turned, the old states are kept as they are
+        self.au.CFDSolver.reset_mock()
+        self.au.extrapolate_state({'mach': 1.0, 'alpha': 2.0})
+        self.au.CFDSolver.setStates.assert_not_called()
+
+    # solve_point
+    def create_mock_solver(self):
+        self.au.CFDSolver = mock.Mock()
+        self.au.CFDSolver.getOption.return_value = 1.0
+        self.au.CFDSolver.adflow.iteration.totalrfinal = 1e-10
+        self.au.CFDSolver.adflow.iteration.totalr0 = 1.0
+        self.au.CFDSolver.adflow.iteration.itertot = 100
+        self.au.aeroProblem = mock.Mock(solveFailed=False, fatalFail=False)
+
+    @mock.patch('adflow_util.adflow_util.ADFLOW_AVAIL', True)
+    def test_solve_point_divergence(self):
+        self.create_mock_solver()
+        self.au.setOption('divergenceCycles', 100)
+        self.au.CFDSolver.getOption.side_effect = {'nCycles': 1000, 'L2Convergence': 1e-8}.get
+        iteration = self.au.CFDSolver.adflow.iteration
+        residuals = iter([0.5, 1e3])
+        self.au.CFDSolver.side_effect = lambda ap, **kwargs: setattr(
+            iteration, 'totalrfinal', next(residuals))
+
+        result = self.au.solve_point({'alpha': 10})
+
+        self.assertTrue(result[1])
+        self.assertEqual(self.au.CFDSolver.call_args_list, [
+            mock.call(self.au.aeroProblem, writeSolution=False)] * 2)
+        self.au.CFDSolver.writeSolution.assert_called_once()
+        self.assertEqual(self.au.iterTot, 200)
+        self.assertEqual(self.au.CFDSolver.setOption.call_args_list, [
+            mock.call('nCycles', 100), mock.call('nCycles', 100),
+            mock.call('nCycles', 1000)])
+
+    @mock.patch('adflow_util.adflow_util.ADFLOW_AVAIL', True)
+    def test_solve_point_failed_reset_flow(self):
+        self.create_mock_solver()
+        self.au.setOption('retryOptions', [{'CFL': 0.5}])
+        funcs = [{'cl': float('nan')}, {'cl': float('nan')}]
+        with mock.patch.object(self.au, 'eval_funcs', side_effect=funcs):
+            result = self.au.solve_point({'alpha': 10})
+
+        # once before the retry and once for the next point
+        self.assertTrue(result[1])
+        self.assertEqual(self.au.CFDSolver.resetFlow.call_count, 2)
+
+    @mock.patch('adflow_util.adflow_util.ADFLOW_AVAIL', True)
+    def test_solve_point_retry(self):
+        self.create_mock_solver()
+        self.au.setOption('retryOptions', [{'CFL': 0.5}])
+        funcs = [{'cl': float('nan')}, {'cl': 0.1}]
+        with mock.patch.object(self.au, 'eval_funcs', side_effect=funcs):
+            result = self.au.solve_point({'alpha': 10})
+
+        self.assertEqual(result, ({'cl': 0.1}, False))
+        self.assertEqual(self.au.CFDSolver.call_count, 2)
+        self.au.CFDSolver.resetFlow.assert_called_once()
+        self.assertEqual(self.au.CFDSolver.setOption.call_args_list, [
+            mock.call('CFL', 0.5), mock.call('CFL', 1.0)])
+
+    @mock.patch('adflow_util.adflow_util.ADFLOW_AVAIL', True)
+    def test_solve_point_fail_tol(self):
+        self.create_mock_solver()
+        self.au.setOption('failTol', 1e-12)
+        with mock.patch.object(self.au, 'eval_funcs', return_value={'cl': 0.1}):
+            result = self.au.solve_point({'alpha': 10})
+
+        self.assertEqual(result, ({'cl': 0.1}, True))
+        self.assertEqual(self.au.CFDSolver.call_count, 1)
+
+    def test_create_funcs_table_failed(self):
+        self.au.funcs_data = [
+            {'n': 0, 'point': {'alpha': 10}, 'funcs': {'cl': 0.1}},
+            {'n': 1, 'point': {'alpha': 20}, 'funcs': {'cl': 0.2}, 'failed': True},
+        ]
+        lines = self.au.create_funcs_table().splitlines()
+        self.assertEqual(lines[0].split(), ['alpha', 'cl', 'failed'])
+        self.assertEqual(lines[3].split()[-1], 'True')
+
+    # timing
+    def test_run_timing(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            name = os.path.join(tmp_dir, 'test')
+            self.au.setOption('name', name)
+            self.au.setOption('timing', True)
+            self.au.run()
+            self.assertTrue(os.path.isfile(name + '_timing.json'))
+
+        self.assertEqual(list(self.au.timer.points), [0, 1, 2])
+        self.assertIn('evalFunctions', self.au.timer.points[0])
+
+    # restartQuota
+    def test_evict_restart_files_pending(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.au.solverOptions['outputDirectory'] = tmp_dir
+            self.au.setOption('autoRestart', True)
+            self.au.setOption('restartQuota', 10)
+            self.au.check_ap_input()
+            self.au.create_restart_index()
+
+            files = []
+            for n in range(3):
+                filename = os.path.join(tmp_dir, 'test_{}_vol.cgns'.format(n))
+                with open(filename, 'w') as file:
+                    file.write('x' * 10)
+                self.au.restartIndex.add(filename, self.au.sweepPlan.point(n))
+                files.append(filename)
+
+            # the file closest to the last point survives
+            self.au.pendingPoints = [2]
+            self.assertEqual(self.au.evict_restart_files(files[2]), [files[0], files[1]])
+            self.assertEqual(
+                sorted(os.listdir(tmp_dir)), ['restart_index.jsonl', 'test_2_vol.cgns'])
+
+    # output
+    def test_write_summary_not_root(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            name = os.path.join(tmp_dir, 'test')
+            self.au.setOption('name', name)
+            self.au.check_ap_input()
+            comm = mock.Mock()
+            comm.Get_rank.return_value = 1
+            self.au.output.comm = comm
+            self.au.write_summary()
+            self.assertEqual(os.listdir(tmp_dir), [])
@@ -0,0 +1,92 @@
+from adflow_util.cache import ResultCache, hash_file
+import json
+import os
+import tempfile
+import time
+import unittest
+
+class ResultCache_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp_dir.name, 'cache')
+        self.cache = ResultCache(self.directory)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    # key
+    def test_key_ignores_output_options(self):
+        key1 = self.cache.key({'alpha': 1}, {'CFL': 1.0, 'outputDirectory': 'a'})
+        key2 = self.cache.key({'alpha': 1}, {'cfl': 1.0, 'outputDirectory': 'b'})
+        self.assertEqual(key1, key2)
+
+    def test_key_changes(self):
+        key = self.cache.key({'alpha': 1}, {'CFL': 1.0}, 'grid')
+        self.assertNotEqual(key, self.cache.key({'alpha': 2}, {'CFL': 1.0}, 'grid'))
+        self.assertNotEqual(key, self.cache.key({'alpha': 1}, {'CFL': 2.0}, 'grid'))
+        self.assertNotEqual(key, self.cache.key({'alpha': 1}, {'CFL': 1.0}, 'grid2'))
+
+    # get/put
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get('abc'))
+
+    def test_put_get(self):
+        self.cache.put('abc', {'funcs': {'cl': 0.1}, 'iterTot': 10})
+        self.assertEqual(self.cache.get('abc'), {'funcs': {'cl': 0.1}, 'iterTot': 10})
+
+    def test_persistent(self):
+        self.cache.put('abc', {'funcs': {'cl': 0.1}})
+        cache = ResultCache(self.directory)
+        self.assertEqual(cache.get('abc'), {'funcs': {'cl': 0.1}})
+
+    def test_index_rebuilt(self):
+        self.cache.put('abc', {'funcs': {'cl': 0.1}})
+        os.remove(self.cache.index_file)
+        cache = ResultCache(self.directory)
+        self.assertEqual(cache.get('abc'), {'funcs': {'cl': 0.1}})
+
+    def test_evict_least_recently_used(self):
+        self.cache.put('a', {'funcs': {'cl': 0.1}})
+        self.cache.put('b', {'funcs': {'cl': 0.2}})
+        self.cache.index['a']['used'] = time.time() + 1
+        self.cache.maxSize = self.cache.size()
+        self.cache.put('c', {'funcs': {'cl': 0.3}})
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertFalse(os.path.isfile(os.path.join(self.directory, 'b.json')))
+
+    def test_shared_index(self):
+        other = ResultCache(self.directory)
+        self.cache.put('a', {'funcs': {'cl': 0.1}})
+        other.put('b', {'funcs': {'cl': 0.2}})
+        self.cache.put('c', {'funcs': {'cl': 0.3}})
+
+        with open(self.cache.index_file, 'r') as file:
+            self.assertEqual(sorted(json.load(file)), ['a', 'b', 'c'])
+
+    def test_shared_max_size(self):
+        other = ResultCache(self.directory)
+        self.cache.put('a', {'funcs': {'cl': 0.1}})
+        other.put('b', {'funcs': {'cl': 0.2}})
+        self.cache.maxSize = 2 * self.cache.size()
+        self.cache.put('c', {'funcs': {'cl': 0.3}})
+
+        self.assertEqual(sorted(self.cache.index), ['b', 'c'])
+        self.assertFalse(os.path.isfile(os.path.join(self.directory, 'a.json')))
+
+        # the entry deleted by the other process is not added again
+        other.put('d', {'funcs': {'cl': 0.4}})
+        self.assertEqual(sorted(other.index), ['b', 'c', 'd'])
+
+    # hash_file
+    def test_hash_file(self):
+        filename = os.path.join(self.tmp_dir.name, 'grid.cgns')
+        with open(filename, 'wb') as file:
+            file.write(b'grid' * 1000)
+        self.assertEqual(hash_file(filename), hash_file(filename, chunk_size=7))
+
+
+if __name__ == '__main__':
+    unittest.main()
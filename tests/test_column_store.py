@@ -0,0 +1,118 @@
+from adflow_util.column_store import ColumnStore, MinMaxPyramid
+import numpy as np
+import unittest
+
+class ColumnStore_Tests(unittest.TestCase):
+    def setUp(self):
+        self.store = ColumnStore(['Iter', 'Iter_Type', 'Lin_Res', 'totalRes'], capacity=2)
+
+    def test_dict_like(self):
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(list(self.store), ['Iter', 'Iter_Type', 'Lin_Res', 'totalRes'])
+        self.assertIn('Iter', self.store)
+        self.assertEqual(len(self.store['Iter']), 0)
+        self.assertEqual(len(ColumnStore()), 0)
+
+    def test_append_row_grows(self):
+        for n in range(5):
+            self.store.append_row([n, 'RK', '----', 1.0 / (n + 1)])
+        self.assertEqual(self.store.n_rows, 5)
+        self.assertEqual(self.store['Iter'].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(self.store.capacity, 8)
+        self.assertEqual(self.store['Iter'].dtype, np.int64)
+        self.assertEqual(self.store['totalRes'].dtype, np.float64)
+
+    def test_raw(self):
+        self.store.append_row([0, 'None', '----', 2.0])
+        self.store.append_row([1, 'ANK', 0.071, 1.0])
+        self.assertEqual(self.store.raw_row(0), [0, 'None', '----', 2.0])
+        self.assertEqual(self.store.raw_row(-1), [1, 'ANK', 0.071, 1.0])
+        self.assertEqual(self.store.raw_column('Lin_Res'), ['----', 0.071])
+        self.assertIsInstance(self.store.raw('Iter', 1), int)
+        with self.assertRaises(IndexError):
+            self.store.raw('Iter', 2)
+
+    def test_not_a_number(self):
+        self.store.append_row([0, 'None', '----', 2.0])
+        self.store.append_row([1, 'ANK', 0.071, 1.0])
+        self.assertEqual(self.store['Lin_Res'].tolist(), [0.0, 0.071])
+        self.assertEqual(self.store.valid('Lin_Res').tolist(), [False, True])
+        self.assertEqual(self.store.valid('Iter').tolist(), [True, True])
+
+    def test_view(self):
+        self.store.append_row([0, 'None', '----', 2.0])
+        view = self.store['totalRes']
+        self.assertTrue(np.shares_memory(view, self.store.columns['totalRes'].values))
+
+    def test_extend(self):
+        self.store.append_row([0, 'None', '----', 2.0])
+        self.store.extend({
+            'Iter': np.array([1, 2, 3]),
+            'Iter_Type': ['RK', 'RK', 'ANK'],
+            'Lin_Res': [0.1, '----', 0.2],
+            'totalRes': np.array([1.0, 0.5, 0.25]),
+        })
+        self.assertEqual(self.store.n_rows, 4)
+        self.assertEqual(self.store.raw_column('Iter_Type'), ['None', 'RK', 'RK', 'ANK'])
+        self.assertEqual(self.store.raw_column('Lin_Res', 1), [0.1, '----', 0.2])
+        self.assertEqual(self.store['totalRes'].tolist(), [2.0, 1.0, 0.5, 0.25])
+
+    def test_nbytes(self):
+        for n in range(1000):
+            self.store.append_row([n, 'RK', 0.1, 1.0])
+        # 8 bytes per value and 4 per code, with at most half of it unused
+        self.assertLessEqual(self.store.nbytes(), 2 * 1000 * (4 * 8 + 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class MinMaxPyramid_Tests(unittest.TestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(0).normal(size=1003)
+        self.pyramid = MinMaxPyramid()
+
+    def assert_levels(self, n):
+        for k in range(1, len(self.pyramid.mins)):
+            block = 2**k
+            n_blocks = (n + block - 1) // block
+            self.assertEqual(self.pyramid.n_blocks[k], n_blocks)
+            for i in range(n_blocks):
+                values = self.values[i * block:min((i + 1) * block, n)]
+                self.assertEqual(self.pyramid.mins[k][i], values.min())
+                self.assertEqual(self.pyramid.maxs[k][i], values.max())
+
+    def test_update(self):
+        # rows are added a few at a time
+        for n in (1, 2, 3, 10, 500, 1003):
+            self.pyramid.update(self.values[:n])
+            self.assert_levels(n)
+        self.assertEqual(len(self.pyramid.mins), 11)
+
+        # a shorter column starts again
+        self.pyramid.update(self.values[:7])
+        self.assert_levels(7)
+
+    def test_window(self):
+        self.values[600] = 100.0
+        self.pyramid.update(self.values)
+        rows, mins, maxs = self.pyramid.window(100, 900, 50)
+        self.assertTrue(50 <= len(rows) <= 100)
+        self.assertEqual(rows[0], 100)
+        self.assertTrue((rows[1:] > rows[:-1]).all())
+
+        # the extremes are kept
+        self.assertEqual(maxs.max(), 100.0)
+        self.assertLessEqual(mins.min(), self.values[100:900].min())
+        self.assertGreaterEqual(mins.min(), self.values.min())
+
+    def test_store(self):
+        store = ColumnStore(['Iter', 'totalRes'])
+        store.extend({'Iter': np.arange(100), 'totalRes': self.values[:100]})
+        pyramid = store.pyramid('totalRes')
+        self.assertEqual(pyramid.n_rows, 100)
+
+        store.append_row([100, 1.0])
+        self.assertIs(store.pyramid('totalRes'), pyramid)
+        self.assertEqual(pyramid.n_rows, 101)
@@ -0,0 +1,43 @@
+import json
+import subprocess
+import sys
+import unittest
+
+# imports adflow_plot in a fresh interpreter and reports how long it took and
+# which of the heavy modules got imported along with it
+benchmark = """
+import json, sys, time
+t_0 = time.perf_counter()
+from adflow_util import adflow_plot
+t_1 = time.perf_counter()
+heavy = ['adflow', 'baseclasses', 'mpi4py', 'numpy', 'tabulate']
+print(json.dumps({
+    'time': t_1 - t_0,
+    'modules': [name for name in heavy if name in sys.modules],
+}))
+"""
+
+class Import_Tests(unittest.TestCase):
+    def run_benchmark(self):
+        output = subprocess.check_output([sys.executable, '-c', benchmark])
+        return json.loads(output.decode().splitlines()[-1])
+
+    def test_adflow_plot_no_heavy_modules(self):
+        self.assertEqual(self.run_benchmark()['modules'], [])
+
+    def test_adflow_plot_import_time(self):
+        # the goal is well below 0.1s. The limit leaves room for slow and
+        # busy machines, so only a real regression makes this fail.
+        times = [self.run_benchmark()['time'] for i in range(3)]
+        self.assertLess(min(times), 0.5)
+
+    def test_lazy_names(self):
+        import adflow_util
+        from adflow_util.adflow_util import ADFLOW_UTIL
+        self.assertIs(adflow_util.ADFLOW_UTIL, ADFLOW_UTIL)
+        with self.assertRaises(AttributeError):
+            adflow_util.does_not_exist
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+from adflow_util.line_buffer import LineBuffer
+import unittest
+
+class LineBuffer_Tests(unittest.TestCase):
+    def setUp(self):
+        self.lines = ['line {}'.format(n) for n in range(50)]
+        self.buffer = LineBuffer(capacity=8, lines=self.lines)
+
+    def tearDown(self):
+        self.buffer.close()
+
+    def test_spill(self):
+        self.assertEqual(len(self.buffer), 50)
+        self.assertGreater(self.buffer.n_spilled, 0)
+        self.assertLess(len(self.buffer.lines), 8 + self.buffer.spill_batch)
+        self.assertGreaterEqual(len(self.buffer.lines), 8)
+
+    def test_getitem(self):
+        self.assertEqual(self.buffer[-1], 'line 49')
+        self.assertEqual(self.buffer[0], 'line 0')
+        self.assertEqual(self.buffer[17], 'line 17')
+        with self.assertRaises(IndexError):
+            self.buffer[50]
+
+    def test_slice(self):
+        self.assertEqual(self.buffer[-3:-1], self.lines[-3:-1])
+        self.assertEqual(self.buffer[5:45], self.lines[5:45])
+        self.assertEqual(self.buffer[::7], self.lines[::7])
+        self.assertEqual(list(self.buffer), self.lines)
+
+    def test_no_spill(self):
+        buffer = LineBuffer(capacity=100, lines=self.lines)
+        self.assertIsNone(buffer.spill_file)
+        self.assertEqual(buffer[:], self.lines)
+
+    def test_unicode(self):
+        self.buffer.extend(['• ×', 'ä'])
+        self.buffer.extend(self.lines)
+        self.assertEqual(self.buffer[50:52], ['• ×', 'ä'])
+
+    def test_search(self):
+        self.buffer.append('line 4')
+        self.assertEqual(self.buffer.search('line 4'), 50)
+        self.assertEqual(self.buffer.search('line 4', 50), 49)
+        self.assertEqual(self.buffer.search('line 4', 49), 48)
+        self.assertEqual(self.buffer.search('line 4', 40), 4)
+        self.assertEqual(self.buffer.search('missing'), -1)
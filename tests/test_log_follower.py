@@ -0,0 +1,104 @@
+from adflow_util.log_follower import LogFollower
+import os
+import tempfile
+import time
+import unittest
+
+class LogFollower_Tests(unittest.TestCase):
+    use_inotify = True
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'test.log')
+        self.write(b'line 1\nline 2\n')
+        self.follower = LogFollower(
+            self.filename, use_inotify=self.use_inotify,
+            min_interval=0.0, max_interval=0.0)
+
+    def tearDown(self):
+        self.follower.close()
+        self.tmp_dir.cleanup()
+
+    def write(self, data, mode='ab'):
+        with open(self.filename, mode) as file:
+            file.write(data)
+
+    def test_read_lines(self):
+        self.assertEqual(self.follower.read_lines(), [b'line 1', b'line 2'])
+        self.assertEqual(self.follower.read_lines(), [])
+        self.write(b'line 3\n')
+        self.assertEqual(self.follower.read_lines(), [b'line 3'])
+        self.assertEqual(self.follower.offset, 21)
+
+    def test_partial_line(self):
+        self.follower.read_lines()
+        self.write(b'line')
+        self.assertEqual(self.follower.read_lines(), [])
+        self.write(b' 3\r\n')
+        self.assertEqual(self.follower.read_lines(), [b'line 3'])
+
+    def test_offset(self):
+        follower = LogFollower(self.filename, offset=7, use_inotify=self.use_inotify)
+        self.assertEqual(follower.read_lines(), [b'line 2'])
+        follower.close()
+
+    def test_truncated(self):
+        self.follower.read_lines()
+        self.write(b'new\n', 'wb')
+        self.assertEqual(self.follower.read_lines(), [b'new'])
+        self.assertEqual(self.follower.restarts, 1)
+
+    def test_replaced(self):
+        self.follower.read_lines()
+        self.write(b'line 3\n')
+        os.rename(self.filename, self.filename + '.1')
+        self.write(b'new 1\nnew 2\n')
+        self.assertEqual(self.follower.read_lines(), [b'line 3', b'new 1', b'new 2'])
+        self.assertEqual(self.follower.restarts, 1)
+
+    def test_created_later(self):
+        os.remove(self.filename)
+        follower = LogFollower(self.filename, use_inotify=self.use_inotify, max_interval=0.0)
+        self.assertEqual(follower.read_lines(), [])
+        self.write(b'line 1\n')
+        self.assertEqual(follower.read_lines(), [b'line 1'])
+        follower.close()
+
+    def test_inotify_event(self):
+        follower = LogFollower(self.filename, use_inotify=True, max_interval=100.0)
+        if follower.fileno() is None:
+            self.skipTest('inotify is not available')
+        follower.read_lines()
+        self.assertEqual(follower.read_lines(), [])
+        self.write(b'line 3\n')
+        follower.wait(1.0)
+        self.assertEqual(follower.read_lines(), [b'line 3'])
+        follower.close()
+
+    def test_wait(self):
+        self.follower.read_lines()
+        t_0 = time.monotonic()
+        self.follower.wait(0.01)
+        self.assertLess(time.monotonic() - t_0, 1.0)
+
+
+class LogFollower_Polling_Tests(LogFollower_Tests):
+    use_inotify = False
+
+    def test_inotify_event(self):
+        pass
+
+    def test_interval_grows(self):
+        follower = LogFollower(
+            self.filename, use_inotify=False, min_interval=0.01, max_interval=0.04)
+        follower.read_lines()
+        self.assertEqual(follower.interval, 0.01)
+        for i in range(3):
+            follower.next_poll = 0.0
+            follower.read_lines()
+        self.assertEqual(follower.interval, 0.04)
+        follower.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+from adflow_util.log_parser import *
+import unittest
+
+class Handler():
+    # records what the parser has found
+    def __init__(self):
+        self.events = []
+
+    def on_header(self, names):
+        self.events.append(('header', names))
+
+    def on_iterations(self, rows):
+        self.events.append(('iterations', rows))
+
+    def on_finished(self):
+        self.events.append(('finished',))
+
+    def on_timing(self, name, value):
+        self.events.append(('timing', name, value))
+
+    def on_aero_problem(self, name):
+        self.events.append(('aero_problem', name))
+
+
+class LogParser_Tests(unittest.TestCase):
+    def setUp(self):
+        self.handler = Handler()
+        self.parser = LogParser(self.handler)
+        self.test_log = [line.rstrip() for line in open('tests/test.log')]
+
+    def test_parse_var_names(self):
+        names = parse_var_names(self.test_log[335:337])
+        self.assertEqual(names[:4], ['Grid_level', 'Iter', 'Iter_Tot', 'Iter_Type'])
+        self.assertEqual(names[-1], 'totalRes')
+
+    def test_row_tokenizer(self):
+        tokenizer = RowTokenizer(12)
+        for line in self.test_log[338:500]:
+            if line[0:5] != '     ':
+                continue
+            supposed = [str2number(bit) for bit in line.split()[:12]]
+            values = tokenizer(line)
+            self.assertEqual(values, supposed)
+            self.assertEqual([type(value) for value in values], [type(value) for value in supposed])
+
+        # a row that does not fit the types of the first one
+        self.assertEqual(
+            tokenizer('      1  2  3  RK  ANK  1.00  0.5  1  2  3  4  5'),
+            [1, 2, 3, 'RK', 'ANK', 1.0, 0.5, 1, 2, 3, 4, 5])
+
+        with self.assertRaises(IndexError):
+            tokenizer('      1       2')
+
+    def test_states(self):
+        self.parser.feed_lines(self.test_log)
+        events = [event[0] for event in self.handler.events]
+        self.assertEqual(events[0], 'aero_problem')
+        self.assertEqual(events[1:3], ['header', 'iterations'])
+        self.assertEqual(events.count('header'), 1)
+        self.assertEqual(events.count('finished'), 1)
+        self.assertEqual(self.handler.events[1][1], parse_var_names(self.test_log[335:337]))
+        self.assertIn(('timing', 'call', 582.610), self.handler.events)
+        self.assertEqual(self.parser.state, STATE_OUTPUT)
+
+        # all rows come together, the header repeated during a run is skipped
+        n_rows = sum(1 for line in self.test_log if line[0:5] == '     ')
+        self.assertEqual(len(self.handler.events[2][1]), n_rows)
+
+    def rows(self, handler):
+        return [row for event in handler.events if event[0] == 'iterations' for row in event[1]]
+
+    def test_tokenize_rows(self):
+        self.parser.feed_lines(self.test_log[334:342])
+        lines = self.handler.events[1][1]
+        self.assertEqual(
+            self.parser.tokenize_rows(lines + ['      1  2']),
+            [[str2number(bit) for bit in line.split()] for line in lines])
+
+    def test_line_by_line(self):
+        for line in self.test_log:
+            self.parser.feed(line)
+        handler = Handler()
+        LogParser(handler).feed_lines(self.test_log)
+        self.assertEqual(self.rows(self.handler), self.rows(handler))
+
+    def test_header_in_order(self):
+        # the header lines have to be consecutive
+        lines = self.test_log[334:338]
+        self.parser.feed_lines([lines[0], lines[1], '', lines[2], lines[3]])
+        self.assertEqual(self.parser.state, STATE_HEADER_GRID)
+        self.assertEqual(self.handler.events, [])
+
+        self.parser.feed_lines(lines[1:])
+        self.assertEqual(self.parser.state, STATE_ITERATIONS)
+
+    def test_no_timing_during_iterations(self):
+        self.parser.feed_lines(self.test_log[334:340] + [
+            '| Total Call Time    :    1.0 sec', '      1       0'])
+        self.assertEqual(
+            [event[0] for event in self.handler.events], ['header', 'iterations'])
+        self.assertEqual(len(self.handler.events[1][1]), 3)
+
+    def test_reset(self):
+        self.parser.feed_lines(self.test_log[334:340])
+        self.parser.reset()
+        self.parser.feed(self.test_log[340])
+        self.assertEqual(len(self.handler.events), 2)
+        self.assertEqual(self.parser.state, STATE_OUTPUT)
@@ -0,0 +1,65 @@
+from adflow_util.output import Output
+from unittest import mock
+import json
+import os
+import tempfile
+import unittest
+
+class Output_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'test.out')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def create_comm(self, rank):
+        comm = mock.Mock()
+        comm.Get_rank.return_value = rank
+        return comm
+
+    def test_write_serial(self):
+        output = Output()
+        output.write(self.filename, 'content')
+        with open(self.filename) as file:
+            self.assertEqual(file.read(), 'content')
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['test.out'])
+
+    def test_write_not_root(self):
+        output = Output(self.create_comm(1))
+        output.write(self.filename, 'content')
+        self.assertFalse(os.path.isfile(self.filename))
+
+    def test_write_json(self):
+        Output().write_json(self.filename, {'points': [{'n': 0}]})
+        with open(self.filename) as file:
+            self.assertEqual(json.load(file), {'points': [{'n': 0}]})
+
+    def test_makedirs_barrier(self):
+        comm = self.create_comm(1)
+        directory = os.path.join(self.tmp_dir.name, 'out')
+        Output(comm).makedirs(directory)
+        self.assertFalse(os.path.isdir(directory))
+        comm.Barrier.assert_called_once_with()
+
+        comm = self.create_comm(0)
+        Output(comm).makedirs(directory)
+        self.assertTrue(os.path.isdir(directory))
+        comm.Barrier.assert_called_once_with()
+
+    def test_gather(self):
+        self.assertEqual(Output().gather(1), [1])
+        comm = self.create_comm(0)
+        comm.gather.return_value = [1, 2]
+        self.assertEqual(Output(comm).gather(1), [1, 2])
+        comm.gather.assert_called_once_with(1, root=0)
+
+    def test_bcast(self):
+        self.assertEqual(Output().bcast(1), 1)
+        comm = self.create_comm(1)
+        comm.bcast.return_value = 2
+        self.assertEqual(Output(comm).bcast(None), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import adflow_util.plot as plx
+import unittest
+
+class plot_Tests(unittest.TestCase):
+    def setUp(self):
+        plx._vars.__init__()
+        plx._vars.cols_term = 40
+        plx._vars.rows_term = 12
+
+    def rasterize(self):
+        plx._set_xlim()
+        plx._set_ylim()
+        plx._set_grid()
+
+    def test_line(self):
+        plx.plot([0, 1, 2, 3], [0, 1, 4, 9], line_color=2, line_marker=['o', 'o', 'Xo', '+'])
+        self.rasterize()
+        chars = plx._vars.chars
+
+        # a sample in every column, the pre conditioner marker starts its line
+        self.assertEqual(chars.shape, (plx._vars.rows, plx._vars.cols))
+        self.assertTrue((chars != 32).any(axis=0).all())
+        self.assertEqual((chars == ord('X')).sum(), 1)
+        self.assertEqual(set(plx._vars.colors[chars != 32]), {2})
+
+        # the grid has the same cells as the arrays
+        row = plx._vars.grid[0]
+        self.assertEqual(row[0], '\033[2mo')
+        self.assertEqual(row[-1], '\033[0m ')
+
+    def test_last_series_on_top(self):
+        plx.plot([0, 10], [1, 1], line_color=1, line_marker='a')
+        plx.plot([0, 10], [1, 1], line_color=3, line_marker='b')
+        plx.set_ylim([0, 2])
+        self.rasterize()
+        self.assertEqual(set(plx._vars.chars.flatten()), {32, ord('b')})
+
+    def test_scatter(self):
+        plx.scatter([0, 5, 10], [0, float('nan'), 10], point_color=1, point_marker='*')
+        self.rasterize()
+        self.assertEqual((plx._vars.chars == ord('*')).sum(), 2)
+        self.assertEqual(plx._vars.chars[0, 0], ord('*'))
+        self.assertEqual(plx._vars.chars[-1, -1], ord('*'))
+
+    def test_empty(self):
+        plx.plot([0, 1], [0, 1])
+        plx.set_xlim([5, 6])
+        self.rasterize()
+        self.assertTrue((plx._vars.chars == 32).all())
+
+    def test_runs(self):
+        plx.plot([0, 1, 2, 3], [0, 1, 4, 9], line_color=2, line_marker=['o', 'o', 'Xo', '+'])
+        plx.plot([0, 3], [9, 0], line_color=3, line_marker='x')
+        plx._set_xlim()
+        plx._set_ylim()
+        plx._set_runs()
+        runs = plx._vars.runs
+
+        # the same cells as the grid, but neighbours of a color are merged
+        plx._set_grid()
+        plx._add_yaxis()
+        plx._add_xaxis()
+        self.assertEqual(len(runs), len(plx._vars.grid))
+        for row, grid_row in zip(runs, plx._vars.grid[::-1]):
+            self.assertEqual(row[0][0], 0)
+            text = ''.join(run[1] for run in row)
+            self.assertEqual(text, ''.join(cell.split('m', 1)[1] for cell in grid_row))
+            for run, next_run in zip(row, row[1:]):
+                self.assertEqual(run[0] + len(run[1]), next_run[0])
+                self.assertNotEqual(run[2], next_run[2])
@@ -0,0 +1,155 @@
+from adflow_util.restart import RestartIndex
+import os
+import tempfile
+import unittest
+
+class RestartIndex_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.tmp_dir.name
+        self.index = RestartIndex(
+            self.directory, 'test', ['alpha', 'mach'], {'alpha': 10.0, 'mach': 0.1})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def touch(self, filename, size=0):
+        filename = os.path.join(self.directory, filename)
+        with open(filename, 'w') as file:
+            file.write('x' * size)
+        return filename
+
+    # parse_filename
+    def test_parse_filename(self):
+        point = self.index.parse_filename('out/test_alpha-4.5_mach0.1_vol.cgns')
+        self.assertEqual(dict(point), {'alpha': -4.5, 'mach': 0.1})
+
+    def test_parse_filename_other_sweep(self):
+        self.assertIsNone(self.index.parse_filename('test_alpha4_vol.cgns'))
+        self.assertIsNone(self.index.parse_filename('test_mach4_alpha0.1_vol.cgns'))
+        self.assertIsNone(self.index.parse_filename('test_alphaX_mach0.1_vol.cgns'))
+
+    def test_parse_filename_no_sweep(self):
+        index = RestartIndex(self.directory, 'test', [])
+        self.assertEqual(index.parse_filename('test_vol.cgns'), {})
+        self.assertIsNone(index.parse_filename('test_alpha4_vol.cgns'))
+
+    # build
+    def test_build(self):
+        file_1 = self.touch('test_alpha4.0_mach0.1_vol.cgns')
+        self.touch('test_alpha4.0_mach0.1_surf.cgns')
+        self.touch('other_alpha4.0_mach0.1_vol.cgns')
+        self.index.build()
+        self.assertEqual(list(self.index.entries), [file_1])
+
+    def test_build_from_sidecar(self):
+        filename = self.touch('test_a_vol.cgns')
+        self.index.add(filename, {'alpha': 1.0, 'mach': 0.2})
+        self.index.add(os.path.join(self.directory, 'test_gone_vol.cgns'), {'alpha': 2.0, 'mach': 0.2})
+
+        index = RestartIndex(self.directory, 'test', ['alpha', 'mach'])
+        index.build()
+        self.assertEqual(list(index.entries), [filename])
+        self.assertEqual(index.entries[filename]['point'], {'alpha': 1.0, 'mach': 0.2})
+
+    # find
+    def test_find_empty(self):
+        self.assertIsNone(self.index.find({'alpha': 4.0, 'mach': 0.1}))
+
+    def test_find_nearest(self):
+        file_a = self.touch('a')
+        file_b = self.touch('b')
+        file_c = self.touch('c')
+        self.index.add(file_a, {'alpha': 0.0, 'mach': 0.1}, write=False)
+        self.index.add(file_b, {'alpha': 4.0, 'mach': 0.1}, write=False)
+        self.index.add(file_c, {'alpha': 4.5, 'mach': 0.2}, write=False)
+        self.assertEqual(self.index.find({'alpha': 4.5, 'mach': 0.1}), file_b)
+        self.assertEqual(self.index.find({'alpha': 4.5, 'mach': 0.2}), file_c)
+
+    def test_find_gone(self):
+        # a file deleted by another group is skipped and forgotten
+        file_a = self.touch('a')
+        file_b = self.touch('b')
+        self.index.add(file_a, {'alpha': 0.0, 'mach': 0.1}, write=False)
+        self.index.add(file_b, {'alpha': 4.0, 'mach': 0.1}, write=False)
+        os.remove(file_b)
+        self.assertEqual(self.index.find({'alpha': 4.5, 'mach': 0.1}), file_a)
+        self.assertEqual(list(self.index.entries), [file_a])
+
+        os.remove(file_a)
+        self.assertIsNone(self.index.find({'alpha': 4.5, 'mach': 0.1}))
+
+    def test_find_other_variables(self):
+        self.index.add(self.touch('a'), {'alpha': 0.0}, write=False)
+        self.assertIsNone(self.index.find({'alpha': 0.0, 'mach': 0.1}))
+
+    def test_find_marks_used(self):
+        file_a = self.touch('a')
+        file_b = self.touch('b')
+        self.index.add(file_a, {'alpha': 0.0, 'mach': 0.1}, write=False)
+        self.index.add(file_b, {'alpha': 4.0, 'mach': 0.1}, write=False)
+        self.index.entries[file_a]['used'] = 0.0
+        self.index.find({'alpha': 0.0, 'mach': 0.1})
+        self.assertGreater(self.index.entries[file_a]['used'], self.index.entries[file_b]['used'])
+
+    # evict
+    def test_build_size(self):
+        filename = self.touch('test_alpha4.0_mach0.1_vol.cgns', 10)
+        self.index.build()
+        self.assertEqual(self.index.entries[filename]['size'], 10)
+        self.assertEqual(self.index.size(), 10)
+
+    def test_evict_no_quota(self):
+        filename = self.touch('test_alpha4.0_mach0.1_vol.cgns', 10)
+        self.index.add(filename, {'alpha': 4.0, 'mach': 0.1})
+        self.assertEqual(self.index.evict(), [])
+        self.assertTrue(os.path.isfile(filename))
+
+    def test_evict_least_recently_used(self):
+        self.index.quota = 25
+        file_1 = self.touch('test_alpha1.0_mach0.1_vol.cgns', 10)
+        file_2 = self.touch('test_alpha2.0_mach0.1_vol.cgns', 10)
+        file_3 = self.touch('test_alpha3.0_mach0.1_vol.cgns', 10)
+        self.index.add(file_1, {'alpha': 1.0, 'mach': 0.1})
+        self.index.add(file_2, {'alpha': 2.0, 'mach': 0.1})
+        self.index.add(file_3, {'alpha': 3.0, 'mach': 0.1})
+        self.index.entries[file_1]['used'] = 2.0
+        self.index.entries[file_2]['used'] = 1.0
+        self.index.entries[file_3]['used'] = 0.0
+
+        self.assertEqual(self.index.evict(keep=file_3), [file_2])
+        self.assertFalse(os.path.isfile(file_2))
+        self.assertEqual(list(self.index.entries), [file_1, file_3])
+
+    def test_evict_far_from_pending(self):
+        self.index.quota = 10
+        file_1 = self.touch('test_alpha1.0_mach0.1_vol.cgns', 10)
+        file_2 = self.touch('test_alpha2.0_mach0.1_vol.cgns', 10)
+        file_3 = self.touch('test_alpha3.0_mach0.1_vol.cgns', 10)
+        self.index.add(file_1, {'alpha': 1.0, 'mach': 0.1})
+        self.index.add(file_2, {'alpha': 2.0, 'mach': 0.1})
+        self.index.add(file_3, {'alpha': 3.0, 'mach': 0.1})
+
+        pending = [{'alpha': 1.5, 'mach': 0.1}]
+        self.assertEqual(self.index.evict(pending, keep=file_1), [file_3, file_2])
+        self.assertEqual(list(self.index.entries), [file_1])
+
+    def test_evict_owned_only(self):
+        # the files of earlier runs belong to another group
+        file_1 = self.touch('test_alpha1.0_mach0.1_vol.cgns', 10)
+        index = RestartIndex(
+            self.directory, 'test', ['alpha', 'mach'], quota=10, owns_existing=False)
+        index.build()
+        self.assertEqual(index.size(), 0)
+
+        file_2 = self.touch('test_alpha2.0_mach0.1_vol.cgns', 10)
+        file_3 = self.touch('test_alpha3.0_mach0.1_vol.cgns', 10)
+        index.add(file_2, {'alpha': 2.0, 'mach': 0.1})
+        index.add(file_3, {'alpha': 3.0, 'mach': 0.1})
+        self.assertEqual(index.size(), 20)
+        self.assertEqual(index.evict([{'alpha': 3.0, 'mach': 0.1}], keep=file_3), [file_2])
+        self.assertTrue(os.path.isfile(file_1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+from adflow_util.results import ResultsStore, same_point
+import numpy as np
+import os
+import tempfile
+import unittest
+
+class ResultsStore_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = ResultsStore(os.path.join(self.tmp_dir.name, 'test.jsonl'))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_missing_file(self):
+        self.assertEqual(self.store.read(), [])
+
+    def test_append_read(self):
+        self.store.clear()
+        self.store.append({'n': 0, 'funcs': {'cl': np.float64(0.1)}, 'iterTot': np.int64(5)})
+        self.store.append({'n': 1, 'funcs': {'cl': 0.2}})
+        self.assertEqual(self.store.read(), [
+            {'n': 0, 'funcs': {'cl': 0.1}, 'iterTot': 5},
+            {'n': 1, 'funcs': {'cl': 0.2}},
+        ])
+
+    def test_clear(self):
+        self.store.append({'n': 0})
+        self.store.clear()
+        self.assertEqual(self.store.read(), [])
+
+    def test_read_skips_incomplete_line(self):
+        self.store.append({'n': 0})
+        with open(self.store.filename, 'a') as file:
+            file.write('{"n": 1, "fun')
+        self.assertEqual(self.store.read(), [{'n': 0}])
+
+    def test_repair(self):
+        self.store.append({'n': 0})
+        with open(self.store.filename, 'a') as file:
+            file.write('{"n": 1, "fun')
+        self.store.repair()
+        self.store.append({'n': 2})
+        self.assertEqual(self.store.read(), [{'n': 0}, {'n': 2}])
+
+    def test_same_point(self):
+        self.assertTrue(same_point({'alpha': np.float64(1.5)}, {'alpha': 1.5}))
+        self.assertFalse(same_point({'alpha': 1.5}, {'alpha': 2.5}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+from adflow_util.run_index import RunIndex
+import os
+import tempfile
+import unittest
+
+class RunIndex_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'test.log')
+        with open('tests/test.log', 'r') as file:
+            self.test_log = file.read()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, content, mode='w'):
+        with open(self.filename, mode) as file:
+            file.write(content)
+
+    def sidecar_lines(self):
+        with open(self.filename + '.runs.jsonl', 'r') as file:
+            return file.readlines()
+
+    def test_update(self):
+        self.write(self.test_log * 3)
+        index = RunIndex(self.filename)
+        self.assertEqual(index.update(), 3)
+
+        run = index.get(2)
+        self.assertEqual(run['run'], 2)
+        self.assertEqual(run['ap_name'], '010_10.00')
+        self.assertEqual(run['n_iterations'], 922)
+        self.assertEqual(run['call_time'], 582.610)
+        self.assertEqual(run['func_time'], 0.003)
+        self.assertAlmostEqual(run['first_res'], 0.6673485782026773E+07)
+
+        # the offsets point to the blocks
+        with open(self.filename, 'rb') as file:
+            data = file.read()
+        self.assertTrue(data[run['header']:].startswith(b'#---------'))
+        self.assertTrue(data[run['iterations']:].startswith(b'      1       0'))
+        self.assertTrue(data[run['end']:].startswith(b'#\n'))
+        self.assertTrue(data[run['timing']:].startswith(b'| Total Call Time'))
+        self.assertEqual(run['header'] - index.get(1)['header'], len(self.test_log))
+
+        with self.assertRaises(IndexError):
+            index.get(4)
+
+    def test_sidecar(self):
+        self.write(self.test_log * 2)
+        runs = RunIndex(self.filename)
+        runs.update()
+        self.assertEqual(len(self.sidecar_lines()), 2)
+
+        # a new index takes the runs from the sidecar, nothing has changed
+        index = RunIndex(self.filename)
+        index.load()
+        self.assertEqual(index.runs, runs.runs)
+        self.assertEqual(index.update(), 2)
+        self.assertEqual(len(self.sidecar_lines()), 2)
+
+    def test_incremental(self):
+        lines = self.test_log.splitlines(True)
+        self.write(''.join(lines[:1000]))
+        index = RunIndex(self.filename)
+        self.assertEqual(index.update(), 1)
+        self.assertIsNone(index.get(1)['end'])
+
+        # the unfinished run is scanned again
+        self.write(''.join(lines[1000:]) + self.test_log, 'a')
+        self.assertEqual(index.update(), 2)
+        self.assertIsNotNone(index.get(1)['end'])
+        self.assertEqual(index.get(1)['n_iterations'], 922)
+        self.assertEqual(len(self.sidecar_lines()), 3)
+
+        other = RunIndex(self.filename)
+        other.update()
+        self.assertEqual(other.runs, index.runs)
+
+    def test_replaced(self):
+        self.write(self.test_log * 3)
+        RunIndex(self.filename).update()
+
+        # a shorter log is not the one of the sidecar
+        self.write(self.test_log)
+        index = RunIndex(self.filename)
+        self.assertEqual(index.update(), 1)
+        self.assertEqual(len(self.sidecar_lines()), 1)
+
+    def test_no_runs(self):
+        self.write('no header here\n')
+        index = RunIndex(self.filename)
+        self.assertEqual(index.update(), 0)
+        self.assertEqual(RunIndex(os.path.join(self.tmp_dir.name, 'missing.log')).update(), 0)
@@ -0,0 +1,114 @@
+from adflow_util import SweepPlan
+from adflow_util.adflow_util import Error
+import unittest
+
+class SweepPlan_Tests(unittest.TestCase):
+    def setUp(self):
+        self.aeroOptions = {
+            'mach': [0.1, 0.2],
+            'alpha': [0, 1, 2],
+            'T': 288,
+            'evalFuncs': ['cl', 'cd'],
+        }
+
+    def test_zip_wrong_length(self):
+        with self.assertRaises(Error):
+            SweepPlan(self.aeroOptions, 'zip')
+
+    def test_no_arrays(self):
+        plan = SweepPlan({'alpha': 1, 'T': 288})
+        self.assertEqual(len(plan), 1)
+        self.assertDictEqual(plan.kwargs(0), {'alpha': 1, 'T': 288})
+
+    def test_product(self):
+        plan = SweepPlan(self.aeroOptions, 'product')
+        self.assertEqual(len(plan), 6)
+        points = [tuple(point.values()) for point in plan]
+        self.assertEqual(points, [
+            (0.1, 0), (0.1, 1), (0.1, 2), (0.2, 0), (0.2, 1), (0.2, 2)])
+
+    def test_product_kwargs(self):
+        plan = SweepPlan(self.aeroOptions, 'product')
+        self.assertDictEqual(plan.kwargs(4), {
+            'mach': 0.2,
+            'alpha': 1,
+            'T': 288,
+            'evalFuncs': ['cl', 'cd'],
+        })
+
+    def test_point_out_of_range(self):
+        plan = SweepPlan(self.aeroOptions, 'product')
+        with self.assertRaises(IndexError):
+            plan.point(6)
+
+    def test_sampled_needs_bounds(self):
+        self.aeroOptions['alpha'] = [0, 1, 2]
+        with self.assertRaises(Error):
+            SweepPlan(self.aeroOptions, 'lhs', nSamples=10)
+
+    def test_sampled_needs_samples(self):
+        self.aeroOptions['alpha'] = [0, 10]
+        with self.assertRaises(Error):
+            SweepPlan(self.aeroOptions, 'sobol')
+
+    def test_lhs_one_sample_per_stratum(self):
+        self.aeroOptions['alpha'] = [0, 10]
+        plan = SweepPlan(self.aeroOptions, 'lhs', nSamples=10, seed=3)
+        for name, (lower, upper) in plan.values.items():
+            values = [point[name] for point in plan]
+            strata = sorted(int((v - lower) / (upper - lower) * 10) for v in values)
+            self.assertEqual(strata, list(range(10)))
+
+    def test_lhs_reproducible(self):
+        self.aeroOptions['alpha'] = [0, 10]
+        plan1 = SweepPlan(self.aeroOptions, 'lhs', nSamples=5, seed=1)
+        plan2 = SweepPlan(self.aeroOptions, 'lhs', nSamples=5, seed=1)
+        self.assertEqual(list(plan1), list(plan2))
+
+    def test_sobol(self):
+        plan = SweepPlan({'mach': [0, 1], 'alpha': [0, 1]}, 'sobol', nSamples=8)
+        points = [tuple(point.values()) for point in plan]
+        self.assertEqual(points, [
+            (0.0, 0.0), (0.5, 0.5), (0.75, 0.25), (0.25, 0.75),
+            (0.375, 0.375), (0.875, 0.875), (0.625, 0.125), (0.125, 0.625)])
+
+    # schedule
+    def test_schedule_input(self):
+        plan = SweepPlan(self.aeroOptions, 'product')
+        self.assertEqual(list(plan.schedule()), list(range(6)))
+
+    def test_schedule_product_snake(self):
+        self.aeroOptions['alpha'] = [2, 0, 1]
+        plan = SweepPlan(self.aeroOptions, 'product')
+        points = [tuple(plan.point(n).values()) for n in plan.schedule('nearest')]
+        self.assertEqual(points, [
+            (0.1, 0), (0.1, 1), (0.1, 2), (0.2, 2), (0.2, 1), (0.2, 0)])
+
+    def test_schedule_product_snake_steps(self):
+        # every step changes a single value to its neighbour
+        aeroOptions = {'mach': [0.1, 0.2], 'alpha': [0, 1, 2, 3], 'beta': [0, 1]}
+        plan = SweepPlan(aeroOptions, 'product')
+        schedule = plan.schedule('nearest')
+        self.assertEqual(sorted(schedule), list(range(16)))
+        indexes = [
+            [aeroOptions[name].index(value) for name, value in plan.point(n).items()]
+            for n in schedule]
+        for a, b in zip(indexes, indexes[1:]):
+            steps = [abs(i - j) for i, j in zip(a, b)]
+            self.assertEqual(sorted(steps), [0, 0, 1])
+
+    def test_schedule_nearest_visits_all(self):
+        plan = SweepPlan({'alpha': [0, 10]}, 'sobol', nSamples=16)
+        schedule = plan.schedule('nearest')
+        self.assertEqual(sorted(schedule), list(range(16)))
+        alphas = [plan.point(n)['alpha'] for n in schedule]
+        self.assertEqual(alphas, sorted(alphas))
+
+    def test_schedule_invalid(self):
+        plan = SweepPlan(self.aeroOptions, 'product')
+        with self.assertRaises(Error):
+            plan.schedule('random')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+from adflow_util.timing import PhaseTimer
+from unittest import mock
+import unittest
+
+class PhaseTimer_Tests(unittest.TestCase):
+    def setUp(self):
+        self.timer = PhaseTimer()
+
+    def test_phase_adds_up(self):
+        with self.timer.phase(0, 'solve'):
+            pass
+        wall = self.timer.points[0]['solve'][0]
+        with self.timer.phase(0, 'solve'):
+            pass
+        self.assertGreaterEqual(self.timer.points[0]['solve'][0], wall)
+        self.assertEqual(list(self.timer.points[0]), ['solve'])
+
+    def test_phase_exception(self):
+        with self.assertRaises(ValueError):
+            with self.timer.phase(1, 'solve'):
+                raise ValueError()
+        self.assertIn('solve', self.timer.points[1])
+
+    def test_profile_serial(self):
+        self.timer.points = {0: {'solve': [2.0, 1.0]}}
+        profile = self.timer.profile()
+        self.assertEqual(profile[0]['n'], 0)
+        self.assertEqual(profile[0]['ranks'], 1)
+        self.assertEqual(profile[0]['phases']['solve']['wall'],
+                         {'min': 2.0, 'max': 2.0, 'mean': 2.0})
+
+    def test_profile_ranks(self):
+        comm = mock.Mock()
+        comm.Get_rank.return_value = 0
+        comm.gather.return_value = [
+            {0: {'solve': [1.0, 1.0]}, 1: {'solve': [5.0, 5.0]}},
+            {0: {'solve': [3.0, 2.0]}},
+        ]
+        profile = self.timer.profile(comm)
+        self.assertEqual([point['n'] for point in profile], [0, 1])
+        self.assertEqual(profile[0]['ranks'], 2)
+        self.assertEqual(profile[0]['phases']['solve']['wall'],
+                         {'min': 1.0, 'max': 3.0, 'mean': 2.0})
+        self.assertEqual(profile[1]['ranks'], 1)
+
+    def test_profile_not_root(self):
+        comm = mock.Mock()
+        comm.Get_rank.return_value = 1
+        self.assertIsNone(self.timer.profile(comm))
+
+
+if __name__ == '__main__':
+    unittest.main()